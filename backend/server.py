@@ -1,8 +1,11 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, Response
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, Response, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel, ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, CollectionInvalid, DuplicateKeyError, OperationFailure
 import os
 import logging
 from pathlib import Path
@@ -17,14 +20,21 @@ import json
 import openai
 import stripe
 import asyncio
-import aiohttp
+import base64
+import bisect
+import heapq
+import random
+import time
+import zlib
+from collections import OrderedDict, deque
+import numpy as np
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, tz_aware=True)
 db = client[os.environ['DB_NAME']]
 
 # JWT Settings
@@ -37,7 +47,10 @@ stripe.api_key = os.environ.get('STRIPE_API_KEY', 'sk_test_emergent')
 
 # OpenAI
 EMERGENT_LLM_KEY = os.environ.get('EMERGENT_LLM_KEY', '')
-openai_client = openai.AsyncOpenAI(api_key=EMERGENT_LLM_KEY)
+# Point LLM_BASE_URL at a local OpenAI-compatible stub to exercise the rationale pipeline in tests
+LLM_BASE_URL = os.environ.get('LLM_BASE_URL') or None
+LLM_MODEL = os.environ.get('LLM_MODEL', 'gpt-4o-mini')
+openai_client = openai.AsyncOpenAI(api_key=EMERGENT_LLM_KEY, base_url=LLM_BASE_URL, max_retries=0)
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -60,7 +73,10 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(level
 logger = logging.getLogger(__name__)
 
 # CoinGecko cache
-crypto_cache = {"data": {}, "last_update": None}
+crypto_cache = {"data": {}, "last_update": None, "last_error": None}
+
+# Long-running tasks started with the app and cancelled on shutdown
+background_tasks: List[asyncio.Task] = []
 
 # ===================== MODELS =====================
 
@@ -107,6 +123,18 @@ class CheckoutRequest(BaseModel):
     origin_url: str
     plan: str = "pro"
 
+class StreamSubscription(BaseModel):
+    pairs: List[str]
+
+class BatchSignalRequest(BaseModel):
+    pairs: Optional[List[str]] = None
+    timeframes: Optional[List[str]] = None
+
+class PriceAlertCreate(BaseModel):
+    currency_pair: str
+    condition: str
+    level: float
+
 # ===================== HELPERS =====================
 
 def create_jwt_token(user_id: str, email: str, is_admin: bool = False) -> str:
@@ -124,27 +152,91 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
+AUTH_CACHE_SIZE = int(os.environ.get('AUTH_CACHE_SIZE', '10000'))
+# Bounds how stale a record can be on workers that did not see the write that changed it
+AUTH_CACHE_TTL_SECONDS = float(os.environ.get('AUTH_CACHE_TTL_SECONDS', '30'))
+
+class AuthCache:
+    """LRU with TTL of user records by user_id and session records by session_token"""
+    __slots__ = ("users", "sessions", "hits", "misses", "clock")
+
+    def __init__(self, clock=time.monotonic):
+        self.users: OrderedDict = OrderedDict()
+        self.sessions: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.clock = clock
+
+    def lookup(self, entries: OrderedDict, key: str) -> Optional[dict]:
+        entry = entries.get(key)
+        if entry is None or entry[0] <= self.clock():
+            if entry is not None:
+                del entries[key]
+            self.misses += 1
+            return None
+        entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def store(self, entries: OrderedDict, key: str, record: dict):
+        entries[key] = (self.clock() + AUTH_CACHE_TTL_SECONDS, record)
+        entries.move_to_end(key)
+        if len(entries) > AUTH_CACHE_SIZE:
+            entries.popitem(last=False)
+
+    async def get_user(self, user_id: str) -> Optional[dict]:
+        user = self.lookup(self.users, user_id)
+        if user is None:
+            user = await db.users.find_one({"user_id": user_id}, {"_id": 0})
+            if user is None:
+                return None
+            self.store(self.users, user_id, user)
+        # Handlers get their own copy, so nothing they change leaks into the cache
+        return dict(user)
+
+    async def get_session(self, session_token: str) -> Optional[dict]:
+        session = self.lookup(self.sessions, session_token)
+        if session is None:
+            session = await db.user_sessions.find_one({"session_token": session_token}, {"_id": 0})
+            if session is None:
+                return None
+            self.store(self.sessions, session_token, session)
+        return session
+
+    def invalidate_user(self, user_id: str):
+        self.users.pop(user_id, None)
+
+    def invalidate_session(self, session_token: str):
+        self.sessions.pop(session_token, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "users": len(self.users),
+            "sessions": len(self.sessions),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+auth_cache = AuthCache()
+
 async def get_current_user(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)) -> Optional[dict]:
     session_token = request.cookies.get("session_token")
     
     if session_token:
-        session = await db.user_sessions.find_one({"session_token": session_token}, {"_id": 0})
+        session = await auth_cache.get_session(session_token)
         if session:
-            expires_at = session.get("expires_at")
-            if isinstance(expires_at, str):
-                expires_at = datetime.fromisoformat(expires_at)
-            if expires_at.tzinfo is None:
-                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            expires_at = parse_datetime(session.get("expires_at"))
             if expires_at > datetime.now(timezone.utc):
-                user = await db.users.find_one({"user_id": session["user_id"]}, {"_id": 0})
+                user = await auth_cache.get_user(session["user_id"])
                 if user:
                     return user
     
     if credentials:
         try:
             payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-            user = await db.users.find_one({"user_id": payload["user_id"]}, {"_id": 0})
-            return user
+            return await auth_cache.get_user(payload["user_id"])
         except JWTError:
             pass
     
@@ -169,6 +261,424 @@ async def require_premium(request: Request, credentials: HTTPAuthorizationCreden
         raise HTTPException(status_code=403, detail="Premium subscription required")
     return user
 
+# ===================== OUTBOUND HTTP =====================
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class UpstreamClient:
+    """App-scoped keep-alive connection pool for one upstream host, with retries and latency metrics"""
+
+    def __init__(self, name: str, base_url: str, max_connections: int = 10, timeout: float = 10.0, retries: int = 2):
+        self.name = name
+        self.base_url = base_url
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.retries = retries
+        self.client: Optional[httpx.AsyncClient] = None
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.retried = 0
+        self.latencies = deque(maxlen=1024)
+
+    def start(self):
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout, connect=min(self.timeout, 5.0)),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=60
+                )
+            )
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        self.start()
+        attempt = 0
+        while True:
+            self.requests += 1
+            self.in_flight += 1
+            started = time.perf_counter()
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except httpx.TransportError:
+                self.errors += 1
+                if attempt >= self.retries:
+                    raise
+                delay = None
+            else:
+                if response.status_code not in RETRYABLE_STATUS_CODES or attempt >= self.retries:
+                    if response.status_code >= 400:
+                        self.errors += 1
+                    return response
+                self.errors += 1
+                retry_after = response.headers.get("Retry-After", "")
+                delay = min(float(retry_after), 5.0) if retry_after.isdigit() else None
+            finally:
+                self.in_flight -= 1
+                self.latencies.append(time.perf_counter() - started)
+            attempt += 1
+            self.retried += 1
+            await asyncio.sleep(delay if delay is not None else 0.25 * 2 ** (attempt - 1) + random.uniform(0, 0.1))
+
+    def stats(self) -> dict:
+        latencies = np.array(self.latencies) * 1000
+        return {
+            "base_url": self.base_url,
+            "in_flight": self.in_flight,
+            "max_connections": self.max_connections,
+            "pool_usage": round(self.in_flight / self.max_connections, 2),
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retried,
+            "latency_ms": {
+                "p50": round(float(np.percentile(latencies, 50)), 1),
+                "p95": round(float(np.percentile(latencies, 95)), 1),
+                "max": round(float(latencies.max()), 1)
+            } if len(latencies) else None
+        }
+
+COINGECKO_API_URL = os.environ.get('COINGECKO_API_URL', 'https://api.coingecko.com/api/v3')
+EMERGENT_AUTH_URL = os.environ.get('EMERGENT_AUTH_URL', 'https://demobackend.emergentagent.com')
+
+coingecko_http = UpstreamClient("coingecko", COINGECKO_API_URL, max_connections=4, timeout=10.0, retries=2)
+oauth_http = UpstreamClient("emergent_auth", EMERGENT_AUTH_URL, max_connections=50, timeout=10.0, retries=1)
+
+upstream_clients = [coingecko_http, oauth_http]
+
+# ===================== DATABASE INDEXES =====================
+
+QUERY_DIAGNOSTICS = os.environ.get('QUERY_DIAGNOSTICS', 'false').lower() == 'true'
+IDEMPOTENCY_KEY_TTL_SECONDS = 24 * 3600
+
+# Declared per collection to match the filter and sort shape of the routes that query it
+INDEX_SPECS = {
+    "trading_signals": [
+        IndexModel([("signal_id", ASCENDING)], name="signal_id_unique", unique=True),
+        # signal_id breaks created_at ties so keyset pages are stable and the sort stays in the index
+        IndexModel([("created_at", DESCENDING), ("signal_id", DESCENDING)], name="created_at"),
+        IndexModel(
+            [("is_premium", ASCENDING), ("created_at", DESCENDING), ("signal_id", DESCENDING)],
+            name="premium_created_at"
+        ),
+        IndexModel(
+            [("status", ASCENDING), ("created_at", DESCENDING), ("signal_id", DESCENDING)],
+            name="status_created_at"
+        ),
+        IndexModel(
+            [("currency_pair", ASCENDING), ("created_at", DESCENDING), ("signal_id", DESCENDING)],
+            name="pair_created_at"
+        ),
+        IndexModel(
+            [("currency_pair", ASCENDING), ("status", ASCENDING), ("created_at", DESCENDING), ("signal_id", DESCENDING)],
+            name="pair_status_created_at"
+        ),
+        # Only signals an admin moved back to ACTIVE carry reopened_at; the book sync looks them up by it
+        IndexModel([("reopened_at", ASCENDING)], name="reopened_at", sparse=True),
+    ],
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+    ],
+    "alerts": [
+        IndexModel([("alert_id", ASCENDING)], name="alert_id_unique", unique=True),
+        # One NEW_SIGNAL alert per (user, signal), however many coalesced requests race to insert it
+        IndexModel(
+            [("user_id", ASCENDING), ("signal_id", ASCENDING)],
+            name="user_signal_new_unique",
+            unique=True,
+            partialFilterExpression={"alert_type": 0}  # NEW_SIGNAL in ALERT_ENUMS
+        ),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_created_at"),
+        IndexModel([("user_id", ASCENDING), ("updated_at", ASCENDING), ("alert_id", ASCENDING)], name="user_updated_at"),
+        IndexModel([("created_at", ASCENDING)], name="created_at"),
+    ],
+    "user_sessions": [
+        IndexModel([("session_token", ASCENDING)], name="session_token_unique", unique=True),
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "watchlists": [
+        IndexModel([("user_id", ASCENDING), ("pair", ASCENDING)], name="user_pair_unique", unique=True),
+    ],
+    "price_alerts": [
+        IndexModel([("alert_id", ASCENDING)], name="alert_id_unique", unique=True),
+        IndexModel([("user_id", ASCENDING), ("status", ASCENDING)], name="user_status"),
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)], name="status_created_at"),
+    ],
+    "idempotency_keys": [
+        IndexModel([("user_id", ASCENDING), ("key", ASCENDING)], name="user_key_unique", unique=True),
+        IndexModel([("created_at", ASCENDING)], name="created_at_ttl", expireAfterSeconds=IDEMPOTENCY_KEY_TTL_SECONDS),
+    ],
+    "performance_daily": [
+        IndexModel([("date", ASCENDING)], name="date"),
+    ],
+    "payment_transactions": [
+        IndexModel([("session_id", ASCENDING)], name="session_id_unique", unique=True),
+        IndexModel([("status", ASCENDING)], name="status"),
+    ],
+}
+
+# Representative route queries checked with explain when QUERY_DIAGNOSTICS is on: (collection, filter, sort)
+QUERY_SHAPES = [
+    ("trading_signals", {}, [("created_at", -1), ("signal_id", -1)]),
+    ("trading_signals", {"is_premium": {"$ne": True}}, [("created_at", -1), ("signal_id", -1)]),
+    ("trading_signals", {"status": 0}, [("created_at", -1)]),
+    ("trading_signals", {"currency_pair": "EUR/USD"}, [("created_at", -1)]),
+    ("trading_signals", {"currency_pair": "EUR/USD", "status": 0}, [("created_at", -1)]),
+    ("trading_signals", {"signal_id": ""}, None),
+    ("users", {"email": ""}, None),
+    ("users", {"user_id": ""}, None),
+    ("alerts", {"user_id": ""}, [("created_at", -1)]),
+    ("alerts", {"user_id": "", "updated_at": {"$gt": datetime(2000, 1, 1, tzinfo=timezone.utc)}}, [("updated_at", 1), ("alert_id", 1)]),
+    ("price_alerts", {"status": "ACTIVE"}, None),
+    ("user_sessions", {"session_token": ""}, None),
+    ("payment_transactions", {"session_id": ""}, None),
+]
+
+async def ensure_indexes():
+    """Create every declared index; existing identical indexes make this a no-op"""
+    for collection, indexes in INDEX_SPECS.items():
+        for index in indexes:
+            try:
+                await db[collection].create_indexes([index])
+            except OperationFailure as e:
+                # Conflicting options or duplicate data under a unique key; leave the collection usable
+                logger.error(f"Index {collection}.{index.document['name']} not created: {e}")
+
+def plan_stages(plan: dict):
+    yield plan.get("stage")
+    for child in plan.get("inputStages", []) + [plan[key] for key in ("inputStage", "queryPlan") if key in plan]:
+        yield from plan_stages(child)
+
+async def explain_query_shapes() -> List[dict]:
+    """Explain each representative query and report the ones that fall back to a collection scan"""
+    report = []
+    for collection, query, sort in QUERY_SHAPES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = (await cursor.explain()).get("queryPlanner", {}).get("winningPlan", {})
+        stages = set(plan_stages(plan))
+        entry = {"collection": collection, "query": query, "sort": sort, "collscan": "COLLSCAN" in stages}
+        if entry["collscan"]:
+            logger.warning(f"Collection scan for {collection} query {query} sort {sort}")
+        report.append(entry)
+    return report
+
+# ===================== DOCUMENT SCHEMA =====================
+
+# v2 documents store timestamps as BSON dates, enums as small integers and omit templated rationales.
+# Readers accept both versions; run_schema_migration converts v1 documents in the background.
+SCHEMA_VERSION = 2
+MIGRATION_BATCH_SIZE = int(os.environ.get('MIGRATION_BATCH_SIZE', '500'))
+
+SIGNAL_ENUMS = {
+    "status": {"ACTIVE": 0, "TP_HIT": 1, "SL_HIT": 2, "EXPIRED": 3},
+    "signal_type": {"NEUTRAL": 0, "BUY": 1, "SELL": 2},
+    "market_bias": {"RANGING": 0, "BULLISH": 1, "BEARISH": 2},
+    "asset_type": {"forex": 0, "crypto": 1},
+}
+SIGNAL_DATE_FIELDS = ("created_at", "expires_at", "prediction_time", "closed_at")
+ALERT_ENUMS = {"alert_type": {"NEW_SIGNAL": 0, "WATCHLIST_SIGNAL": 1, "PRICE_ALERT": 2}}
+ALERT_DATE_FIELDS = ("created_at", "updated_at")
+ENUM_NAMES = {
+    field: {code: name for name, code in codes.items()}
+    for enums in (SIGNAL_ENUMS, ALERT_ENUMS) for field, codes in enums.items()
+}
+
+def parse_datetime(value) -> Optional[datetime]:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if isinstance(value, datetime) and value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+def encode_enums(doc: dict, enums: dict) -> dict:
+    encoded = dict(doc)
+    for field, codes in enums.items():
+        if encoded.get(field) in codes:
+            encoded[field] = codes[encoded[field]]
+    return encoded
+
+def encode_document(doc: dict, enums: dict, date_fields: tuple) -> dict:
+    encoded = encode_enums(doc, enums)
+    for field in date_fields:
+        if field in encoded:
+            encoded[field] = parse_datetime(encoded[field])
+    encoded["schema_version"] = SCHEMA_VERSION
+    return encoded
+
+def decode_document(doc: dict, enums: dict, date_fields: tuple) -> dict:
+    for field in enums:
+        if isinstance(doc.get(field), int):
+            doc[field] = ENUM_NAMES[field].get(doc[field], doc[field])
+    for field in date_fields:
+        if isinstance(doc.get(field), datetime):
+            doc[field] = parse_datetime(doc[field]).isoformat()
+    doc.pop("schema_version", None)
+    doc.pop("_id", None)
+    return doc
+
+def enum_in(enums: dict, field: str, *names: str) -> dict:
+    """Match enum values in either their v1 string or v2 integer form"""
+    values = list(names) + [enums[field][name] for name in names if name in enums[field]]
+    return {"$in": values}
+
+def encode_signal(signal: dict) -> dict:
+    encoded = encode_document(signal, SIGNAL_ENUMS, SIGNAL_DATE_FIELDS)
+    if "ai_rationale" in signal and signal["ai_rationale"] == render_rationale(signal):
+        del encoded["ai_rationale"]
+    return encoded
+
+def decode_signal(doc: dict, with_rationale: bool = True) -> dict:
+    signal = decode_document(doc, SIGNAL_ENUMS, SIGNAL_DATE_FIELDS)
+    if with_rationale and "ai_rationale" not in signal and "market_bias" in signal:
+        signal["ai_rationale"] = render_rationale(signal)
+    return signal
+
+def encode_alert(alert: dict) -> dict:
+    return encode_document(alert, ALERT_ENUMS, ALERT_DATE_FIELDS)
+
+def decode_alert(doc: dict) -> dict:
+    return decode_document(doc, ALERT_ENUMS, ALERT_DATE_FIELDS)
+
+def encode_dates_only(doc: dict) -> dict:
+    return encode_document(doc, {}, ("created_at", "expires_at"))
+
+MIGRATION_ENCODERS = {
+    "trading_signals": encode_signal,
+    "alerts": encode_alert,
+    "user_sessions": encode_dates_only,
+    "users": encode_dates_only,
+    "payment_transactions": encode_dates_only,
+}
+
+def migration_update(doc: dict, encoded: dict) -> UpdateOne:
+    """Write only the fields encoding changed, guarded on their v1 values so a concurrent update is never undone"""
+    changed = {field: value for field, value in encoded.items() if field not in doc or doc[field] != value}
+    removed = [field for field in doc if field not in encoded]
+    guard = {field: doc[field] for field in list(changed) + removed if field in doc}
+    update = {"$set": changed}
+    if removed:
+        update["$unset"] = {field: "" for field in removed}
+    return UpdateOne({"_id": doc["_id"], "schema_version": {"$ne": SCHEMA_VERSION}, **guard}, update)
+
+async def migrate_collection(collection: str, encode) -> int:
+    """Rewrite v1 documents in _id order, checkpointing after each batch so a restart resumes"""
+    checkpoint_id = f"schema_v{SCHEMA_VERSION}:{collection}"
+    checkpoint = await db.migrations.find_one({"_id": checkpoint_id}) or {}
+    if checkpoint.get("done"):
+        return 0
+    last_id = checkpoint.get("last_id")
+    migrated = checkpoint.get("migrated", 0)
+    while True:
+        query = {"schema_version": {"$ne": SCHEMA_VERSION}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = await db[collection].find(query).sort("_id", 1).limit(MIGRATION_BATCH_SIZE).to_list(MIGRATION_BATCH_SIZE)
+        if not batch:
+            break
+        result = await db[collection].bulk_write(
+            [migration_update(doc, encode(dict(doc))) for doc in batch], ordered=False
+        )
+        migrated += result.modified_count
+        if result.matched_count < len(batch):
+            # Some documents changed after the read; re-read this window, the migrated ones no longer match
+            continue
+        last_id = batch[-1]["_id"]
+        await db.migrations.update_one(
+            {"_id": checkpoint_id},
+            {"$set": {"last_id": last_id, "migrated": migrated, "updated_at": datetime.now(timezone.utc)}},
+            upsert=True
+        )
+    await db.migrations.update_one(
+        {"_id": checkpoint_id},
+        {"$set": {"done": True, "migrated": migrated, "updated_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+    return migrated
+
+async def run_schema_migration():
+    """Background task: convert every collection to the current document schema"""
+    for collection, encode in MIGRATION_ENCODERS.items():
+        try:
+            migrated = await migrate_collection(collection, encode)
+            if migrated:
+                logger.info(f"Migrated {migrated} {collection} documents to schema v{SCHEMA_VERSION}")
+        except Exception as e:
+            logger.error(f"Schema migration error for {collection}: {e}")
+
+# ===================== COUNTERS =====================
+
+# Admin dashboard counts, kept with $inc on every write that changes them and reconciled periodically
+COUNTERS_ID = "admin"
+COUNTER_RECONCILE_SECONDS = int(os.environ.get('COUNTER_RECONCILE_SECONDS', '3600'))
+ADMIN_STATS_TTL_SECONDS = 2
+
+admin_stats_cache = {"expires_at": 0.0, "payload": None}
+# Held for a whole period, so one worker recounts while the others only apply $inc
+COUNTER_RECONCILE_LEASE_NAME = "counter_reconciler"
+SNAPSHOT_WRITE_ATTEMPTS = 3
+
+async def write_snapshot(collection, doc_id: str, build) -> dict:
+    """$set a recount from build() over an $inc-maintained document, unless an $inc landed meanwhile.
+    Every $inc also bumps "version", so a changed version means the recount already missed a write;
+    that attempt is dropped and retried rather than overwriting the increment."""
+    for _ in range(SNAPSHOT_WRITE_ATTEMPTS):
+        current = await collection.find_one({"_id": doc_id}, {"_id": 0, "version": 1})
+        snapshot = await build()
+        guard = {"version": current["version"]} if current and "version" in current else {"version": {"$exists": False}}
+        try:
+            # A guard that no longer matches makes the upsert insert a duplicate _id
+            await collection.update_one({"_id": doc_id, **guard}, {"$set": snapshot}, upsert=True)
+            return snapshot
+        except DuplicateKeyError:
+            continue
+    logger.warning(f"Recount of {doc_id} kept losing to concurrent updates; keeping the incremental values")
+    return snapshot
+
+async def bump_counters(**deltas: int):
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if deltas:
+        await db.counters.update_one({"_id": COUNTERS_ID}, {"$inc": {**deltas, "version": 1}}, upsert=True)
+        admin_stats_cache["expires_at"] = 0.0
+
+def tier_is_premium(tier: Optional[str]) -> bool:
+    return (tier or "free") != "free"
+
+async def reconcile_counters() -> dict:
+    """Reset the counters from the collections, without overwriting increments made while it ran"""
+    counters = await write_snapshot(db.counters, COUNTERS_ID, count_counters)
+    admin_stats_cache["expires_at"] = 0.0
+    return counters
+
+async def count_counters() -> dict:
+    """Metadata counts for totals, exact counts for filters"""
+    return {
+        "users_total": await db.users.estimated_document_count(),
+        "users_premium": await db.users.count_documents({"subscription_tier": {"$nin": ["free", None]}}),
+        "transactions_total": await db.payment_transactions.estimated_document_count(),
+        "transactions_completed": await db.payment_transactions.count_documents({"status": "COMPLETED"}),
+        "reconciled_at": datetime.now(timezone.utc)
+    }
+
+async def run_counter_reconciler():
+    """Background task: correct any counter drift (e.g. writes made outside the API) on a fixed period"""
+    while True:
+        try:
+            if await acquire_lease(COUNTER_RECONCILE_LEASE_NAME, COUNTER_RECONCILE_SECONDS * 2):
+                await reconcile_counters()
+                await rebuild_performance_stats()
+        except Exception as e:
+            logger.error(f"Counter reconciliation error: {e}")
+        await asyncio.sleep(COUNTER_RECONCILE_SECONDS)
+
 # ===================== FOREX & CRYPTO DATA =====================
 
 FOREX_PAIRS = [
@@ -190,6 +700,8 @@ ALL_PAIRS = FOREX_PAIRS + CRYPTO_PAIRS
 
 TIMEFRAMES = ["1M", "5M", "15M", "30M", "1H", "4H", "1D", "1W"]
 
+TIMEFRAME_MINUTES = {"1M": 1, "5M": 5, "15M": 15, "30M": 30, "1H": 60, "4H": 240, "1D": 1440, "1W": 10080}
+
 # Market sessions with times (UTC)
 MARKET_SESSIONS = {
     "sydney": {"open": 22, "close": 7, "name": "Sydney", "pairs": ["AUD/USD", "NZD/USD", "AUD/JPY", "AUD/CAD", "NZD/JPY"]},
@@ -207,94 +719,215 @@ COINGECKO_IDS = {
     "DOGE": "dogecoin"
 }
 
-async def fetch_crypto_prices():
-    """Fetch real crypto prices from CoinGecko"""
-    global crypto_cache
-    
-    # Check cache (update every 30 seconds)
-    if crypto_cache["last_update"]:
-        elapsed = (datetime.now(timezone.utc) - crypto_cache["last_update"]).total_seconds()
-        if elapsed < 30 and crypto_cache["data"]:
-            return crypto_cache["data"]
-    
+# Reference prices the simulated quotes oscillate around
+FOREX_BASE_PRICES = {
+    "EUR/USD": 1.0850, "GBP/USD": 1.2650, "USD/JPY": 149.50, "USD/CHF": 0.8750,
+    "AUD/USD": 0.6550, "USD/CAD": 1.3650, "NZD/USD": 0.6150, "EUR/GBP": 0.8580,
+    "EUR/JPY": 162.20, "GBP/JPY": 189.10, "AUD/JPY": 97.90, "EUR/AUD": 1.6550,
+    "GBP/AUD": 1.9300, "EUR/CHF": 0.9500, "GBP/CHF": 1.1070, "AUD/CAD": 0.8950,
+    "NZD/JPY": 91.80, "EUR/NZD": 1.7650, "GBP/NZD": 2.0580, "CHF/JPY": 170.80,
+    "USD/ZAR": 18.50, "USD/TRY": 32.80, "EUR/TRY": 35.60
+}
+
+CRYPTO_BASE_PRICES = {
+    "BTC/USD": 97500, "ETH/USD": 3400, "XRP/USD": 2.35,
+    "BTC/EUR": 92000, "ETH/BTC": 0.035,
+    "ADA/USD": 0.95, "SOL/USD": 195, "DOGE/USD": 0.32
+}
+
+class Instrument:
+    """Immutable per-pair trading metadata, resolved once at import time"""
+    __slots__ = (
+        "pair_id", "symbol", "base_currency", "quote_currency", "asset_class", "is_crypto",
+        "pip_size", "pip_multiplier", "decimals", "spread", "base_price", "sessions", "coingecko_id"
+    )
+
+    def __init__(self, pair_id: int, symbol: str):
+        base_currency, quote_currency = symbol.split("/")
+        is_crypto = symbol in CRYPTO_PAIRS
+        is_jpy = quote_currency == "JPY"
+        base_price = CRYPTO_BASE_PRICES.get(symbol, 100) if is_crypto else FOREX_BASE_PRICES.get(symbol, 1.0)
+        forex_spread = (0.015 if is_jpy else 0.00015) * (3 if quote_currency in ("ZAR", "TRY") else 1)
+        values = {
+            "pair_id": pair_id,
+            "symbol": symbol,
+            "base_currency": base_currency,
+            "quote_currency": quote_currency,
+            "asset_class": "crypto" if is_crypto else "forex",
+            "is_crypto": is_crypto,
+            # Crypto pips are price-relative, so only forex has a fixed pip size
+            "pip_size": 0.0 if is_crypto else (0.01 if is_jpy else 0.0001),
+            "pip_multiplier": 100 if is_jpy else 10000,
+            "decimals": (2 if base_price > 1 else 6) if is_crypto else (3 if is_jpy else 5),
+            # Absolute full spread for forex; fraction of price on each side for crypto
+            "spread": 0.0001 if is_crypto else forex_spread,
+            "base_price": base_price,
+            "sessions": tuple(key for key, session in MARKET_SESSIONS.items() if symbol in session["pairs"]),
+            "coingecko_id": COINGECKO_IDS.get(base_currency) if is_crypto else None
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Instrument is immutable")
+
+    def price_decimals(self, price: float) -> int:
+        if self.is_crypto:
+            return 2 if price > 1 else 6
+        return self.decimals
+
+INSTRUMENTS: Dict[str, Instrument] = {pair: Instrument(i, pair) for i, pair in enumerate(ALL_PAIRS)}
+INSTRUMENTS_BY_ID = tuple(INSTRUMENTS.values())
+
+CRYPTO_REFRESH_SECONDS = 30
+CRYPTO_STALE_AFTER_SECONDS = 90
+CRYPTO_MAX_BACKOFF_SECONDS = 300
+CRYPTO_COLD_START_TIMEOUT = 5
+
+crypto_refresh_inflight: Optional[asyncio.Task] = None
+
+async def refresh_crypto_prices() -> bool:
+    """Call CoinGecko once and store the result in crypto_cache"""
     try:
-        ids = ",".join(COINGECKO_IDS.values())
-        url = f"https://api.coingecko.com/api/v3/simple/price?ids={ids}&vs_currencies=usd,eur,btc&include_24hr_change=true"
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, timeout=10) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    crypto_cache["data"] = data
-                    crypto_cache["last_update"] = datetime.now(timezone.utc)
-                    return data
+        response = await coingecko_http.request("GET", "/simple/price", params={
+            "ids": ",".join(COINGECKO_IDS.values()),
+            "vs_currencies": "usd,eur,btc",
+            "include_24hr_change": "true"
+        })
+        if response.status_code == 200:
+            crypto_cache["data"] = response.json()
+            crypto_cache["last_update"] = datetime.now(timezone.utc)
+            crypto_cache["last_error"] = None
+            return True
+        crypto_cache["last_error"] = f"HTTP {response.status_code}"
     except Exception as e:
-        logger.error(f"CoinGecko fetch error: {e}")
-    
-    return crypto_cache.get("data", {})
+        crypto_cache["last_error"] = str(e) or type(e).__name__
+    logger.error(f"CoinGecko fetch error: {crypto_cache['last_error']}")
+    return False
+
+def refresh_crypto_prices_once() -> asyncio.Task:
+    """Single-flight: concurrent callers share the refresh that is already running"""
+    global crypto_refresh_inflight
+    if crypto_refresh_inflight is None or crypto_refresh_inflight.done():
+        crypto_refresh_inflight = asyncio.create_task(refresh_crypto_prices())
+    return crypto_refresh_inflight
+
+def crypto_cache_age() -> Optional[float]:
+    if not crypto_cache["last_update"]:
+        return None
+    return (datetime.now(timezone.utc) - crypto_cache["last_update"]).total_seconds()
+
+def crypto_cache_is_stale() -> bool:
+    age = crypto_cache_age()
+    return age is None or age > CRYPTO_STALE_AFTER_SECONDS
+
+async def fetch_crypto_prices(wait: bool = True):
+    """Read CoinGecko prices from the cache kept warm by run_crypto_refresher"""
+    inflight = crypto_refresh_inflight
+    if wait and not crypto_cache["data"] and inflight is not None and not inflight.done():
+        # Cold start: join the refresher's call (briefly); only run_crypto_refresher starts one,
+        # so callers never bypass its backoff. Until data arrives crypto is priced as simulated.
+        try:
+            await asyncio.wait_for(asyncio.shield(inflight), CRYPTO_COLD_START_TIMEOUT)
+        except asyncio.TimeoutError:
+            pass
+    return crypto_cache["data"]
+
+async def run_crypto_refresher():
+    """Background task that owns the CoinGecko call, backing off while it fails"""
+    delay = CRYPTO_REFRESH_SECONDS
+    while True:
+        if await refresh_crypto_prices_once():
+            delay = CRYPTO_REFRESH_SECONDS
+        else:
+            delay = min(delay * 2, CRYPTO_MAX_BACKOFF_SECONDS)
+        await asyncio.sleep(delay)
+
+# Hour-of-week indexes (Monday 00:00 UTC = 0); the forex week runs Sunday 22:00 to Friday 22:00 UTC
+HOURS_PER_WEEK = 168
+FOREX_WEEK_OPEN_HOUR = 6 * 24 + 22
+FOREX_WEEK_CLOSE_HOUR = 4 * 24 + 22
+
+def forex_open_at(hour_of_week: int) -> bool:
+    return hour_of_week >= FOREX_WEEK_OPEN_HOUR or hour_of_week < FOREX_WEEK_CLOSE_HOUR
+
+def session_open_at(session: dict, hour_of_day: int) -> bool:
+    open_hour = session["open"]
+    close_hour = session["close"]
+    if open_hour > close_hour:
+        return hour_of_day >= open_hour or hour_of_day < close_hour
+    return open_hour <= hour_of_day < close_hour
+
+def build_session_calendar() -> tuple:
+    """Open sessions for every hour of the week, plus hours until the next change of state"""
+    states = tuple(
+        tuple(
+            key for key, session in MARKET_SESSIONS.items()
+            if forex_open_at(hour) and session_open_at(session, hour % 24)
+        )
+        for hour in range(HOURS_PER_WEEK)
+    )
+    hours_to_change = []
+    for hour in range(HOURS_PER_WEEK):
+        step = 1
+        while step < HOURS_PER_WEEK and states[(hour + step) % HOURS_PER_WEEK] == states[hour]:
+            step += 1
+        hours_to_change.append(step)
+    return states, tuple(hours_to_change)
 
-def get_market_status():
-    """Get current market open/close status"""
-    now = datetime.now(timezone.utc)
-    current_hour = now.hour
-    day_of_week = now.weekday()
-    
-    if day_of_week >= 5:
-        return {
-            "forex_open": False,
-            "crypto_open": True,
-            "message": "Forex closed for weekend. Crypto markets 24/7!",
-            "sessions": {k: {"status": "closed", "name": v["name"]} for k, v in MARKET_SESSIONS.items()},
-            "next_open": "Sunday 22:00 UTC (Sydney Open)"
-        }
-    
+SESSION_CALENDAR, SESSION_HOURS_TO_CHANGE = build_session_calendar()
+
+market_status_cache = {"expires_at": None, "payload": None, "etag": None}
+
+def build_market_status(open_sessions: tuple, forex_open: bool, next_transition: datetime) -> dict:
     sessions_status = {}
-    active_sessions = []
-    
     for session_key, session in MARKET_SESSIONS.items():
-        open_hour = session["open"]
-        close_hour = session["close"]
-        
-        if open_hour > close_hour:
-            is_open = current_hour >= open_hour or current_hour < close_hour
-        else:
-            is_open = open_hour <= current_hour < close_hour
-        
+        is_open = session_key in open_sessions
         sessions_status[session_key] = {
             "status": "open" if is_open else "closed",
             "name": session["name"],
-            "open_time": f"{open_hour:02d}:00 UTC",
-            "close_time": f"{close_hour:02d}:00 UTC",
+            "open_time": f"{session['open']:02d}:00 UTC",
+            "close_time": f"{session['close']:02d}:00 UTC",
             "active_pairs": session["pairs"] if is_open else []
         }
-        
-        if is_open:
-            active_sessions.append(session["name"])
     
-    return {
-        "forex_open": len(active_sessions) > 0,
+    status = {
+        "forex_open": forex_open,
         "crypto_open": True,
-        "active_sessions": active_sessions,
+        "active_sessions": [MARKET_SESSIONS[key]["name"] for key in open_sessions],
         "sessions": sessions_status,
-        "server_time": now.strftime("%H:%M UTC"),
-        "best_trading_time": len(active_sessions) >= 2
+        "best_trading_time": len(open_sessions) >= 2,
+        "next_transition": next_transition.isoformat()
     }
+    if not forex_open:
+        status["message"] = "Forex closed for weekend. Crypto markets 24/7!"
+        status["next_open"] = "Sunday 22:00 UTC (Sydney Open)"
+    return status
+
+def get_market_status_entry() -> dict:
+    """Current market status, rebuilt only when the session calendar changes state"""
+    now = datetime.now(timezone.utc)
+    if market_status_cache["expires_at"] and now < market_status_cache["expires_at"]:
+        return market_status_cache
+    
+    hour_of_week = now.weekday() * 24 + now.hour
+    open_sessions = SESSION_CALENDAR[hour_of_week]
+    hour_start = now.replace(minute=0, second=0, microsecond=0)
+    next_transition = hour_start + timedelta(hours=SESSION_HOURS_TO_CHANGE[hour_of_week])
+    
+    payload = build_market_status(open_sessions, forex_open_at(hour_of_week), next_transition)
+    market_status_cache["payload"] = payload
+    market_status_cache["expires_at"] = next_transition
+    market_status_cache["etag"] = f'"ms-{zlib.crc32(json.dumps(payload, sort_keys=True).encode()):08x}"'
+    return market_status_cache
 
 async def get_forex_price(pair: str) -> dict:
     """Get forex price data (simulated with realistic movement)"""
     import random
     import math
     
-    base_prices = {
-        "EUR/USD": 1.0850, "GBP/USD": 1.2650, "USD/JPY": 149.50, "USD/CHF": 0.8750,
-        "AUD/USD": 0.6550, "USD/CAD": 1.3650, "NZD/USD": 0.6150, "EUR/GBP": 0.8580,
-        "EUR/JPY": 162.20, "GBP/JPY": 189.10, "AUD/JPY": 97.90, "EUR/AUD": 1.6550,
-        "GBP/AUD": 1.9300, "EUR/CHF": 0.9500, "GBP/CHF": 1.1070, "AUD/CAD": 0.8950,
-        "NZD/JPY": 91.80, "EUR/NZD": 1.7650, "GBP/NZD": 2.0580, "CHF/JPY": 170.80,
-        "USD/ZAR": 18.50, "USD/TRY": 32.80, "EUR/TRY": 35.60
-    }
-    
-    base = base_prices.get(pair, 1.0)
+    instrument = INSTRUMENTS[pair]
+    decimals = instrument.decimals
     now = datetime.now(timezone.utc)
     
     time_factor = now.timestamp() / 60
@@ -302,188 +935,930 @@ async def get_forex_price(pair: str) -> dict:
     wave2 = math.sin(time_factor * 0.05) * 0.0005
     noise = random.uniform(-0.0002, 0.0002)
     
-    current_price = base * (1 + wave1 + wave2 + noise)
-    
-    spread = 0.00015 if "JPY" not in pair else 0.015
-    if "ZAR" in pair or "TRY" in pair:
-        spread *= 3
+    current_price = instrument.base_price * (1 + wave1 + wave2 + noise)
     
+    spread = instrument.spread
     bid = current_price - spread / 2
     ask = current_price + spread / 2
     
     return {
         "pair": pair,
         "type": "forex",
-        "bid": round(bid, 5 if "JPY" not in pair else 3),
-        "ask": round(ask, 5 if "JPY" not in pair else 3),
-        "price": round(current_price, 5 if "JPY" not in pair else 3),
+        "bid": round(bid, decimals),
+        "ask": round(ask, decimals),
+        "price": round(current_price, decimals),
         "change_24h": round(random.uniform(-1.5, 1.5), 2),
-        "high_24h": round(current_price * 1.008, 5 if "JPY" not in pair else 3),
-        "low_24h": round(current_price * 0.992, 5 if "JPY" not in pair else 3),
+        "high_24h": round(current_price * 1.008, decimals),
+        "low_24h": round(current_price * 0.992, decimals),
         "volume": random.randint(50000, 200000),
         "timestamp": now.isoformat(),
-        "spread_pips": round(spread * (10000 if "JPY" not in pair else 100), 1)
+        "spread_pips": round(spread * instrument.pip_multiplier, 1)
     }
 
+def extract_coin_quote(coin: dict, quote_currency: str) -> tuple:
+    """Pick (price, 24h change) for a quote currency out of a CoinGecko coin entry"""
+    if quote_currency == "EUR":
+        return coin.get("eur", 0), coin.get("eur_24h_change", 0)
+    if quote_currency == "BTC":
+        return coin.get("btc", 0), 0
+    return coin.get("usd", 0), coin.get("usd_24h_change", 0)
+
+# Crypto quotes: half spread as a fraction of price, and the 24h range around live or simulated prices
+CRYPTO_HALF_SPREAD = 0.0001
+CRYPTO_LIVE_RANGE = 0.02
+CRYPTO_SIMULATED_RANGE = 0.03
+
+def crypto_spread(price):
+    """(half spread, quoted spread_pips) of a crypto price; works on a scalar or a column of prices"""
+    half_spread = price * CRYPTO_HALF_SPREAD
+    return half_spread, np.round(half_spread * 100, 2)
+
 async def get_crypto_price(pair: str) -> dict:
-    """Get real crypto price from CoinGecko"""
-    base_currency = pair.split("/")[0]
-    quote_currency = pair.split("/")[1]
-    
+    """Get real crypto price from CoinGecko, simulated around the base price when it has none"""
+    import random
+    instrument = INSTRUMENTS[pair]
     crypto_data = await fetch_crypto_prices()
-    coin_id = COINGECKO_IDS.get(base_currency)
+    coin_id = instrument.coingecko_id
     
+    price, change = 0, 0
     if coin_id and coin_id in crypto_data:
-        coin = crypto_data[coin_id]
-        
-        if quote_currency == "USD":
-            price = coin.get("usd", 0)
-            change = coin.get("usd_24h_change", 0)
-        elif quote_currency == "EUR":
-            price = coin.get("eur", 0)
-            change = coin.get("eur_24h_change", 0)
-        elif quote_currency == "BTC":
-            price = coin.get("btc", 0)
-            change = 0
-        else:
-            price = coin.get("usd", 0)
-            change = coin.get("usd_24h_change", 0)
-        
-        if price > 0:
-            import random
-            spread = price * 0.0001
-            
-            return {
-                "pair": pair,
-                "type": "crypto",
-                "bid": round(price - spread, 2 if price > 1 else 6),
-                "ask": round(price + spread, 2 if price > 1 else 6),
-                "price": round(price, 2 if price > 1 else 6),
-                "change_24h": round(change, 2) if change else round(random.uniform(-3, 3), 2),
-                "high_24h": round(price * 1.02, 2 if price > 1 else 6),
-                "low_24h": round(price * 0.98, 2 if price > 1 else 6),
-                "volume": random.randint(100000, 1000000),
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "spread_pips": round(spread * 100, 2),
-                "source": "coingecko"
-            }
-    
-    # Fallback to simulated
-    base_prices = {
-        "BTC/USD": 97500, "ETH/USD": 3400, "XRP/USD": 2.35,
-        "BTC/EUR": 92000, "ETH/BTC": 0.035,
-        "ADA/USD": 0.95, "SOL/USD": 195, "DOGE/USD": 0.32
-    }
-    
-    import random
-    base = base_prices.get(pair, 100)
-    price = base * (1 + random.uniform(-0.01, 0.01))
-    
-    return {
+        price, change = extract_coin_quote(crypto_data[coin_id], instrument.quote_currency)
+    is_live = price > 0
+    if not is_live:
+        price, change = instrument.base_price * (1 + random.uniform(-0.01, 0.01)), 0
+    
+    half_spread, spread_pips = crypto_spread(price)
+    range_pct = CRYPTO_LIVE_RANGE if is_live else CRYPTO_SIMULATED_RANGE
+    # Rounded the way the bulk board rounds, so a pair quotes the same through either path
+    bid, ask, price_rounded, high, low = round_columns(
+        np.array([price - half_spread, price + half_spread, price, price * (1 + range_pct), price * (1 - range_pct)]),
+        instrument.price_decimals(price)
+    ).tolist()
+    quote = {
         "pair": pair,
         "type": "crypto",
-        "bid": round(price * 0.9999, 2 if price > 1 else 6),
-        "ask": round(price * 1.0001, 2 if price > 1 else 6),
-        "price": round(price, 2 if price > 1 else 6),
-        "change_24h": round(random.uniform(-5, 5), 2),
-        "high_24h": round(price * 1.03, 2 if price > 1 else 6),
-        "low_24h": round(price * 0.97, 2 if price > 1 else 6),
+        "bid": bid,
+        "ask": ask,
+        "price": price_rounded,
+        "change_24h": round(change, 2) if change else round(random.uniform(-5, 5), 2),
+        "high_24h": high,
+        "low_24h": low,
         "volume": random.randint(100000, 1000000),
         "timestamp": datetime.now(timezone.utc).isoformat(),
-        "spread_pips": 1,
-        "source": "simulated"
+        "spread_pips": float(spread_pips),
+        "source": "coingecko" if is_live else "simulated"
     }
+    if is_live:
+        quote["stale"] = crypto_cache_is_stale()
+    return quote
 
 async def get_price(pair: str) -> dict:
     """Get price for any pair (forex or crypto)"""
-    if pair in CRYPTO_PAIRS:
+    if INSTRUMENTS[pair].is_crypto:
         return await get_crypto_price(pair)
     return await get_forex_price(pair)
 
-async def get_historical_prices(pair: str, timeframe: str = "1H", limit: int = 100) -> List[dict]:
-    """Generate detailed historical price data"""
-    import random
-    import math
+# ===================== BULK QUOTES =====================
+
+QUOTE_IS_CRYPTO = np.array([instrument.is_crypto for instrument in INSTRUMENTS_BY_ID])
+QUOTE_BASE_PRICES = np.array([instrument.base_price for instrument in INSTRUMENTS_BY_ID])
+QUOTE_FOREX_SPREADS = np.array([0.0 if instrument.is_crypto else instrument.spread for instrument in INSTRUMENTS_BY_ID])
+QUOTE_PIP_MULTIPLIERS = np.array([instrument.pip_multiplier for instrument in INSTRUMENTS_BY_ID])
+
+quote_rng = np.random.default_rng()
+
+def round_columns(values: np.ndarray, decimals: np.ndarray) -> np.ndarray:
+    scale = np.power(10.0, decimals)
+    return np.round(values * scale) / scale
+
+def compute_bulk_quotes(pairs: List[str], crypto_data: dict) -> dict:
+    """Price a set of pairs in one vectorized pass, returned as columns"""
+    idx = np.fromiter((INSTRUMENTS[pair].pair_id for pair in pairs), dtype=np.intp, count=len(pairs))
+    n = len(idx)
+    is_crypto = QUOTE_IS_CRYPTO[idx]
+    now = datetime.now(timezone.utc)
+    
+    time_factor = now.timestamp() / 60
+    wave = np.sin(time_factor * 0.1) * 0.001 + np.sin(time_factor * 0.05) * 0.0005
+    forex_price = QUOTE_BASE_PRICES[idx] * (1 + wave + quote_rng.uniform(-0.0002, 0.0002, n))
+    
+    # Live CoinGecko prices where available, simulated around the base price otherwise
+    live_price = np.zeros(n)
+    live_change = np.full(n, np.nan)
+    for i in np.flatnonzero(is_crypto):
+        instrument = INSTRUMENTS[pairs[i]]
+        coin = crypto_data.get(instrument.coingecko_id)
+        if coin:
+            price, change = extract_coin_quote(coin, instrument.quote_currency)
+            live_price[i] = price
+            live_change[i] = change if change else np.nan
+    is_live = live_price > 0
+    crypto_price = np.where(is_live, live_price, QUOTE_BASE_PRICES[idx] * (1 + quote_rng.uniform(-0.01, 0.01, n)))
+    
+    price = np.where(is_crypto, crypto_price, forex_price)
+    crypto_half_spread, crypto_spread_pips = crypto_spread(price)
+    half_spread = np.where(is_crypto, crypto_half_spread, QUOTE_FOREX_SPREADS[idx] / 2)
+    decimals = np.fromiter(
+        (INSTRUMENTS[pair].price_decimals(value) for pair, value in zip(pairs, price.tolist())), dtype=np.int64, count=n
+    )
+    range_pct = np.where(is_crypto, np.where(is_live, CRYPTO_LIVE_RANGE, CRYPTO_SIMULATED_RANGE), 0.008)
     
-    is_crypto = pair in CRYPTO_PAIRS
+    change = np.where(
+        is_crypto,
+        np.where(np.isnan(live_change), quote_rng.uniform(-5, 5, n), live_change),
+        quote_rng.uniform(-1.5, 1.5, n)
+    )
+    volume = np.where(is_crypto, quote_rng.integers(100000, 1000000, n), quote_rng.integers(50000, 200000, n))
+    spread_pips = np.where(
+        is_crypto,
+        crypto_spread_pips,
+        np.round(half_spread * 2 * QUOTE_PIP_MULTIPLIERS[idx], 1)
+    )
     
-    if is_crypto:
-        base_prices = {
-            "BTC/USD": 97500, "ETH/USD": 3400, "XRP/USD": 2.35,
-            "BTC/EUR": 92000, "ETH/BTC": 0.035,
-            "ADA/USD": 0.95, "SOL/USD": 195, "DOGE/USD": 0.32
-        }
-    else:
-        base_prices = {
-            "EUR/USD": 1.0850, "GBP/USD": 1.2650, "USD/JPY": 149.50
+    return {
+        "pairs": list(pairs),
+        "type": np.where(is_crypto, "crypto", "forex").tolist(),
+        "bid": round_columns(price - half_spread, decimals).tolist(),
+        "ask": round_columns(price + half_spread, decimals).tolist(),
+        "price": round_columns(price, decimals).tolist(),
+        "change_24h": np.round(change, 2).tolist(),
+        "high_24h": round_columns(price * (1 + range_pct), decimals).tolist(),
+        "low_24h": round_columns(price * (1 - range_pct), decimals).tolist(),
+        "volume": volume.tolist(),
+        "spread_pips": spread_pips.tolist(),
+        "timestamp": now.isoformat()
+    }
+
+async def get_bulk_prices(pairs: List[str], wait: bool = True) -> dict:
+    if not any(INSTRUMENTS[pair].is_crypto for pair in pairs):
+        return compute_bulk_quotes(pairs, {})
+    board = compute_bulk_quotes(pairs, await fetch_crypto_prices(wait))
+    board["crypto_stale"] = crypto_cache_is_stale()
+    return board
+
+def iter_bulk_quotes(board: dict):
+    """Expand a columnar board into per-pair quote dicts shaped like get_price"""
+    for i, pair in enumerate(board["pairs"]):
+        yield pair, {
+            "pair": pair,
+            "type": board["type"][i],
+            "bid": board["bid"][i],
+            "ask": board["ask"][i],
+            "price": board["price"][i],
+            "change_24h": board["change_24h"][i],
+            "high_24h": board["high_24h"][i],
+            "low_24h": board["low_24h"][i],
+            "volume": board["volume"][i],
+            "timestamp": board["timestamp"],
+            "spread_pips": board["spread_pips"][i]
         }
+
+# ===================== HISTORICAL PRICES =====================
+
+HISTORY_MAX_LIMIT = 5000
+
+# Bars are aligned to multiples of their interval since the epoch; weekly bars start on Monday
+TIMEFRAME_OFFSET_MINUTES = {"1W": 4 * 1440}
+
+def pair_timeframe_seed(pair: str, timeframe: str) -> int:
+    return zlib.crc32(f"{pair}|{timeframe}".encode())
+
+def hash_uniform(seed: int, stream: int, bar_index: np.ndarray) -> np.ndarray:
+    """Counter-based (splitmix64) uniform [0, 1) draws, one per (seed, stream, bar index)"""
+    with np.errstate(over="ignore"):
+        z = bar_index.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+        z ^= np.uint64((seed << 8 | stream) & 0xFFFFFFFFFFFFFFFF)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        z ^= z >> np.uint64(31)
+    return (z >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+HISTORY_NOISE_TAPS = 64
+HISTORY_NOISE_WEIGHTS = 0.9 ** np.arange(HISTORY_NOISE_TAPS)
+HISTORY_NOISE_WEIGHTS /= np.sqrt(np.sum(HISTORY_NOISE_WEIGHTS ** 2) / 3)
+HISTORY_CYCLE_BARS = np.array([60.0, 240.0, 1000.0])
+HISTORY_CYCLE_WEIGHTS = np.array([0.3, 0.6, 1.0])
+
+def generate_candles(pair: str, timeframe: str, first_bar: int, count: int) -> dict:
+    """Vectorized OHLCV columns for bars [first_bar, first_bar + count); identical for identical inputs"""
+    instrument = INSTRUMENTS[pair]
+    base = instrument.base_price
+    seed = pair_timeframe_seed(pair, timeframe)
+    deviation = 0.05 if instrument.is_crypto else 0.005
     
-    base = base_prices.get(pair, 1.0 if not is_crypto else 100)
+    # One extra leading bar so each open can be the previous close
+    bars = np.arange(first_bar - 1, first_bar + count, dtype=np.int64)
     
-    timeframe_minutes = {"1M": 1, "5M": 5, "15M": 15, "30M": 30, "1H": 60, "4H": 240, "1D": 1440, "1W": 10080}
-    interval = timeframe_minutes.get(timeframe, 60)
+    # Smooth, locally trending noise: an exponentially weighted window of per-bar draws
+    history = np.arange(bars[0] - HISTORY_NOISE_TAPS + 1, bars[-1] + 1, dtype=np.int64)
+    draws = hash_uniform(seed, 0, history) * 2 - 1
+    noise = np.convolve(draws, HISTORY_NOISE_WEIGHTS, mode="valid")
     
-    prices = []
-    current_time = datetime.now(timezone.utc)
-    price = base
+    phases = hash_uniform(seed, 1, np.arange(len(HISTORY_CYCLE_BARS))) * 2 * np.pi
+    cycles = np.sin(bars[:, None] * (2 * np.pi / HISTORY_CYCLE_BARS) + phases) @ HISTORY_CYCLE_WEIGHTS
     
-    trend = random.choice([-1, 1])
-    volatility = 0.02 if is_crypto else 0.002
+    closes = base * (1 + deviation * (0.5 * noise + 0.5 * cycles))
+    open_price = closes[:-1]
+    close_price = closes[1:]
     
-    for i in range(limit):
-        timestamp = current_time - timedelta(minutes=interval * (limit - i))
-        
-        trend_change = trend * random.uniform(0, 0.0003) * price
-        vol = random.uniform(-volatility, volatility) * price
-        mean_reversion = (base - price) * 0.005
-        
-        price = price + trend_change + vol + mean_reversion
-        
-        body_size = abs(random.gauss(0, 0.001)) * price
-        wick_size = abs(random.gauss(0, 0.0005)) * price
-        
-        if random.random() > 0.5:
-            open_price = price - body_size / 2
-            close_price = price + body_size / 2
+    body_top = np.maximum(open_price, close_price)
+    body_bottom = np.minimum(open_price, close_price)
+    wick_scale = deviation * 0.1 * close_price
+    high = body_top + hash_uniform(seed, 2, bars[1:]) * wick_scale
+    low = body_bottom - hash_uniform(seed, 3, bars[1:]) * wick_scale
+    volume = 1000 + (hash_uniform(seed, 4, bars[1:]) * 14000).astype(np.int64)
+    
+    return {"bars": bars[1:], "open": open_price, "high": high, "low": low, "close": close_price, "volume": volume}
+
+def timeframe_bar_index(timeframe: str, when: datetime) -> int:
+    minutes = int(when.timestamp() // 60) - TIMEFRAME_OFFSET_MINUTES.get(timeframe, 0)
+    return minutes // TIMEFRAME_MINUTES[timeframe]
+
+def bar_open_time(timeframe: str, bar_index: np.ndarray) -> np.ndarray:
+    return (bar_index * TIMEFRAME_MINUTES[timeframe] + TIMEFRAME_OFFSET_MINUTES.get(timeframe, 0)) * 60
+
+def price_decimals(pair: str, price: float) -> int:
+    return INSTRUMENTS[pair].price_decimals(price)
+
+async def get_historical_prices(pair: str, timeframe: str = "1H", limit: int = 100) -> List[dict]:
+    """Deterministic OHLC history: the most recent `limit` closed bars for the pair and timeframe"""
+    if timeframe not in TIMEFRAME_MINUTES:
+        timeframe = "1H"
+    limit = max(1, min(limit, HISTORY_MAX_LIMIT))
+    
+    last_closed = timeframe_bar_index(timeframe, datetime.now(timezone.utc)) - 1
+    candles = generate_candles(pair, timeframe, last_closed - limit + 1, limit)
+    decimals = INSTRUMENTS[pair].decimals
+    
+    columns = zip(
+        bar_open_time(timeframe, candles["bars"]).tolist(),
+        np.round(candles["open"], decimals).tolist(),
+        np.round(candles["high"], decimals).tolist(),
+        np.round(candles["low"], decimals).tolist(),
+        np.round(candles["close"], decimals).tolist(),
+        candles["volume"].tolist()
+    )
+    return [
+        {"time": t, "open": o, "high": h, "low": l, "close": c, "volume": v}
+        for t, o, h, l, c, v in columns
+    ]
+
+# ===================== TICK STORE =====================
+
+TICK_INTERVAL_SECONDS = 1.0
+TICK_BUFFER_SIZE = 3600
+
+class TickRingBuffer:
+    """Fixed-size ring buffer of quotes backed by preallocated column arrays"""
+    __slots__ = ("capacity", "bid", "ask", "price", "timestamp", "head", "count")
+
+    def __init__(self, capacity: int = TICK_BUFFER_SIZE):
+        self.capacity = capacity
+        self.bid = np.zeros(capacity, dtype=np.float64)
+        self.ask = np.zeros(capacity, dtype=np.float64)
+        self.price = np.zeros(capacity, dtype=np.float64)
+        self.timestamp = np.zeros(capacity, dtype=np.float64)
+        self.head = 0
+        self.count = 0
+
+    def append(self, bid: float, ask: float, price: float, timestamp: float):
+        i = self.head
+        self.bid[i] = bid
+        self.ask[i] = ask
+        self.price[i] = price
+        self.timestamp[i] = timestamp
+        self.head = (i + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def _window(self, column: np.ndarray, n: int) -> np.ndarray:
+        start = self.head - n
+        if start >= 0:
+            return column[start:self.head]
+        return np.concatenate((column[start:], column[:self.head]))
+
+    def last(self, n: int) -> Dict[str, np.ndarray]:
+        """Return the newest n ticks, oldest first"""
+        n = max(0, min(n, self.count))
+        return {
+            "bid": self._window(self.bid, n),
+            "ask": self._window(self.ask, n),
+            "price": self._window(self.price, n),
+            "timestamp": self._window(self.timestamp, n)
+        }
+
+tick_store: Dict[str, TickRingBuffer] = {pair: TickRingBuffer() for pair in ALL_PAIRS}
+
+def record_tick(pair: str, quote: dict):
+    """Append a quote produced by get_price to the pair's ring buffer and candle aggregator"""
+    timestamp = datetime.now(timezone.utc).timestamp()
+    tick_store[pair].append(quote["bid"], quote["ask"], quote["price"], timestamp)
+    feed_candles(pair, quote["price"], timestamp)
+
+def get_recent_ticks(pair: str, limit: int = 60) -> List[dict]:
+    window = tick_store[pair].last(limit)
+    return [
+        {"time": int(ts), "bid": bid, "ask": ask, "price": price, "close": price}
+        for ts, bid, ask, price in zip(
+            window["timestamp"].tolist(), window["bid"].tolist(),
+            window["ask"].tolist(), window["price"].tolist()
+        )
+    ]
+
+async def sample_all_ticks():
+    # Never stall the tick on a cold crypto cache; those quotes stay simulated until the refresher lands
+    board = await get_bulk_prices(ALL_PAIRS, wait=False)
+    for pair, quote in iter_bulk_quotes(board):
+        record_tick(pair, quote)
+        price_hub.publish(pair, quote)
+        signal_book.on_quote(pair, quote["price"])
+        price_alert_book.on_quote(pair, quote["price"])
+
+async def run_tick_producer():
+    """Background task that keeps every pair's tick buffer filled"""
+    while True:
+        try:
+            await sample_all_ticks()
+        except Exception as e:
+            logger.error(f"Tick producer error: {e}")
+        await asyncio.sleep(TICK_INTERVAL_SECONDS)
+
+# ===================== PRICE STREAMING =====================
+
+STREAM_HEARTBEAT_SECONDS = 15
+
+class StreamSubscriber:
+    """One streaming connection; only the newest undelivered quote per pair is kept"""
+    __slots__ = ("stream_id", "pairs", "pending", "ready", "dropped")
+
+    def __init__(self):
+        self.stream_id = f"stream_{uuid.uuid4().hex[:12]}"
+        self.pairs = set()
+        self.pending: Dict[str, dict] = {}
+        self.ready = asyncio.Event()
+        self.dropped = 0
+
+    def offer(self, pair: str, quote: dict):
+        if pair in self.pending:
+            self.dropped += 1
+        self.pending[pair] = quote
+        self.ready.set()
+
+    def drain(self) -> Dict[str, dict]:
+        batch = self.pending
+        self.pending = {}
+        self.ready.clear()
+        return batch
+
+class PriceStreamHub:
+    """Fans out producer quotes to every stream subscribed to a pair"""
+
+    def __init__(self):
+        self.channels: Dict[str, set] = {pair: set() for pair in ALL_PAIRS}
+        self.streams: Dict[str, StreamSubscriber] = {}
+
+    def open(self, pairs: List[str]) -> StreamSubscriber:
+        subscriber = StreamSubscriber()
+        self.streams[subscriber.stream_id] = subscriber
+        self.subscribe(subscriber, pairs)
+        return subscriber
+
+    def close(self, subscriber: StreamSubscriber):
+        self.unsubscribe(subscriber, list(subscriber.pairs))
+        self.streams.pop(subscriber.stream_id, None)
+
+    def subscribe(self, subscriber: StreamSubscriber, pairs: List[str]):
+        for pair in pairs:
+            self.channels[pair].add(subscriber)
+            subscriber.pairs.add(pair)
+
+    def unsubscribe(self, subscriber: StreamSubscriber, pairs: List[str]):
+        for pair in pairs:
+            self.channels[pair].discard(subscriber)
+            subscriber.pairs.discard(pair)
+            subscriber.pending.pop(pair, None)
+
+    def publish(self, pair: str, quote: dict):
+        for subscriber in self.channels[pair]:
+            subscriber.offer(pair, quote)
+
+    def stats(self) -> dict:
+        return {
+            "streams": len(self.streams),
+            "subscriptions": sum(len(subs) for subs in self.channels.values()),
+            "dropped_ticks": sum(s.dropped for s in self.streams.values())
+        }
+
+price_hub = PriceStreamHub()
+
+def parse_pair_list(pairs: Optional[List[str]]) -> List[str]:
+    """Normalize "EUR-USD" style pair lists, rejecting unknown pairs"""
+    if not pairs:
+        return list(ALL_PAIRS)
+    parsed = []
+    for pair in pairs:
+        pair = pair.strip().replace("-", "/")
+        if pair not in INSTRUMENTS:
+            raise HTTPException(status_code=400, detail=f"Invalid currency pair: {pair}")
+        if pair not in parsed:
+            parsed.append(pair)
+    return parsed
+
+def format_sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+# ===================== LEASES =====================
+
+LEASE_TTL_SECONDS = 30
+WORKER_ID = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+async def acquire_lease(name: str, ttl_seconds: float = LEASE_TTL_SECONDS) -> bool:
+    """Take or renew a named lease; only one worker instance holds it at a time"""
+    now = datetime.now(timezone.utc)
+    try:
+        doc = await db.scheduler_locks.find_one_and_update(
+            {"_id": name, "$or": [{"owner": WORKER_ID}, {"expires_at": {"$lt": now}}]},
+            {"$set": {"owner": WORKER_ID, "expires_at": now + timedelta(seconds=ttl_seconds)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        return False
+    return doc is not None and doc["owner"] == WORKER_ID
+
+async def release_lease(name: str):
+    await db.scheduler_locks.delete_one({"_id": name, "owner": WORKER_ID})
+
+# ===================== CANDLE STORE =====================
+
+CANDLE_BACKFILL_DAYS = int(os.environ.get('CANDLE_BACKFILL_DAYS', '90'))
+CANDLE_BACKFILL_BARS = 1000
+# Fewest bars a cold backfill leaves per timeframe: enough for the chart and to seed indicators
+CANDLE_MIN_BARS = 300
+CANDLE_MINUTE_RETENTION_DAYS = 7
+CANDLE_FLUSH_SECONDS = 5
+# The time-series collection cannot enforce uniqueness, so only the lease holder writes bars
+CANDLE_LEASE_NAME = "candle_store"
+CANDLE_MAX_PENDING = 100000
+
+HIGHER_TIMEFRAMES = TIMEFRAMES[1:]
+
+def minute_to_bar_index(timeframe: str, minute: int) -> int:
+    return (minute - TIMEFRAME_OFFSET_MINUTES.get(timeframe, 0)) // TIMEFRAME_MINUTES[timeframe]
+
+def bar_last_minute(timeframe: str, bar_index: int) -> int:
+    return (bar_index + 1) * TIMEFRAME_MINUTES[timeframe] + TIMEFRAME_OFFSET_MINUTES.get(timeframe, 0) - 1
+
+def candle_doc(pair: str, timeframe: str, bar: list) -> dict:
+    bar_index, open_price, high, low, close, volume = bar
+    meta = {"pair": pair, "timeframe": timeframe}
+    if timeframe == "1M":
+        # Before MongoDB 7.0 time-series deletes may filter only on the metaField, so retention keys on the day here
+        meta["day"] = bar_index // 1440
+    return {
+        "time": datetime.fromtimestamp(int(bar_open_time(timeframe, bar_index)), tz=timezone.utc),
+        "meta": meta,
+        "open": open_price,
+        "high": high,
+        "low": low,
+        "close": close,
+        "volume": volume
+    }
+
+def resample_minute_bars(timeframe: str, minutes: np.ndarray, o, h, l, c, v) -> tuple:
+    """Group consecutive 1M bars into timeframe bars; returns columns plus a per-bar 'complete' mask"""
+    bar_index = minute_to_bar_index(timeframe, minutes)
+    starts = np.flatnonzero(np.r_[True, bar_index[1:] != bar_index[:-1]])
+    ends = np.r_[starts[1:], len(minutes)] - 1
+    idx = bar_index[starts]
+    complete = minutes[ends] == bar_last_minute(timeframe, idx)
+    return (
+        idx, o[starts], np.maximum.reduceat(h, starts), np.minimum.reduceat(l, starts),
+        c[ends], np.add.reduceat(v, starts), complete
+    )
+
+class CandleAggregator:
+    """Builds 1M bars from ticks and rolls each closed minute into every higher timeframe"""
+    __slots__ = ("pair", "forming", "last_stored")
+
+    def __init__(self, pair: str, last_stored: Dict[str, int]):
+        self.pair = pair
+        self.forming: Dict[str, list] = {}
+        self.last_stored = last_stored
+
+    def emit(self, timeframe: str, bar: list, closed: List[dict]):
+        if bar[0] > self.last_stored.get(timeframe, -1):
+            self.last_stored[timeframe] = bar[0]
+            closed.append(candle_doc(self.pair, timeframe, bar))
+            update_indicators(self.pair, timeframe, bar)
+
+    def on_tick(self, price: float, minute: int) -> List[dict]:
+        closed = []
+        bar = self.forming.get("1M")
+        if bar is not None and bar[0] != minute:
+            self.close_minute(closed)
+            bar = None
+        if bar is None:
+            self.forming["1M"] = [minute, price, price, price, price, 1]
         else:
-            open_price = price + body_size / 2
-            close_price = price - body_size / 2
+            bar[2] = max(bar[2], price)
+            bar[3] = min(bar[3], price)
+            bar[4] = price
+            bar[5] += 1
+        return closed
+
+    def close_minute(self, closed: List[dict]):
+        minute_bar = self.forming.pop("1M")
+        self.emit("1M", minute_bar, closed)
+        minute, open_price, high, low, close, volume = minute_bar
+        for timeframe in HIGHER_TIMEFRAMES:
+            bar_index = minute_to_bar_index(timeframe, minute)
+            bar = self.forming.get(timeframe)
+            if bar is not None and bar[0] != bar_index:
+                # A gap skipped this bar's last minute; close it with what it has
+                self.emit(timeframe, self.forming.pop(timeframe), closed)
+                bar = None
+            if bar is None:
+                self.forming[timeframe] = [bar_index, open_price, high, low, close, volume]
+            else:
+                bar[2] = max(bar[2], high)
+                bar[3] = min(bar[3], low)
+                bar[4] = close
+                bar[5] += volume
+            if minute == bar_last_minute(timeframe, bar_index):
+                self.emit(timeframe, self.forming.pop(timeframe), closed)
+
+candle_aggregators: Dict[str, CandleAggregator] = {}
+candle_write_buffer: List[dict] = []
+
+def feed_candles(pair: str, price: float, timestamp: float):
+    aggregator = candle_aggregators.get(pair)
+    if aggregator is not None:
+        candle_write_buffer.extend(aggregator.on_tick(price, int(timestamp // 60)))
+
+async def ensure_candle_collection():
+    try:
+        await db.create_collection(
+            "candles",
+            timeseries={"timeField": "time", "metaField": "meta", "granularity": "minutes"}
+        )
+    except CollectionInvalid:
+        pass
+    except OperationFailure as e:
+        logger.warning(f"Candle time-series collection unavailable, using a regular collection: {e}")
+    await db.candles.create_index([("meta.pair", 1), ("meta.timeframe", 1), ("time", -1)])
+
+# Bars a cold backfill keeps per timeframe: the 90-day window capped at CANDLE_BACKFILL_BARS, never under CANDLE_MIN_BARS
+CANDLE_BACKFILL_TARGETS = {
+    timeframe: max(CANDLE_MIN_BARS, min(CANDLE_BACKFILL_BARS, CANDLE_BACKFILL_DAYS * 1440 // TIMEFRAME_MINUTES[timeframe]))
+    for timeframe in TIMEFRAMES
+}
+CANDLE_BACKFILL_CHUNK_WEEKS = 26
+
+def week_start_minute(minute: int) -> int:
+    return bar_last_minute("1W", minute_to_bar_index("1W", minute) - 1) + 1
+
+def build_backfill(pair: str, end_minute: int) -> tuple:
+    """Generate one 1M path up to end_minute and resample it into every timeframe, so bars line up across
+    timeframes and each one's open is the previous close; keeps CANDLE_BACKFILL_TARGETS bars per timeframe"""
+    first_bar = {timeframe: minute_to_bar_index(timeframe, end_minute) - CANDLE_BACKFILL_TARGETS[timeframe] for timeframe in TIMEFRAMES}
+    first_minute = week_start_minute(min(bar_last_minute(timeframe, bar - 1) + 1 for timeframe, bar in first_bar.items()))
+    decimals = price_decimals(pair, INSTRUMENTS[pair].base_price)
+    
+    docs = []
+    forming = {}
+    last_stored = {}
+    # Week-aligned chunks never split a bar of any timeframe, and the generator is counter-based, so chunks join seamlessly
+    chunk_minutes = CANDLE_BACKFILL_CHUNK_WEEKS * TIMEFRAME_MINUTES["1W"]
+    for start in range(first_minute, end_minute, chunk_minutes):
+        count = min(chunk_minutes, end_minute - start)
+        candles = generate_candles(pair, "1M", start, count)
+        minutes = candles["bars"]
+        columns = [np.round(candles[key], decimals) for key in ("open", "high", "low", "close")]
+        volume = candles["volume"]
+        for timeframe in TIMEFRAMES:
+            if timeframe == "1M":
+                bars = (minutes, *columns, volume, np.ones(count, dtype=bool))
+            else:
+                bars = resample_minute_bars(timeframe, minutes, *columns, volume)
+            idx, o, h, l, c, v, complete = bars
+            keep = complete & (idx >= first_bar[timeframe])
+            for row in zip(idx[keep].tolist(), o[keep].tolist(), h[keep].tolist(), l[keep].tolist(), c[keep].tolist(), v[keep].tolist()):
+                docs.append(candle_doc(pair, timeframe, list(row)))
+            if idx[keep].size:
+                last_stored[timeframe] = int(idx[keep][-1])
+            if not complete[-1]:
+                forming[timeframe] = [int(idx[-1]), float(o[-1]), float(h[-1]), float(l[-1]), float(c[-1]), int(v[-1])]
+    return docs, forming, last_stored
+
+async def resume_forming(pair: str, last_stored: Dict[str, int]) -> Dict[str, list]:
+    """Rebuild the higher-timeframe bars still forming at the last stored 1M bar from the stored 1M bars.
+    Downtime is left as a gap: generated bars would not match the amplitude of bars built from live ticks."""
+    if "1M" not in last_stored:
+        return {}
+    since = datetime.fromtimestamp(week_start_minute(last_stored["1M"]) * 60, tz=timezone.utc)
+    docs = await db.candles.find(
+        {"meta.pair": pair, "meta.timeframe": "1M", "time": {"$gte": since}},
+        {"_id": 0, "time": 1, "open": 1, "high": 1, "low": 1, "close": 1, "volume": 1}
+    ).sort("time", 1).to_list(None)
+    if not docs:
+        return {}
+    minutes = np.array([int(doc["time"].replace(tzinfo=timezone.utc).timestamp() // 60) for doc in docs])
+    columns = [np.array([doc[key] for doc in docs], dtype=np.float64) for key in ("open", "high", "low", "close")]
+    volume = np.array([doc["volume"] for doc in docs], dtype=np.int64)
+    
+    forming = {}
+    for timeframe in HIGHER_TIMEFRAMES:
+        idx, o, h, l, c, v, complete = resample_minute_bars(timeframe, minutes, *columns, volume)
+        if not complete[-1] and idx[-1] > last_stored.get(timeframe, -1):
+            forming[timeframe] = [int(idx[-1]), float(o[-1]), float(h[-1]), float(l[-1]), float(c[-1]), int(v[-1])]
+    return forming
+
+async def backfill_candles(pair: str, write: bool = True):
+    """Seed a pair's candles on first start, or pick up where the stored bars end, and start live aggregation"""
+    last_stored = {}
+    for timeframe in TIMEFRAMES:
+        latest = await db.candles.find_one(
+            {"meta.pair": pair, "meta.timeframe": timeframe},
+            {"_id": 0, "time": 1},
+            sort=[("time", -1)]
+        )
+        if latest:
+            stored_minute = int(latest["time"].replace(tzinfo=timezone.utc).timestamp() // 60)
+            last_stored[timeframe] = minute_to_bar_index(timeframe, stored_minute)
+    
+    if last_stored:
+        forming = await resume_forming(pair, last_stored)
+    else:
+        end_minute = timeframe_bar_index("1M", datetime.now(timezone.utc))
+        docs, forming, last_stored = await asyncio.to_thread(build_backfill, pair, end_minute)
+        if write:
+            for start in range(0, len(docs), 5000):
+                await db.candles.insert_many(docs[start:start + 5000], ordered=False)
+    
+    aggregator = CandleAggregator(pair, last_stored)
+    aggregator.forming = forming
+    candle_aggregators[pair] = aggregator
+
+async def flush_candles():
+    global candle_write_buffer
+    if not candle_write_buffer:
+        return
+    batch, candle_write_buffer = candle_write_buffer, []
+    try:
+        await db.candles.insert_many(batch, ordered=False)
+    except Exception as e:
+        logger.error(f"Candle flush error: {e}")
+        if len(candle_write_buffer) + len(batch) <= CANDLE_MAX_PENDING:
+            candle_write_buffer[:0] = batch
+
+async def prune_minute_candles():
+    cutoff_day = timeframe_bar_index("1M", datetime.now(timezone.utc)) // 1440 - CANDLE_MINUTE_RETENTION_DAYS
+    await db.candles.delete_many({"meta.timeframe": "1M", "meta.day": {"$lt": cutoff_day}})
+
+async def backfill_all_candles(write: bool):
+    for pair in ALL_PAIRS:
+        try:
+            await backfill_candles(pair, write)
+            for timeframe in TIMEFRAMES:
+                await seed_indicators(pair, timeframe)
+        except Exception as e:
+            logger.error(f"Candle backfill error for {pair}: {e}")
+
+async def run_candle_store():
+    """Background task: prepare the collection, backfill every pair, then persist closed bars.
+    Every worker aggregates its own ticks for indicators; only the lease holder writes candles."""
+    global candle_write_buffer
+    await ensure_candle_collection()
+    try:
+        leader = await acquire_lease(CANDLE_LEASE_NAME)
+    except Exception as e:
+        logger.error(f"Candle store lease error: {e}")
+        leader = False
+    await backfill_all_candles(write=leader)
+    last_prune = 0.0
+    try:
+        while True:
+            await asyncio.sleep(CANDLE_FLUSH_SECONDS)
+            try:
+                was_leader, leader = leader, await acquire_lease(CANDLE_LEASE_NAME)
+            except Exception as e:
+                logger.error(f"Candle store lease error: {e}")
+                leader = False
+            if not leader:
+                candle_write_buffer = []
+                continue
+            if not was_leader:
+                # Resume from what the previous holder stored rather than this worker's own bars
+                candle_write_buffer = []
+                await backfill_all_candles(write=True)
+            await flush_candles()
+            if time.monotonic() - last_prune > 3600:
+                try:
+                    await prune_minute_candles()
+                except Exception as e:
+                    logger.error(f"Candle prune error: {e}")
+                last_prune = time.monotonic()
+    finally:
+        try:
+            await release_lease(CANDLE_LEASE_NAME)
+        except Exception:
+            pass
+
+async def read_candles(pair: str, timeframe: str, limit: int, start: Optional[int] = None, end: Optional[int] = None) -> List[dict]:
+    """Indexed range read of stored candles; newest `limit` bars unless only `start` is given"""
+    time_range = {}
+    if start is not None:
+        time_range["$gte"] = datetime.fromtimestamp(start, tz=timezone.utc)
+    if end is not None:
+        time_range["$lte"] = datetime.fromtimestamp(end, tz=timezone.utc)
+    query = {"meta.pair": pair, "meta.timeframe": timeframe}
+    if time_range:
+        query["time"] = time_range
+    
+    newest_first = start is None or end is not None
+    docs = await db.candles.find(query, {"_id": 0, "meta": 0}).sort(
+        "time", -1 if newest_first else 1
+    ).limit(limit).to_list(limit)
+    if newest_first:
+        docs.reverse()
+    for doc in docs:
+        doc["time"] = int(doc["time"].replace(tzinfo=timezone.utc).timestamp())
+    return docs
+
+# ===================== INDICATORS =====================
+
+INDICATOR_BACKFILL_BARS = 300
+INDICATOR_WINDOW = 50
+RSI_PERIOD = 14
+ATR_PERIOD = 14
+BOLLINGER_PERIOD = 20
+BOLLINGER_STDDEV = 2
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+
+def ema_alpha(period: int) -> float:
+    return 2 / (period + 1)
+
+def ema_series(values: np.ndarray, alpha: float, chunk: int = 128) -> np.ndarray:
+    """Exponential moving average of a series seeded with its first value, vectorized per chunk"""
+    out = np.empty(len(values))
+    prev = values[0]
+    for start in range(0, len(values), chunk):
+        x = values[start:start + chunk]
+        decay = (1 - alpha) ** np.arange(1, len(x) + 1)
+        out[start:start + len(x)] = decay * (prev + alpha * np.cumsum(x / decay))
+        prev = out[start + len(x) - 1]
+    return out
+
+class IndicatorState:
+    """Running indicator state for one (pair, timeframe), advanced in O(1) per closed bar"""
+    __slots__ = (
+        "ema_fast", "ema_slow", "ema_20", "ema_50", "macd_signal", "avg_gain", "avg_loss", "atr",
+        "prev_close", "window", "head", "count", "sum_20", "sum_50", "sumsq_20", "updated_at"
+    )
+
+    def __init__(self, opens: np.ndarray, highs: np.ndarray, lows: np.ndarray, closes: np.ndarray):
+        """Backfill every indicator from candle history in one vectorized pass"""
+        ema_fast = ema_series(closes, ema_alpha(MACD_FAST))
+        ema_slow = ema_series(closes, ema_alpha(MACD_SLOW))
+        self.ema_fast = float(ema_fast[-1])
+        self.ema_slow = float(ema_slow[-1])
+        self.macd_signal = float(ema_series(ema_fast - ema_slow, ema_alpha(MACD_SIGNAL))[-1])
+        self.ema_20 = float(ema_series(closes, ema_alpha(20))[-1])
+        self.ema_50 = float(ema_series(closes, ema_alpha(50))[-1])
         
-        high = max(open_price, close_price) + wick_size
-        low = min(open_price, close_price) - wick_size
+        prev_closes = np.r_[opens[0], closes[:-1]]
+        changes = closes - prev_closes
+        self.avg_gain = float(ema_series(np.maximum(changes, 0), 1 / RSI_PERIOD)[-1])
+        self.avg_loss = float(ema_series(np.maximum(-changes, 0), 1 / RSI_PERIOD)[-1])
+        true_range = np.maximum(highs - lows, np.maximum(np.abs(highs - prev_closes), np.abs(lows - prev_closes)))
+        self.atr = float(ema_series(true_range, 1 / ATR_PERIOD)[-1])
         
-        decimals = 2 if is_crypto and base > 1 else (3 if "JPY" in pair else 5)
+        tail = closes[-INDICATOR_WINDOW:]
+        self.window = np.zeros(INDICATOR_WINDOW)
+        self.window[:len(tail)] = tail
+        self.head = len(tail) % INDICATOR_WINDOW
+        self.count = len(closes)
+        self.prev_close = float(closes[-1])
+        self.resum()
+        self.updated_at = datetime.now(timezone.utc)
+
+    def resum(self):
+        last_20 = self.recent(BOLLINGER_PERIOD)
+        self.sum_20 = float(last_20.sum())
+        self.sumsq_20 = float((last_20 ** 2).sum())
+        self.sum_50 = float(self.recent(INDICATOR_WINDOW).sum())
+
+    def recent(self, n: int) -> np.ndarray:
+        n = min(n, self.count, INDICATOR_WINDOW)
+        return self.window[(self.head - n + np.arange(n)) % INDICATOR_WINDOW]
+
+    def update(self, high: float, low: float, close: float):
+        high, low, close = float(high), float(low), float(close)
+        change = close - self.prev_close
+        self.avg_gain += (max(change, 0) - self.avg_gain) / RSI_PERIOD
+        self.avg_loss += (max(-change, 0) - self.avg_loss) / RSI_PERIOD
+        true_range = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.atr += (true_range - self.atr) / ATR_PERIOD
         
-        prices.append({
-            "time": int(timestamp.timestamp()),
-            "open": round(open_price, decimals),
-            "high": round(high, decimals),
-            "low": round(low, decimals),
-            "close": round(close_price, decimals),
-            "volume": random.randint(1000, 15000)
-        })
-    
-    return prices
+        self.ema_fast += ema_alpha(MACD_FAST) * (close - self.ema_fast)
+        self.ema_slow += ema_alpha(MACD_SLOW) * (close - self.ema_slow)
+        self.macd_signal += ema_alpha(MACD_SIGNAL) * (self.ema_fast - self.ema_slow - self.macd_signal)
+        self.ema_20 += ema_alpha(20) * (close - self.ema_20)
+        self.ema_50 += ema_alpha(50) * (close - self.ema_50)
+        
+        leaving_20 = self.window[(self.head - BOLLINGER_PERIOD) % INDICATOR_WINDOW] if self.count >= BOLLINGER_PERIOD else 0.0
+        leaving_50 = self.window[self.head] if self.count >= INDICATOR_WINDOW else 0.0
+        self.sum_20 += close - leaving_20
+        self.sumsq_20 += close * close - leaving_20 * leaving_20
+        self.sum_50 += close - leaving_50
+        self.window[self.head] = close
+        self.head = (self.head + 1) % INDICATOR_WINDOW
+        self.count += 1
+        self.prev_close = close
+        if self.count % 1000 == 0:
+            # Drop accumulated floating-point drift from the running sums
+            self.resum()
+        self.updated_at = datetime.now(timezone.utc)
+
+    def snapshot(self, decimals: int) -> dict:
+        n_20 = min(self.count, BOLLINGER_PERIOD)
+        sma_20 = self.sum_20 / n_20
+        sma_50 = self.sum_50 / min(self.count, INDICATOR_WINDOW)
+        stddev_20 = max(self.sumsq_20 / n_20 - sma_20 * sma_20, 0) ** 0.5
+        rsi = 100.0 if self.avg_loss == 0 else 100 - 100 / (1 + self.avg_gain / self.avg_loss)
+        macd = self.ema_fast - self.ema_slow
+        return {
+            "rsi": round(rsi, 2),
+            "macd": round(macd, decimals),
+            "macd_signal": round(self.macd_signal, decimals),
+            "macd_histogram": round(macd - self.macd_signal, decimals),
+            "ema_20": round(self.ema_20, decimals),
+            "ema_50": round(self.ema_50, decimals),
+            "sma_20": round(sma_20, decimals),
+            "sma_50": round(sma_50, decimals),
+            "trend": "BULLISH" if self.ema_20 > self.ema_50 else "BEARISH",
+            "atr": round(self.atr, decimals),
+            "bollinger_upper": round(sma_20 + BOLLINGER_STDDEV * stddev_20, decimals),
+            "bollinger_lower": round(sma_20 - BOLLINGER_STDDEV * stddev_20, decimals),
+            "bollinger_middle": round(sma_20, decimals),
+            "updated_at": self.updated_at.isoformat()
+        }
+
+indicator_states: Dict[tuple, IndicatorState] = {}
+
+async def seed_indicators(pair: str, timeframe: str) -> IndicatorState:
+    if pair in candle_aggregators:
+        candles = await read_candles(pair, timeframe, INDICATOR_BACKFILL_BARS)
+    else:
+        candles = await get_historical_prices(pair, timeframe, INDICATOR_BACKFILL_BARS)
+    if not candles:
+        candles = await get_historical_prices(pair, timeframe, INDICATOR_BACKFILL_BARS)
+    columns = {key: np.array([c[key] for c in candles], dtype=np.float64) for key in ("open", "high", "low", "close")}
+    state = IndicatorState(columns["open"], columns["high"], columns["low"], columns["close"])
+    indicator_states[(pair, timeframe)] = state
+    return state
+
+def update_indicators(pair: str, timeframe: str, bar: list):
+    state = indicator_states.get((pair, timeframe))
+    if state is not None:
+        state.update(bar[2], bar[3], bar[4])
+
+async def get_indicators(pair: str, timeframe: str) -> dict:
+    state = indicator_states.get((pair, timeframe))
+    if state is None:
+        state = await seed_indicators(pair, timeframe)
+    return state.snapshot(price_decimals(pair, state.prev_close))
 
 # ===================== SIGNAL GENERATION =====================
 
-async def generate_ai_signal(pair: str, timeframe: str) -> dict:
+def render_rationale(signal: dict) -> str:
+    """Templated rationale; v2 documents omit it and rebuild it from the signal fields on read"""
+    market_bias = signal["market_bias"]
+    signal_type = signal["signal_type"]
+    drivers = 'Crypto volatility' if signal.get("asset_type") == "crypto" else 'Key support/resistance levels'
+    return (
+        f"Technical analysis indicates {market_bias.lower()} momentum on {signal['currency_pair']}. "
+        f"{drivers} suggests {signal_type.lower()} opportunity with {signal['confidence']}% confidence."
+    )
+
+async def generate_ai_signal(pair: str, timeframe: str, price_data: Optional[dict] = None) -> dict:
     """Generate AI trading signal with prediction"""
     import random
     
-    price_data = await get_price(pair)
+    if price_data is None:
+        price_data = await get_price(pair)
     current_price = price_data["price"]
-    is_crypto = pair in CRYPTO_PAIRS
+    instrument = INSTRUMENTS[pair]
+    is_crypto = instrument.is_crypto
+    decimals = 2 if is_crypto else instrument.decimals
     
     prediction_direction = random.choice([-1, 1])
     
-    if is_crypto:
-        pip_value = current_price * 0.001
-    else:
-        pip_value = 0.0001 if "JPY" not in pair else 0.01
+    pip_value = current_price * 0.001 if is_crypto else instrument.pip_size
     
     predicted_change = prediction_direction * random.randint(2, 10) * pip_value
-    predicted_price = round(current_price + predicted_change, 2 if is_crypto else (3 if "JPY" in pair else 5))
+    predicted_price = round(current_price + predicted_change, decimals)
     prediction_time = (datetime.now(timezone.utc) + timedelta(minutes=1)).isoformat()
     
     if predicted_price > current_price * 1.0002:
@@ -502,21 +1877,19 @@ async def generate_ai_signal(pair: str, timeframe: str) -> dict:
     tp_pips = random.randint(30, 80)
     
     if signal_type == "BUY":
-        stop_loss = round(current_price - (sl_pips * pip_value), 2 if is_crypto else 5)
-        take_profit = round(current_price + (tp_pips * pip_value), 2 if is_crypto else 5)
+        stop_loss = round(current_price - (sl_pips * pip_value), decimals)
+        take_profit = round(current_price + (tp_pips * pip_value), decimals)
     elif signal_type == "SELL":
-        stop_loss = round(current_price + (sl_pips * pip_value), 2 if is_crypto else 5)
-        take_profit = round(current_price - (tp_pips * pip_value), 2 if is_crypto else 5)
+        stop_loss = round(current_price + (sl_pips * pip_value), decimals)
+        take_profit = round(current_price - (tp_pips * pip_value), decimals)
     else:
-        stop_loss = round(current_price - (sl_pips * pip_value), 2 if is_crypto else 5)
-        take_profit = round(current_price + (tp_pips * pip_value), 2 if is_crypto else 5)
-    
-    ai_rationale = f"Technical analysis indicates {market_bias.lower()} momentum on {pair}. {'Crypto volatility' if is_crypto else 'Key support/resistance levels'} suggests {signal_type.lower()} opportunity with {confidence}% confidence."
+        stop_loss = round(current_price - (sl_pips * pip_value), decimals)
+        take_profit = round(current_price + (tp_pips * pip_value), decimals)
     
     timeframe_hours = {"1M": 0.25, "5M": 0.5, "15M": 1, "30M": 2, "1H": 4, "4H": 16, "1D": 48, "1W": 168}
     expires_in = timeframe_hours.get(timeframe, 4)
     
-    return {
+    signal = {
         "signal_id": f"sig_{uuid.uuid4().hex[:12]}",
         "currency_pair": pair,
         "asset_type": "crypto" if is_crypto else "forex",
@@ -527,7 +1900,6 @@ async def generate_ai_signal(pair: str, timeframe: str) -> dict:
         "confidence": confidence,
         "timeframe": timeframe,
         "status": "ACTIVE",
-        "ai_rationale": ai_rationale,
         "market_bias": market_bias,
         "predicted_price": predicted_price,
         "prediction_time": prediction_time,
@@ -535,6 +1907,808 @@ async def generate_ai_signal(pair: str, timeframe: str) -> dict:
         "expires_at": (datetime.now(timezone.utc) + timedelta(hours=expires_in)).isoformat(),
         "is_premium": confidence > 80
     }
+    signal["ai_rationale"] = render_rationale(signal)
+    return signal
+
+DEFAULT_BATCH_PAIRS = FOREX_PAIRS[:7] + CRYPTO_PAIRS[:3]
+DEFAULT_BATCH_TIMEFRAMES = ["1H"]
+BATCH_CONCURRENCY = int(os.environ.get('BATCH_CONCURRENCY', '32'))
+
+async def generate_signal_batch(pairs: List[str], timeframes: List[str]) -> tuple:
+    """Generate signals for pairs x timeframes concurrently and persist them in one write.
+
+    Returns (items, signals) where items carries a status for every requested combination.
+    """
+    items = []
+    valid_pairs = [pair for pair in dict.fromkeys(pairs) if pair in INSTRUMENTS]
+    for pair in dict.fromkeys(pairs):
+        if pair not in INSTRUMENTS:
+            items.append({"pair": pair, "timeframe": None, "status": "invalid", "error": "Invalid currency pair"})
+    for timeframe in dict.fromkeys(timeframes):
+        if timeframe not in TIMEFRAMES:
+            items.append({"pair": None, "timeframe": timeframe, "status": "invalid", "error": "Invalid timeframe"})
+    combos = [(pair, timeframe) for pair in valid_pairs for timeframe in dict.fromkeys(timeframes) if timeframe in TIMEFRAMES]
+    if not combos:
+        return items, []
+    
+    # One bulk pricing pass serves every timeframe of a pair
+    quotes = dict(iter_bulk_quotes(await get_bulk_prices(valid_pairs)))
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    
+    async def generate_one(pair: str, timeframe: str) -> dict:
+        async with semaphore:
+            return await generate_ai_signal(pair, timeframe, quotes[pair])
+    
+    results = await asyncio.gather(
+        *(generate_one(pair, timeframe) for pair, timeframe in combos),
+        return_exceptions=True
+    )
+    
+    signals = []
+    combo_items = []
+    for (pair, timeframe), result in zip(combos, results):
+        if isinstance(result, Exception):
+            logger.warning(f"Batch signal generation failed for {pair} {timeframe}: {result}")
+            combo_items.append({"pair": pair, "timeframe": timeframe, "status": "failed", "error": str(result)})
+            continue
+        combo_items.append({"pair": pair, "timeframe": timeframe, "status": "created", "signal_id": result["signal_id"]})
+        signals.append(result)
+    
+    if signals:
+        failed_writes = {}
+        try:
+            await db.trading_signals.insert_many([encode_signal(signal) for signal in signals], ordered=False)
+        except BulkWriteError as e:
+            failed_writes = {error["index"]: error.get("errmsg", "write failed") for error in e.details.get("writeErrors", [])}
+        if failed_writes:
+            by_signal_id = {item.get("signal_id"): item for item in combo_items}
+            for index, message in failed_writes.items():
+                item = by_signal_id[signals[index]["signal_id"]]
+                item["status"] = "failed"
+                item["error"] = message
+            signals = [signal for i, signal in enumerate(signals) if i not in failed_writes]
+        for signal in signals:
+            signal_book.add(signal)
+        await record_signals_created(signals)
+        enqueue_rationales(signals)
+        alert_fanout.submit([signal for signal in signals if signal["timeframe"] in ALERT_FANOUT_TIMEFRAMES])
+    
+    return items + combo_items, signals
+
+# ===================== RATIONALE PIPELINE =====================
+
+RATIONALE_ENABLED = bool(EMERGENT_LLM_KEY) and os.environ.get('RATIONALE_ENABLED', 'true').lower() == 'true'
+RATIONALE_CONCURRENCY = int(os.environ.get('RATIONALE_CONCURRENCY', '4'))
+RATIONALE_TIMEOUT_SECONDS = float(os.environ.get('RATIONALE_TIMEOUT_SECONDS', '8'))
+RATIONALE_CACHE_SIZE = 512
+RATIONALE_BATCH_SIZE = 16
+RATIONALE_QUEUE_SIZE = 2000
+
+class RationaleCache:
+    """LRU of generated rationales keyed by (pair, timeframe, bias, indicator bucket)"""
+    __slots__ = ("entries", "capacity", "hits", "misses")
+
+    def __init__(self, capacity: int):
+        self.entries: OrderedDict = OrderedDict()
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> Optional[str]:
+        text = self.entries.get(key)
+        if text is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return text
+
+    def put(self, key: tuple, text: str):
+        self.entries[key] = text
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+def indicator_bucket(snapshot: dict) -> tuple:
+    """Coarse indicator regime, so signals in the same market state share a rationale"""
+    rsi = snapshot["rsi"]
+    rsi_zone = "oversold" if rsi < 30 else "overbought" if rsi > 70 else "neutral"
+    momentum = "rising" if snapshot["macd_histogram"] >= 0 else "falling"
+    return rsi_zone, snapshot["trend"].lower(), momentum
+
+class RationalePipeline:
+    """Fills in LLM rationales after signals are stored; the template stays on any failure"""
+    __slots__ = ("queue", "cache", "semaphore", "generated", "fallbacks", "dropped")
+
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=RATIONALE_QUEUE_SIZE)
+        self.cache = RationaleCache(RATIONALE_CACHE_SIZE)
+        self.semaphore = asyncio.Semaphore(RATIONALE_CONCURRENCY)
+        self.generated = 0
+        self.fallbacks = 0
+        self.dropped = 0
+
+    def submit(self, signals: List[dict]):
+        for signal in signals:
+            try:
+                self.queue.put_nowait(signal)
+            except asyncio.QueueFull:
+                self.dropped += 1
+
+    async def complete(self, signal: dict, bucket: tuple) -> Optional[str]:
+        rsi_zone, trend, momentum = bucket
+        prompt = (
+            f"Write a two-sentence trading rationale for a {signal['signal_type']} signal on "
+            f"{signal['currency_pair']} ({signal['timeframe']} chart) with a {signal['market_bias'].lower()} bias. "
+            f"RSI is {rsi_zone}, the EMA trend is {trend} and MACD momentum is {momentum}. "
+            f"Do not quote prices or add disclaimers."
+        )
+        async with self.semaphore:
+            try:
+                response = await asyncio.wait_for(
+                    openai_client.chat.completions.create(
+                        model=LLM_MODEL,
+                        messages=[
+                            {"role": "system", "content": "You are a concise forex and crypto market analyst."},
+                            {"role": "user", "content": prompt}
+                        ],
+                        max_tokens=120
+                    ),
+                    timeout=RATIONALE_TIMEOUT_SECONDS
+                )
+                text = (response.choices[0].message.content or "").strip()
+            except Exception as e:
+                logger.warning(f"Rationale generation failed for {signal['currency_pair']}: {type(e).__name__}")
+                text = ""
+        if not text:
+            self.fallbacks += 1
+            return None
+        self.generated += 1
+        return text
+
+    async def process(self, batch: List[dict]):
+        groups: Dict[tuple, List[dict]] = {}
+        for signal in batch:
+            try:
+                bucket = indicator_bucket(await get_indicators(signal["currency_pair"], signal["timeframe"]))
+            except Exception:
+                bucket = ("neutral", "flat", "flat")
+            key = (signal["currency_pair"], signal["timeframe"], signal["market_bias"], bucket)
+            groups.setdefault(key, []).append(signal)
+        
+        texts = {key: self.cache.get(key) for key in groups}
+        missing = [key for key, text in texts.items() if text is None]
+        # One completion per distinct key in the batch, run concurrently under the semaphore
+        results = await asyncio.gather(*(self.complete(groups[key][0], key[3]) for key in missing))
+        for key, text in zip(missing, results):
+            if text is not None:
+                self.cache.put(key, text)
+                texts[key] = text
+        
+        ops = [
+            UpdateOne({"signal_id": signal["signal_id"]}, {"$set": {"ai_rationale": text, "rationale_source": "llm"}})
+            for key, text in texts.items() if text is not None
+            for signal in groups[key]
+        ]
+        if ops:
+            await db.trading_signals.bulk_write(ops, ordered=False)
+
+    async def run(self):
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < RATIONALE_BATCH_SIZE and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                await self.process(batch)
+            except Exception as e:
+                logger.error(f"Rationale pipeline error: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "enabled": RATIONALE_ENABLED,
+            "model": LLM_MODEL,
+            "queued": self.queue.qsize(),
+            "generated": self.generated,
+            "fallbacks": self.fallbacks,
+            "dropped": self.dropped,
+            "cache": {"size": len(self.cache.entries), "hits": self.cache.hits, "misses": self.cache.misses}
+        }
+
+rationale_pipeline = RationalePipeline()
+
+def enqueue_rationales(signals: List[dict]):
+    if RATIONALE_ENABLED:
+        rationale_pipeline.submit(signals)
+
+# ===================== SIGNAL SCHEDULER =====================
+
+SIGNAL_SCHEDULER_ENABLED = os.environ.get('SIGNAL_SCHEDULER_ENABLED', 'true').lower() == 'true'
+# Sub-hour timeframes would mean tens of thousands of signals a day; list them explicitly to opt in
+SIGNAL_SCHEDULER_TIMEFRAMES = [
+    timeframe for timeframe in os.environ.get('SIGNAL_SCHEDULER_TIMEFRAMES', '1H,4H,1D,1W').split(',')
+    if timeframe in TIMEFRAMES
+]
+SIGNAL_SCHEDULER_JITTER_SECONDS = float(os.environ.get('SIGNAL_SCHEDULER_JITTER_SECONDS', '5'))
+# "latest" generates once for the newest closed bar after downtime, "skip" waits for the next close
+SIGNAL_SCHEDULER_CATCHUP = os.environ.get('SIGNAL_SCHEDULER_CATCHUP', 'latest')
+SCHEDULER_LOCK_NAME = "signal_scheduler"
+SCHEDULER_POLL_SECONDS = 10
+
+def next_bar_close(now: datetime) -> float:
+    """Epoch seconds of the earliest upcoming bar close across the scheduled timeframes"""
+    return min(
+        bar_open_time(timeframe, timeframe_bar_index(timeframe, now) + 1)
+        for timeframe in SIGNAL_SCHEDULER_TIMEFRAMES
+    )
+
+async def run_due_timeframes(last_bars: dict):
+    """Generate one batch for every timeframe whose bar closed since it was last processed"""
+    now = datetime.now(timezone.utc)
+    due = {}
+    generate = []
+    for timeframe in SIGNAL_SCHEDULER_TIMEFRAMES:
+        closed = timeframe_bar_index(timeframe, now) - 1
+        previous = last_bars.get(timeframe)
+        if previous is not None and closed <= previous:
+            continue
+        due[timeframe] = closed
+        missed = previous is None or closed - previous > 1
+        if missed and SIGNAL_SCHEDULER_CATCHUP == "skip":
+            continue
+        generate.append(timeframe)
+    if not due:
+        return
+    
+    if generate:
+        items, signals = await generate_signal_batch(ALL_PAIRS, generate)
+        logger.info(f"Scheduled signals for {','.join(generate)}: {len(signals)} of {len(items)} generated")
+    last_bars.update(due)
+    await db.scheduler_state.update_one(
+        {"_id": SCHEDULER_LOCK_NAME},
+        {"$set": {f"bars.{timeframe}": closed for timeframe, closed in due.items()}},
+        upsert=True
+    )
+
+async def run_signal_scheduler():
+    """Background task: generate signals as each timeframe's bar closes, on the lock holder only"""
+    last_bars = None
+    try:
+        while True:
+            now = time.time()
+            wake_at = min(
+                next_bar_close(datetime.now(timezone.utc)) + random.uniform(0, SIGNAL_SCHEDULER_JITTER_SECONDS),
+                now + SCHEDULER_POLL_SECONDS
+            )
+            await asyncio.sleep(max(wake_at - now, 0))
+            try:
+                if not await acquire_lease(SCHEDULER_LOCK_NAME):
+                    last_bars = None
+                    continue
+                if last_bars is None:
+                    state = await db.scheduler_state.find_one({"_id": SCHEDULER_LOCK_NAME})
+                    last_bars = (state or {}).get("bars", {})
+                await run_due_timeframes(last_bars)
+            except Exception as e:
+                logger.error(f"Signal scheduler error: {e}")
+    finally:
+        try:
+            await release_lease(SCHEDULER_LOCK_NAME)
+        except Exception:
+            pass
+
+# ===================== SIGNAL LIFECYCLE =====================
+
+SIGNAL_LIFECYCLE_FLUSH_SECONDS = 1
+SIGNAL_LIFECYCLE_SYNC_SECONDS = 30
+SIGNAL_BOOK_PROJECTION = {
+    "_id": 0, "signal_id": 1, "currency_pair": 1, "timeframe": 1, "entry_price": 1,
+    "stop_loss": 1, "take_profit": 1, "expires_at": 1
+}
+
+class LevelLadder:
+    """Price levels of one side of a pair's book, kept sorted so triggered levels form a prefix or suffix"""
+    __slots__ = ("levels", "signal_ids")
+
+    def __init__(self):
+        self.levels: List[float] = []
+        self.signal_ids: List[str] = []
+
+    def add(self, level: float, signal_id: str):
+        i = bisect.bisect_right(self.levels, level)
+        self.levels.insert(i, level)
+        self.signal_ids.insert(i, signal_id)
+
+    def remove(self, level: float, signal_id: str):
+        i = bisect.bisect_left(self.levels, level)
+        while i < len(self.levels) and self.levels[i] == level:
+            if self.signal_ids[i] == signal_id:
+                del self.levels[i]
+                del self.signal_ids[i]
+                return
+            i += 1
+
+    def pop_at_or_below(self, price: float) -> List[str]:
+        i = bisect.bisect_right(self.levels, price)
+        triggered = self.signal_ids[:i]
+        del self.levels[:i]
+        del self.signal_ids[:i]
+        return triggered
+
+    def pop_at_or_above(self, price: float) -> List[str]:
+        i = bisect.bisect_left(self.levels, price)
+        triggered = self.signal_ids[i:]
+        del self.levels[i:]
+        del self.signal_ids[i:]
+        return triggered
+
+    def pop_crossed(self, previous: float, price: float) -> List[str]:
+        """Levels passed moving from previous to price; a level equal to previous was crossed on the last move"""
+        if price > previous:
+            i, j = bisect.bisect_right(self.levels, previous), bisect.bisect_right(self.levels, price)
+        else:
+            i, j = bisect.bisect_left(self.levels, price), bisect.bisect_left(self.levels, previous)
+        triggered = self.signal_ids[i:j]
+        del self.levels[i:j]
+        del self.signal_ids[i:j]
+        return triggered
+
+class SignalBook:
+    """In-memory ACTIVE signals per pair; each quote settles the signals whose SL or TP it crossed"""
+    __slots__ = (
+        "entries", "ladders", "expiries", "last_prices", "pending", "recently_closed", "closed"
+    )
+
+    def __init__(self):
+        # signal_id -> (pair, lower level, lower outcome, upper level, upper outcome, timeframe, entry price)
+        self.entries: Dict[str, tuple] = {}
+        # pair -> (levels triggered at or below the price, levels triggered at or above it)
+        self.ladders: Dict[str, tuple] = {}
+        self.expiries: List[tuple] = []
+        self.last_prices: Dict[str, float] = {}
+        # (signal_id, $set of the settlement, status change, rollup delta) awaiting their guarded update
+        self.pending: List[tuple] = []
+        # Ids settled since the previous two syncs, so a sync racing a settlement cannot revive them
+        self.recently_closed: set = set()
+        self.closed: set = set()
+
+    def add(self, signal: dict):
+        signal_id = signal["signal_id"]
+        pair = signal.get("currency_pair")
+        stop_loss = signal.get("stop_loss")
+        take_profit = signal.get("take_profit")
+        if signal_id in self.entries or pair not in INSTRUMENTS or stop_loss is None or take_profit is None:
+            return
+        timeframe = signal.get("timeframe")
+        entry_price = signal.get("entry_price")
+        if stop_loss <= take_profit:
+            entry = (pair, stop_loss, "SL_HIT", take_profit, "TP_HIT", timeframe, entry_price)
+        else:
+            entry = (pair, take_profit, "TP_HIT", stop_loss, "SL_HIT", timeframe, entry_price)
+        self.entries[signal_id] = entry
+        lower, upper = self.ladders.setdefault(pair, (LevelLadder(), LevelLadder()))
+        # Lower levels trigger once the price falls to them, upper levels once it rises to them
+        lower.add(entry[1], signal_id)
+        upper.add(entry[3], signal_id)
+        if signal.get("expires_at"):
+            expires_at = parse_datetime(signal["expires_at"]).timestamp()
+            heapq.heappush(self.expiries, (expires_at, signal_id))
+
+    def discard(self, signal_id: str) -> Optional[tuple]:
+        entry = self.entries.pop(signal_id, None)
+        if entry is not None:
+            lower, upper = self.ladders[entry[0]]
+            lower.remove(entry[1], signal_id)
+            upper.remove(entry[3], signal_id)
+        return entry
+
+    def settle(self, signal_id: str, outcome: str, price: Optional[float]):
+        entry = self.discard(signal_id)
+        self.closed.add(signal_id)
+        closed_at = datetime.now(timezone.utc)
+        stop_loss, take_profit = (entry[1], entry[3]) if entry[2] == "SL_HIT" else (entry[3], entry[1])
+        self.pending.append((
+            signal_id,
+            {"status": SIGNAL_ENUMS["status"][outcome], "exit_price": price, "closed_at": closed_at},
+            (entry[0], entry[5], "ACTIVE", outcome),
+            rollup_delta({
+                "currency_pair": entry[0], "entry_price": entry[6], "stop_loss": stop_loss,
+                "take_profit": take_profit, "exit_price": price, "closed_at": closed_at
+            }, outcome, 1)
+        ))
+
+    def on_quote(self, pair: str, price: float):
+        self.last_prices[pair] = price
+        ladders = self.ladders.get(pair)
+        if ladders is None:
+            return
+        lower, upper = ladders
+        for signal_id in lower.pop_at_or_above(price):
+            self.settle(signal_id, self.entries[signal_id][2], price)
+        for signal_id in upper.pop_at_or_below(price):
+            entry = self.entries.get(signal_id)
+            if entry is not None:
+                self.settle(signal_id, entry[4], price)
+
+    def expire(self, now: float):
+        while self.expiries and self.expiries[0][0] <= now:
+            _, signal_id = heapq.heappop(self.expiries)
+            entry = self.entries.get(signal_id)
+            if entry is not None:
+                self.settle(signal_id, "EXPIRED", self.last_prices.get(entry[0]))
+
+    async def flush(self):
+        if not self.pending:
+            return
+        settlements, self.pending = self.pending, []
+        # One guarded update per signal, so only the settlements this worker actually applied are counted;
+        # a signal another worker settled first simply matches nothing
+        results = await asyncio.gather(*(
+            db.trading_signals.update_one(
+                {"signal_id": signal_id, "status": enum_in(SIGNAL_ENUMS, "status", "ACTIVE")},
+                {"$set": fields}
+            )
+            for signal_id, fields, _, _ in settlements
+        ), return_exceptions=True)
+        changes, rollups, failed = [], [], []
+        for settlement, result in zip(settlements, results):
+            if isinstance(result, Exception):
+                failed.append(settlement)
+                error = result
+            elif result.modified_count:
+                changes.append(settlement[2])
+                rollups.append(settlement[3])
+        if failed:
+            logger.error(f"Signal settlement write failed for {len(failed)} signals, retrying: {error}")
+            self.pending = failed + self.pending
+        try:
+            await record_status_changes(changes)
+            await record_daily_rollups(rollups)
+        except Exception as e:
+            logger.error(f"Performance stats update failed: {e}")
+
+    async def sync(self, since: Optional[datetime] = None):
+        """Load ACTIVE signals created or reopened by other workers (or all of them on the first sync)"""
+        query = {"status": enum_in(SIGNAL_ENUMS, "status", "ACTIVE")}
+        if since is not None:
+            query["$or"] = [{"created_at": {"$gte": since}}, {"reopened_at": {"$gte": since}}]
+        skip = self.recently_closed | self.closed
+        async for signal in db.trading_signals.find(query, SIGNAL_BOOK_PROJECTION):
+            if signal["signal_id"] not in skip:
+                self.add(signal)
+        self.recently_closed, self.closed = self.closed, set()
+
+signal_book = SignalBook()
+
+async def run_signal_lifecycle():
+    """Background task: expire and persist settlements, and pick up signals created elsewhere"""
+    while True:
+        try:
+            await signal_book.sync()
+            break
+        except Exception as e:
+            logger.error(f"Signal book load error: {e}")
+            await asyncio.sleep(SIGNAL_LIFECYCLE_SYNC_SECONDS)
+    last_sync = time.monotonic()
+    while True:
+        await asyncio.sleep(SIGNAL_LIFECYCLE_FLUSH_SECONDS)
+        signal_book.expire(time.time())
+        await signal_book.flush()
+        if time.monotonic() - last_sync >= SIGNAL_LIFECYCLE_SYNC_SECONDS:
+            since = datetime.now(timezone.utc) - timedelta(seconds=2 * SIGNAL_LIFECYCLE_SYNC_SECONDS)
+            try:
+                await signal_book.sync(since)
+            except Exception as e:
+                logger.error(f"Signal book sync error: {e}")
+            last_sync = time.monotonic()
+
+# ===================== PRICE ALERTS =====================
+
+PRICE_ALERT_CONDITIONS = ("above", "below", "cross")
+# Active price alerts allowed per tier; tiers not listed are unlimited
+PRICE_ALERT_LIMITS = {"free": 0, "pro": 10}
+PRICE_ALERT_FLUSH_SECONDS = 1
+PRICE_ALERT_SYNC_SECONDS = 30
+PRICE_ALERT_PROJECTION = {"_id": 0, "alert_id": 1, "user_id": 1, "currency_pair": 1, "condition": 1, "level": 1}
+
+class PriceAlertBook:
+    """Active price alerts per pair, one sorted ladder per condition, so a quote only touches the levels it crossed"""
+    __slots__ = ("entries", "ladders", "last_prices", "pending", "notifications", "recently_fired", "fired")
+
+    def __init__(self):
+        # alert_id -> (pair, condition, level, user_id)
+        self.entries: Dict[str, tuple] = {}
+        # pair -> {condition: LevelLadder}
+        self.ladders: Dict[str, Dict[str, LevelLadder]] = {}
+        self.last_prices: Dict[str, float] = {}
+        self.pending: List[UpdateOne] = []
+        self.notifications: List[dict] = []
+        # Ids fired since the previous two loads, so a load racing a flush cannot revive them
+        self.recently_fired: set = set()
+        self.fired: set = set()
+
+    def add(self, alert: dict):
+        alert_id = alert["alert_id"]
+        pair = alert["currency_pair"]
+        if alert_id in self.entries or pair not in INSTRUMENTS:
+            return
+        self.entries[alert_id] = (pair, alert["condition"], alert["level"], alert["user_id"])
+        ladders = self.ladders.setdefault(pair, {condition: LevelLadder() for condition in PRICE_ALERT_CONDITIONS})
+        ladders[alert["condition"]].add(alert["level"], alert_id)
+
+    def discard(self, alert_id: str):
+        entry = self.entries.pop(alert_id, None)
+        if entry is not None:
+            self.ladders[entry[0]][entry[1]].remove(entry[2], alert_id)
+
+    def fire(self, alert_id: str, price: float):
+        pair, condition, level, user_id = self.entries.pop(alert_id)
+        self.fired.add(alert_id)
+        now = datetime.now(timezone.utc)
+        verb = {"above": "rose above", "below": "fell below", "cross": "crossed"}[condition]
+        self.pending.append(UpdateOne(
+            {"alert_id": alert_id, "status": "ACTIVE"},
+            {"$set": {"status": "TRIGGERED", "triggered_price": price, "triggered_at": now}}
+        ))
+        # Derived id, so a second worker firing the same alert cannot notify twice
+        self.notifications.append(encode_alert({
+            "alert_id": f"alert_{alert_id}",
+            "user_id": user_id,
+            "price_alert_id": alert_id,
+            "alert_type": "PRICE_ALERT",
+            "message": f"{pair} {verb} {level} (now {price})",
+            "is_read": False,
+            "created_at": now
+        }))
+
+    def on_quote(self, pair: str, price: float):
+        previous = self.last_prices.get(pair)
+        self.last_prices[pair] = price
+        ladders = self.ladders.get(pair)
+        if ladders is None:
+            return
+        triggered = ladders["above"].pop_at_or_below(price) + ladders["below"].pop_at_or_above(price)
+        if previous is not None and previous != price:
+            triggered += ladders["cross"].pop_crossed(previous, price)
+        for alert_id in triggered:
+            self.fire(alert_id, price)
+
+    async def flush(self):
+        if not self.pending:
+            return
+        ops, self.pending = self.pending, []
+        notifications, self.notifications = self.notifications, []
+        try:
+            await db.price_alerts.bulk_write(ops, ordered=False)
+        except Exception as e:
+            logger.error(f"Price alert write failed, retrying: {e}")
+            self.pending = ops + self.pending
+            self.notifications = notifications + self.notifications
+            return
+        failed = set()
+        # Stamped as they are written, not when they fired, so delta sync orders them by arrival
+        written_at = datetime.now(timezone.utc)
+        for notification in notifications:
+            notification["updated_at"] = written_at
+        try:
+            await db.alerts.insert_many(notifications, ordered=False)
+        except BulkWriteError as e:
+            write_errors = e.details.get("writeErrors", [])
+            failed = {error["index"] for error in write_errors}
+            if any(error.get("code") != 11000 for error in write_errors):
+                logger.error(f"Price alert notification write failed: {write_errors[:3]}")
+        unread: Dict[str, int] = {}
+        for i, notification in enumerate(notifications):
+            if i not in failed:
+                unread[notification["user_id"]] = unread.get(notification["user_id"], 0) + 1
+        await bump_unread(unread)
+
+    async def load(self):
+        """Rebuild from the ACTIVE alerts in Mongo, picking up creations and cancellations from other workers"""
+        skip = self.recently_fired | self.fired
+        self.entries, self.ladders = {}, {}
+        async for alert in db.price_alerts.find({"status": "ACTIVE"}, PRICE_ALERT_PROJECTION):
+            if alert["alert_id"] not in skip:
+                self.add(alert)
+        self.recently_fired, self.fired = self.fired, set()
+
+    def stats(self) -> dict:
+        return {"active": len(self.entries), "pairs": len(self.ladders), "pending": len(self.pending)}
+
+price_alert_book = PriceAlertBook()
+
+async def run_price_alerts():
+    """Background task: persist fired price alerts in batches and periodically reload the book"""
+    last_load = None
+    while True:
+        if last_load is None or time.monotonic() - last_load >= PRICE_ALERT_SYNC_SECONDS:
+            try:
+                await price_alert_book.load()
+            except Exception as e:
+                logger.error(f"Price alert load error: {e}")
+            last_load = time.monotonic()
+        await asyncio.sleep(PRICE_ALERT_FLUSH_SECONDS)
+        await price_alert_book.flush()
+
+# ===================== ALERT INBOX =====================
+
+ALERT_RETENTION_DAYS = int(os.environ.get('ALERT_RETENTION_DAYS', '90'))
+ALERT_RETENTION_INTERVAL_SECONDS = 3600
+ALERT_SYNC_MAX = 100
+# updated_at comes from the writer's clock, so a concurrent write can land with a stamp just behind
+# alerts already served; cursors never advance past now minus this window, and clients dedupe by alert_id
+ALERT_SYNC_GRACE_SECONDS = 10
+
+async def bump_unread(deltas: Dict[str, int]):
+    """Apply per-user unread deltas to alert_inbox and stamp when each inbox last changed"""
+    if not deltas:
+        return
+    now = datetime.now(timezone.utc)
+    await db.alert_inbox.bulk_write([
+        UpdateOne({"_id": user_id}, {"$inc": {"unread": delta}, "$max": {"changed_at": now}}, upsert=True)
+        for user_id, delta in deltas.items()
+    ], ordered=False)
+
+async def ensure_alert_inbox():
+    """Seed unread counters from the alerts collection the first time the inbox is used"""
+    if await db.alert_inbox.estimated_document_count() > 0:
+        return
+    now = datetime.now(timezone.utc)
+    ops = [
+        UpdateOne({"_id": row["_id"]}, {"$setOnInsert": {"unread": row["unread"], "changed_at": now}}, upsert=True)
+        async for row in db.alerts.aggregate([
+            {"$match": {"is_read": False}},
+            {"$group": {"_id": "$user_id", "unread": {"$sum": 1}}}
+        ])
+    ]
+    if ops:
+        await db.alert_inbox.bulk_write(ops, ordered=False)
+
+async def expire_alerts(cutoff: datetime) -> int:
+    """Delete alerts created before cutoff; unread ones per user, so each counter drops by exactly what was removed"""
+    result = await db.alerts.delete_many({"created_at": {"$lt": cutoff}, "is_read": True})
+    removed = result.deleted_count
+    for user_id in await db.alerts.distinct("user_id", {"created_at": {"$lt": cutoff}, "is_read": False}):
+        result = await db.alerts.delete_many({"user_id": user_id, "created_at": {"$lt": cutoff}, "is_read": False})
+        await bump_unread({user_id: -result.deleted_count})
+        removed += result.deleted_count
+    return removed
+
+async def run_alert_retention():
+    """Background task: drop alerts older than ALERT_RETENTION_DAYS"""
+    while True:
+        try:
+            removed = await expire_alerts(datetime.now(timezone.utc) - timedelta(days=ALERT_RETENTION_DAYS))
+            if removed:
+                logger.info(f"Alert retention removed {removed} alerts")
+        except Exception as e:
+            logger.error(f"Alert retention error: {e}")
+        await asyncio.sleep(ALERT_RETENTION_INTERVAL_SECONDS)
+
+# ===================== WATCHLIST FAN-OUT =====================
+
+WATCHLIST_SYNC_SECONDS = 60
+ALERT_FANOUT_QUEUE_SIZE = int(os.environ.get('ALERT_FANOUT_QUEUE_SIZE', '1000'))
+ALERT_FANOUT_CHUNK_SIZE = int(os.environ.get('ALERT_FANOUT_CHUNK_SIZE', '1000'))
+# Batch (scheduled) signals reach watchers only on these timeframes; user-requested signals always do
+ALERT_FANOUT_TIMEFRAMES = set(os.environ.get('ALERT_FANOUT_TIMEFRAMES', '4H,1D,1W').split(','))
+# At most one watchlist alert per pair in this window, so a watcher hears about a pair at most that often
+ALERT_FANOUT_PAIR_INTERVAL_SECONDS = float(os.environ.get('ALERT_FANOUT_PAIR_INTERVAL_SECONDS', '900'))
+
+class WatchlistIndex:
+    """Inverted index from pair to the users watching it"""
+    __slots__ = ("subscribers",)
+
+    def __init__(self):
+        self.subscribers: Dict[str, set] = {}
+
+    def add(self, user_id: str, pair: str):
+        self.subscribers.setdefault(pair, set()).add(user_id)
+
+    def remove(self, user_id: str, pair: str):
+        self.subscribers.get(pair, set()).discard(user_id)
+
+    def watchers(self, pair: str) -> List[str]:
+        return list(self.subscribers.get(pair, ()))
+
+    async def load(self):
+        """Rebuild from Mongo and swap in, picking up changes made through other workers"""
+        subscribers: Dict[str, set] = {}
+        async for doc in db.watchlists.find({}, {"_id": 0, "user_id": 1, "pair": 1}):
+            subscribers.setdefault(doc["pair"], set()).add(doc["user_id"])
+        self.subscribers = subscribers
+
+watchlist_index = WatchlistIndex()
+
+class AlertFanout:
+    """Bounded queue of new signals, each written as alerts to every watcher in chunked insert_many calls"""
+    __slots__ = ("queue", "last_sent", "delivered", "dropped", "throttled")
+
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=ALERT_FANOUT_QUEUE_SIZE)
+        self.last_sent: Dict[str, float] = {}
+        self.delivered = 0
+        self.dropped = 0
+        self.throttled = 0
+
+    def submit(self, signals: List[dict], requested_by: Optional[set] = None):
+        """Queue signals for fan-out. requested_by holds the users who asked for the signals and get their own alert;
+        it is None for batch signals, which are throttled per pair, while user-requested ones never are."""
+        now = time.monotonic()
+        for signal in signals:
+            pair = signal["currency_pair"]
+            if requested_by is None and now - self.last_sent.get(pair, float("-inf")) < ALERT_FANOUT_PAIR_INTERVAL_SECONDS:
+                self.throttled += 1
+                continue
+            try:
+                self.queue.put_nowait((signal, requested_by))
+            except asyncio.QueueFull:
+                self.dropped += 1
+                logger.warning(f"Alert fan-out queue full, dropped {signal['signal_id']}")
+                continue
+            self.last_sent[pair] = now
+
+    async def deliver(self, signal: dict, requested_by: Optional[set]):
+        watchers = [user_id for user_id in watchlist_index.watchers(signal["currency_pair"]) if user_id not in (requested_by or ())]
+        message = (
+            f"New {signal['signal_type']} signal for {signal['currency_pair']} on your watchlist "
+            f"with {signal['confidence']}% confidence"
+        )
+        created_at = datetime.now(timezone.utc)
+        for start in range(0, len(watchers), ALERT_FANOUT_CHUNK_SIZE):
+            chunk = watchers[start:start + ALERT_FANOUT_CHUNK_SIZE]
+            failed = set()
+            written_at = datetime.now(timezone.utc)
+            try:
+                await db.alerts.insert_many([encode_alert({
+                    "alert_id": f"alert_{uuid.uuid4().hex[:12]}",
+                    "user_id": user_id,
+                    "signal_id": signal["signal_id"],
+                    "alert_type": "WATCHLIST_SIGNAL",
+                    "message": message,
+                    "is_read": False,
+                    "created_at": created_at,
+                    "updated_at": written_at
+                }) for user_id in chunk], ordered=False)
+            except BulkWriteError as e:
+                # Unordered: everything not listed as an error was inserted and still needs counting
+                write_errors = e.details.get("writeErrors", [])
+                failed = {error["index"] for error in write_errors}
+                logger.error(f"Alert fan-out for {signal['signal_id']} failed for {len(failed)} watchers: {write_errors[:3]}")
+            except Exception as e:
+                logger.error(f"Alert fan-out chunk for {signal['signal_id']} failed: {e}")
+                continue
+            inserted = [user_id for i, user_id in enumerate(chunk) if i not in failed]
+            await bump_unread({user_id: 1 for user_id in inserted})
+            self.delivered += len(inserted)
+
+    async def run(self):
+        while True:
+            signal, requested_by = await self.queue.get()
+            try:
+                await self.deliver(signal, requested_by)
+            except Exception as e:
+                logger.error(f"Alert fan-out error for {signal['signal_id']}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.queue.qsize(),
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "throttled": self.throttled,
+            "watched_pairs": len(watchlist_index.subscribers),
+            "subscriptions": sum(len(users) for users in watchlist_index.subscribers.values())
+        }
+
+alert_fanout = AlertFanout()
+
+async def run_watchlist_sync():
+    """Background task: load the watchlist index, then refresh it periodically"""
+    while True:
+        try:
+            await watchlist_index.load()
+        except Exception as e:
+            logger.error(f"Watchlist index load error: {e}")
+        await asyncio.sleep(WATCHLIST_SYNC_SECONDS)
 
 # ===================== AUTH ROUTES =====================
 
@@ -559,7 +2733,8 @@ async def register(user_data: UserCreate, response: Response):
         "created_at": datetime.now(timezone.utc).isoformat()
     }
     
-    await db.users.insert_one(user_doc)
+    await db.users.insert_one(encode_dates_only(user_doc))
+    await bump_counters(users_total=1, users_premium=int(is_admin))
     
     token = create_jwt_token(user_id, user_data.email, is_admin)
     
@@ -594,7 +2769,8 @@ async def login(credentials: UserLogin, response: Response):
                 "subscription_tier": "premium",
                 "created_at": datetime.now(timezone.utc).isoformat()
             }
-            await db.users.insert_one(user_doc)
+            await db.users.insert_one(encode_dates_only(user_doc))
+            await bump_counters(users_total=1, users_premium=1)
         else:
             raise HTTPException(status_code=401, detail="Invalid credentials")
     elif not verify_password(credentials.password, user_doc.get("password_hash", "")):
@@ -644,18 +2820,18 @@ async def process_oauth_session(request: Request, response: Response):
     if not session_id:
         raise HTTPException(status_code=400, detail="Session ID required")
     
-    async with httpx.AsyncClient() as client:
-        try:
-            resp = await client.get(
-                "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data",
-                headers={"X-Session-ID": session_id}
-            )
-            if resp.status_code != 200:
-                raise HTTPException(status_code=401, detail="Invalid session")
-            oauth_data = resp.json()
-        except Exception as e:
-            logger.error(f"OAuth session error: {e}")
-            raise HTTPException(status_code=401, detail="Authentication failed")
+    try:
+        resp = await oauth_http.request(
+            "GET",
+            "/auth/v1/env/oauth/session-data",
+            headers={"X-Session-ID": session_id}
+        )
+        if resp.status_code != 200:
+            raise HTTPException(status_code=401, detail="Invalid session")
+        oauth_data = resp.json()
+    except Exception as e:
+        logger.error(f"OAuth session error: {e}")
+        raise HTTPException(status_code=401, detail="Authentication failed")
     
     email = oauth_data.get("email")
     name = oauth_data.get("name", "User")
@@ -677,20 +2853,22 @@ async def process_oauth_session(request: Request, response: Response):
             "subscription_tier": "premium" if is_admin else "free",
             "created_at": datetime.now(timezone.utc).isoformat()
         }
-        await db.users.insert_one(user_doc)
+        await db.users.insert_one(encode_dates_only(user_doc))
+        await bump_counters(users_total=1, users_premium=int(is_admin))
     else:
         user_id = user_doc["user_id"]
         await db.users.update_one(
             {"user_id": user_id},
             {"$set": {"name": name, "picture": picture}}
         )
+        auth_cache.invalidate_user(user_id)
     
-    await db.user_sessions.insert_one({
+    await db.user_sessions.insert_one(encode_dates_only({
         "user_id": user_id,
         "session_token": session_token,
-        "expires_at": (datetime.now(timezone.utc) + timedelta(days=7)).isoformat(),
-        "created_at": datetime.now(timezone.utc).isoformat()
-    })
+        "expires_at": datetime.now(timezone.utc) + timedelta(days=7),
+        "created_at": datetime.now(timezone.utc)
+    }))
     
     response.set_cookie(
         key="session_token",
@@ -725,24 +2903,59 @@ async def logout(request: Request, response: Response):
     session_token = request.cookies.get("session_token")
     if session_token:
         await db.user_sessions.delete_one({"session_token": session_token})
+        auth_cache.invalidate_session(session_token)
     response.delete_cookie("session_token", path="/")
     return {"message": "Logged out successfully"}
 
 # ===================== MARKET STATUS ROUTE =====================
 
 @api_router.get("/market/status")
-async def market_status():
-    return get_market_status()
+async def market_status(request: Request, response: Response):
+    entry = get_market_status_entry()
+    max_age = max(int((entry["expires_at"] - datetime.now(timezone.utc)).total_seconds()), 0)
+    headers = {"ETag": entry["etag"], "Cache-Control": f"public, max-age={max_age}"}
+    if request.headers.get("if-none-match") == entry["etag"]:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return entry["payload"]
 
 # ===================== SIGNALS ROUTES =====================
 
+SIGNAL_PAGE_MAX = 100
+# Fields SignalCard renders; view=card returns only these
+SIGNAL_CARD_PROJECTION = {
+    "_id": 0, "signal_id": 1, "currency_pair": 1, "signal_type": 1, "status": 1, "confidence": 1,
+    "timeframe": 1, "entry_price": 1, "stop_loss": 1, "take_profit": 1, "predicted_price": 1,
+    "market_bias": 1, "is_premium": 1, "created_at": 1
+}
+
+def encode_signal_cursor(signal: dict) -> str:
+    payload = json.dumps([signal["created_at"], signal["signal_id"]]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_signal_cursor(cursor: str) -> tuple:
+    try:
+        created_at, signal_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        created_at = parse_datetime(created_at)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # Well-formed JSON of the wrong shape would otherwise reach the query as a non-date bound
+    if not isinstance(created_at, datetime) or not isinstance(signal_id, str):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return created_at, signal_id
+
 @api_router.get("/signals")
 async def get_signals(
+    response: Response,
     pair: Optional[str] = None,
     timeframe: Optional[str] = None,
     status: Optional[str] = None,
     asset_type: Optional[str] = None,
+    signal_type: Optional[str] = None,
     min_confidence: Optional[float] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=SIGNAL_PAGE_MAX),
+    view: str = Query("full", pattern="^(full|card)$"),
     request: Request = None,
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
@@ -756,17 +2969,31 @@ async def get_signals(
     if timeframe:
         query["timeframe"] = timeframe
     if status:
-        query["status"] = status
+        query["status"] = enum_in(SIGNAL_ENUMS, "status", status)
     if asset_type:
-        query["asset_type"] = asset_type
+        query["asset_type"] = enum_in(SIGNAL_ENUMS, "asset_type", asset_type)
+    if signal_type:
+        query["signal_type"] = enum_in(SIGNAL_ENUMS, "signal_type", signal_type)
     if min_confidence:
         query["confidence"] = {"$gte": min_confidence}
-    
-    signals = await db.trading_signals.find(query, {"_id": 0}).sort("created_at", -1).limit(50).to_list(50)
-    
     if not is_premium:
-        signals = [s for s in signals if not s.get("is_premium", False)]
-    
+        query["is_premium"] = {"$ne": True}
+    if cursor:
+        created_at, signal_id = decode_signal_cursor(cursor)
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "signal_id": {"$lt": signal_id}}
+        ]
+    
+    projection = SIGNAL_CARD_PROJECTION if view == "card" else {"_id": 0}
+    # One extra row tells whether another page exists
+    docs = await db.trading_signals.find(query, projection).sort(
+        [("created_at", -1), ("signal_id", -1)]
+    ).limit(limit + 1).to_list(limit + 1)
+    signals = [decode_signal(doc, with_rationale=view == "full") for doc in docs[:limit]]
+    
+    if len(docs) > limit:
+        response.headers["X-Next-Cursor"] = encode_signal_cursor(signals[-1])
     return signals
 
 @api_router.get("/signals/{signal_id}")
@@ -776,6 +3003,7 @@ async def get_signal(signal_id: str, request: Request = None, credentials: HTTPA
     
     if not signal:
         raise HTTPException(status_code=404, detail="Signal not found")
+    signal = decode_signal(signal)
     
     tier = user.get("subscription_tier", "free") if user else "free"
     is_premium = tier in ["pro", "premium"] or (user and user.get("is_admin"))
@@ -784,17 +3012,91 @@ async def get_signal(signal_id: str, request: Request = None, credentials: HTTPA
     
     return signal
 
+SIGNAL_COALESCE_SECONDS = float(os.environ.get('SIGNAL_COALESCE_SECONDS', '5'))
+
+# (pair, timeframe) -> (generation task, monotonic start, requesting users); requests inside the window share the task
+signal_generations: Dict[tuple, tuple] = {}
+
+async def create_signal(pair: str, timeframe: str, requested_by: Optional[set] = None) -> dict:
+    signal = await generate_ai_signal(pair, timeframe)
+    await db.trading_signals.insert_one(encode_signal(signal))
+    signal_book.add(signal)
+    await record_signals_created([signal])
+    enqueue_rationales([signal])
+    alert_fanout.submit([signal], requested_by=requested_by)
+    return signal
+
+async def coalesced_signal(pair: str, timeframe: str, requested_by: Optional[str] = None) -> dict:
+    """Share one generation between identical requests made within SIGNAL_COALESCE_SECONDS"""
+    key = (pair, timeframe)
+    now = time.monotonic()
+    inflight = signal_generations.get(key)
+    if inflight is not None:
+        task, started, requesters = inflight
+        if now - started < SIGNAL_COALESCE_SECONDS and not (task.done() and (task.cancelled() or task.exception())):
+            # The leader's fan-out reads this set, so a follower is not also alerted as a watcher
+            if requested_by is not None:
+                requesters.add(requested_by)
+            return await asyncio.shield(task)
+    for stale_key, (task, started, _) in list(signal_generations.items()):
+        if task.done() and now - started >= SIGNAL_COALESCE_SECONDS:
+            del signal_generations[stale_key]
+    requesters = {requested_by} if requested_by is not None else set()
+    task = asyncio.create_task(create_signal(pair, timeframe, requesters))
+    signal_generations[key] = (task, now, requesters)
+    return await asyncio.shield(task)
+
+async def claim_idempotency_key(user_id: str, key: str, data: SignalCreate) -> Optional[dict]:
+    """Reserve the key for this request, or return the signal an earlier request with it produced"""
+    try:
+        await db.idempotency_keys.insert_one({
+            "user_id": user_id,
+            "key": key,
+            "currency_pair": data.currency_pair,
+            "timeframe": data.timeframe,
+            "signal_id": None,
+            "created_at": datetime.now(timezone.utc)
+        })
+        return None
+    except DuplicateKeyError:
+        pass
+    record = await db.idempotency_keys.find_one({"user_id": user_id, "key": key}, {"_id": 0})
+    if record["currency_pair"] != data.currency_pair or record["timeframe"] != data.timeframe:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was used with a different request")
+    if record.get("signal_id") is None:
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is in progress")
+    signal = await db.trading_signals.find_one({"signal_id": record["signal_id"]}, {"_id": 0})
+    if signal is None:
+        raise HTTPException(status_code=404, detail="Signal not found")
+    return decode_signal(signal)
+
 @api_router.post("/signals/generate")
-async def generate_signal(data: SignalCreate, user: dict = Depends(require_auth)):
-    if data.currency_pair not in ALL_PAIRS:
+async def generate_signal(data: SignalCreate, request: Request, user: dict = Depends(require_auth)):
+    if data.currency_pair not in INSTRUMENTS:
         raise HTTPException(status_code=400, detail="Invalid currency pair")
     if data.timeframe not in TIMEFRAMES:
         raise HTTPException(status_code=400, detail="Invalid timeframe")
     
-    signal = await generate_ai_signal(data.currency_pair, data.timeframe)
-    signal_to_insert = signal.copy()
-    await db.trading_signals.insert_one(signal_to_insert)
+    idempotency_key = request.headers.get("Idempotency-Key")
+    if idempotency_key:
+        replayed = await claim_idempotency_key(user["user_id"], idempotency_key, data)
+        if replayed is not None:
+            return replayed
     
+    try:
+        signal = await coalesced_signal(data.currency_pair, data.timeframe, user["user_id"])
+    except Exception:
+        if idempotency_key:
+            await db.idempotency_keys.delete_one({"user_id": user["user_id"], "key": idempotency_key})
+        raise
+    if idempotency_key:
+        await db.idempotency_keys.update_one(
+            {"user_id": user["user_id"], "key": idempotency_key},
+            {"$set": {"signal_id": signal["signal_id"]}}
+        )
+    
+    # Keyed on (user, signal) so a coalesced repeat does not alert the same user twice
+    now = datetime.now(timezone.utc)
     alert = {
         "alert_id": f"alert_{uuid.uuid4().hex[:12]}",
         "user_id": user["user_id"],
@@ -802,10 +3104,20 @@ async def generate_signal(data: SignalCreate, user: dict = Depends(require_auth)
         "alert_type": "NEW_SIGNAL",
         "message": f"New {signal['signal_type']} signal for {signal['currency_pair']} with {signal['confidence']}% confidence",
         "is_read": False,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": now,
+        "updated_at": now
     }
-    alert_to_insert = alert.copy()
-    await db.alerts.insert_one(alert_to_insert)
+    try:
+        result = await db.alerts.update_one(
+            {"user_id": user["user_id"], "signal_id": signal["signal_id"], "alert_type": ALERT_ENUMS["alert_type"]["NEW_SIGNAL"]},
+            {"$setOnInsert": encode_alert(alert)},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # A concurrent request for the same signal inserted it first
+        result = None
+    if result is not None and result.upserted_id is not None:
+        await bump_unread({user["user_id"]: 1})
     
     return signal
 
@@ -820,69 +3132,124 @@ async def get_pairs():
         "timeframes": TIMEFRAMES
     }
 
+@api_router.get("/pairs/prices")
+async def get_pairs_prices(pairs: Optional[str] = None):
+    return await get_bulk_prices(parse_pair_list(pairs.split(",") if pairs else None))
+
 @api_router.get("/pairs/{pair}/price")
 async def get_pair_price(pair: str):
     pair = pair.replace("-", "/")
-    if pair not in ALL_PAIRS:
+    if pair not in INSTRUMENTS:
         raise HTTPException(status_code=400, detail="Invalid currency pair")
     return await get_price(pair)
 
+@api_router.get("/pairs/{pair}/realtime")
+async def get_pair_realtime(pair: str, limit: int = Query(60, ge=1, le=TICK_BUFFER_SIZE)):
+    pair = pair.replace("-", "/")
+    if pair not in INSTRUMENTS:
+        raise HTTPException(status_code=400, detail="Invalid currency pair")
+    return get_recent_ticks(pair, limit)
+
 @api_router.get("/pairs/{pair}/history")
-async def get_pair_history(pair: str, timeframe: str = "1H", limit: int = 100):
+async def get_pair_history(
+    pair: str,
+    timeframe: str = "1H",
+    limit: int = Query(100, ge=1, le=HISTORY_MAX_LIMIT),
+    start: Optional[int] = Query(None, alias="from"),
+    end: Optional[int] = Query(None, alias="to")
+):
     pair = pair.replace("-", "/")
-    if pair not in ALL_PAIRS:
+    if pair not in INSTRUMENTS:
         raise HTTPException(status_code=400, detail="Invalid currency pair")
+    if timeframe not in TIMEFRAMES:
+        raise HTTPException(status_code=400, detail="Invalid timeframe")
+    if pair in candle_aggregators:
+        return await read_candles(pair, timeframe, limit, start, end)
+    # Candle store still backfilling this pair
     return await get_historical_prices(pair, timeframe, limit)
 
 @api_router.get("/pairs/{pair}/analysis")
-async def get_pair_analysis(pair: str, request: Request = None, credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def get_pair_analysis(pair: str, timeframe: str = "1H", request: Request = None, credentials: HTTPAuthorizationCredentials = Depends(security)):
     pair = pair.replace("-", "/")
-    if pair not in ALL_PAIRS:
+    if pair not in INSTRUMENTS:
         raise HTTPException(status_code=400, detail="Invalid currency pair")
+    if timeframe not in TIMEFRAMES:
+        raise HTTPException(status_code=400, detail="Invalid timeframe")
     
     user = await get_current_user(request, credentials)
     tier = user.get("subscription_tier", "free") if user else "free"
     is_premium = tier in ["pro", "premium"] or (user and user.get("is_admin"))
     
     price_data = await get_price(pair)
-    signals = await db.trading_signals.find(
-        {"currency_pair": pair, "status": "ACTIVE"},
+    docs = await db.trading_signals.find(
+        {"currency_pair": pair, "status": enum_in(SIGNAL_ENUMS, "status", "ACTIVE")},
         {"_id": 0}
     ).sort("created_at", -1).limit(5).to_list(5)
-    
-    import random
-    rsi = round(random.uniform(30, 70), 2)
-    macd = round(random.uniform(-0.005, 0.005), 5)
-    ema_20 = round(price_data["price"] * random.uniform(0.998, 1.002), 5)
-    ema_50 = round(price_data["price"] * random.uniform(0.995, 1.005), 5)
+    signals = [decode_signal(doc) for doc in docs]
     
     analysis = {
         "pair": pair,
+        "timeframe": timeframe,
         "current_price": price_data["price"],
         "bid": price_data["bid"],
         "ask": price_data["ask"],
         "spread": price_data.get("spread_pips", 0),
         "change_24h": price_data["change_24h"],
         "asset_type": price_data.get("type", "forex"),
-        "indicators": {
-            "rsi": rsi,
-            "macd": macd,
-            "ema_20": ema_20,
-            "ema_50": ema_50,
-            "sma_20": round(price_data["price"] * random.uniform(0.997, 1.003), 5),
-            "sma_50": round(price_data["price"] * random.uniform(0.994, 1.006), 5),
-            "trend": "BULLISH" if ema_20 > ema_50 else "BEARISH",
-            "atr": round(random.uniform(0.0010, 0.0030), 5),
-            "bollinger_upper": round(price_data["price"] * 1.01, 5),
-            "bollinger_lower": round(price_data["price"] * 0.99, 5),
-            "bollinger_middle": price_data["price"]
-        },
+        "indicators": await get_indicators(pair, timeframe),
         "signals": signals if is_premium else signals[:2],
         "is_premium_content": not is_premium
     }
     
     return analysis
 
+# ===================== STREAMING ROUTES =====================
+
+@api_router.get("/stream/prices")
+async def stream_prices(request: Request, pairs: Optional[str] = None):
+    selected = parse_pair_list(pairs.split(",") if pairs else None)
+    subscriber = price_hub.open(selected)
+
+    async def event_source():
+        try:
+            yield format_sse("stream", {"stream_id": subscriber.stream_id, "pairs": selected})
+            while not await request.is_disconnected():
+                try:
+                    await asyncio.wait_for(subscriber.ready.wait(), STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                for quote in subscriber.drain().values():
+                    yield format_sse("quote", quote)
+        finally:
+            price_hub.close(subscriber)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api_router.post("/stream/{stream_id}/subscribe")
+async def stream_subscribe(stream_id: str, data: StreamSubscription):
+    subscriber = price_hub.streams.get(stream_id)
+    if not subscriber:
+        raise HTTPException(status_code=404, detail="Stream not found")
+    price_hub.subscribe(subscriber, parse_pair_list(data.pairs))
+    return {"stream_id": stream_id, "pairs": sorted(subscriber.pairs)}
+
+@api_router.post("/stream/{stream_id}/unsubscribe")
+async def stream_unsubscribe(stream_id: str, data: StreamSubscription):
+    subscriber = price_hub.streams.get(stream_id)
+    if not subscriber:
+        raise HTTPException(status_code=404, detail="Stream not found")
+    price_hub.unsubscribe(subscriber, parse_pair_list(data.pairs))
+    return {"stream_id": stream_id, "pairs": sorted(subscriber.pairs)}
+
+@api_router.get("/stream/stats")
+async def stream_stats():
+    return price_hub.stats()
+
 # ===================== PRO INSIGHTS =====================
 
 @api_router.get("/pro/insights")
@@ -890,8 +3257,7 @@ async def get_insights(user: dict = Depends(require_premium)):
     import random
     
     algo_pairs = []
-    for pair in random.sample(ALL_PAIRS, 5):
-        price_data = await get_price(pair)
+    for pair, price_data in iter_bulk_quotes(await get_bulk_prices(random.sample(ALL_PAIRS, 5))):
         trend = random.choice(["BULLISH", "BEARISH"])
         confidence = round(random.uniform(70, 95), 1)
         algo_pairs.append({
@@ -938,60 +3304,299 @@ async def get_insights(user: dict = Depends(require_premium)):
 
 # ===================== PERFORMANCE =====================
 
+PERFORMANCE_STATS_ID = "global"
+STATUS_STAT_KEYS = {"ACTIVE": "active", "TP_HIT": "tp_hit", "SL_HIT": "sl_hit", "EXPIRED": "expired"}
+PERFORMANCE_HISTORY_PROJECTION = {
+    "_id": 0, "signal_id": 1, "currency_pair": 1, "signal_type": 1, "status": 1, "confidence": 1,
+    "timeframe": 1, "entry_price": 1, "stop_loss": 1, "take_profit": 1, "created_at": 1, "closed_at": 1
+}
+
+def reward_risk(signal: dict) -> Optional[float]:
+    try:
+        risk = abs(signal["entry_price"] - signal["stop_loss"])
+        return abs(signal["take_profit"] - signal["entry_price"]) / risk if risk else None
+    except (KeyError, TypeError):
+        return None
+
+def add_status_inc(inc: dict, pair: str, timeframe: str, status, step: int):
+    """Count a status change in the totals and in the per-pair and per-timeframe buckets"""
+    if isinstance(status, int):
+        status = ENUM_NAMES["status"].get(status, status)
+    key = STATUS_STAT_KEYS.get(status, "other")
+    for prefix in ("", f"by_pair.{pair}.", f"by_timeframe.{timeframe}."):
+        inc[prefix + key] = inc.get(prefix + key, 0) + step
+
+async def record_signals_created(signals: List[dict]):
+    inc = {}
+    for signal in signals:
+        pair, timeframe = signal["currency_pair"], signal["timeframe"]
+        for prefix in ("", f"by_pair.{pair}.", f"by_timeframe.{timeframe}."):
+            inc[prefix + "total"] = inc.get(prefix + "total", 0) + 1
+        add_status_inc(inc, pair, timeframe, signal["status"], 1)
+        inc["confidence_sum"] = inc.get("confidence_sum", 0) + signal["confidence"]
+        rr = reward_risk(signal)
+        if rr is not None:
+            inc["rr_sum"] = inc.get("rr_sum", 0) + rr
+            inc["rr_count"] = inc.get("rr_count", 0) + 1
+    if inc:
+        await db.performance_stats.update_one({"_id": PERFORMANCE_STATS_ID}, {"$inc": {**inc, "version": 1}}, upsert=True)
+
+async def record_status_changes(changes: List[tuple]):
+    """Apply (pair, timeframe, old status, new status) transitions to the materialized stats"""
+    inc = {}
+    for pair, timeframe, old_status, new_status in changes:
+        add_status_inc(inc, pair, timeframe, old_status, -1)
+        add_status_inc(inc, pair, timeframe, new_status, 1)
+    if inc:
+        await db.performance_stats.update_one({"_id": PERFORMANCE_STATS_ID}, {"$inc": {**inc, "version": 1}}, upsert=True)
+
+async def rebuild_performance_stats() -> dict:
+    """Recompute the stats document from scratch, without overwriting increments made while it ran"""
+    return await write_snapshot(db.performance_stats, PERFORMANCE_STATS_ID, count_performance_stats)
+
+async def count_performance_stats() -> dict:
+    """Every stats field, counted from trading_signals with one $facet aggregation"""
+    risk = {"$abs": {"$subtract": ["$entry_price", "$stop_loss"]}}
+    reward_risk_expr = {"$cond": [
+        {"$gt": [risk, 0]},
+        {"$divide": [{"$abs": {"$subtract": ["$take_profit", "$entry_price"]}}, risk]},
+        None
+    ]}
+    pipeline = [{"$facet": {
+        "totals": [{"$group": {
+            "_id": None,
+            "confidence_sum": {"$sum": "$confidence"},
+            "rr_sum": {"$sum": reward_risk_expr},
+            "rr_count": {"$sum": {"$cond": [{"$isNumber": reward_risk_expr}, 1, 0]}}
+        }}],
+        "by_status": [{"$group": {
+            "_id": {"pair": "$currency_pair", "timeframe": "$timeframe", "status": "$status"},
+            "count": {"$sum": 1}
+        }}]
+    }}]
+    result = (await db.trading_signals.aggregate(pipeline).to_list(1))[0]
+    
+    totals = result["totals"][0] if result["totals"] else {}
+    inc = {}
+    for group in result["by_status"]:
+        key = group["_id"]
+        pair, timeframe = key.get("pair"), key.get("timeframe")
+        for prefix in ("", f"by_pair.{pair}.", f"by_timeframe.{timeframe}."):
+            inc[prefix + "total"] = inc.get(prefix + "total", 0) + group["count"]
+        add_status_inc(inc, pair, timeframe, key.get("status"), group["count"])
+    
+    stats = {
+        # Zeros for absent statuses, so $set clears whatever count the previous snapshot had
+        **{key: 0 for key in ("total", *STATUS_STAT_KEYS.values(), "other")},
+        "confidence_sum": totals.get("confidence_sum", 0),
+        "rr_sum": totals.get("rr_sum", 0),
+        "rr_count": totals.get("rr_count", 0),
+        "by_pair": {},
+        "by_timeframe": {},
+        "rebuilt_at": datetime.now(timezone.utc)
+    }
+    for path, count in inc.items():
+        *parents, leaf = path.split(".", 2) if path.startswith("by_") else [path]
+        target = stats
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[leaf] = count
+    return stats
+
+async def ensure_performance_stats():
+    if await db.performance_stats.find_one({"_id": PERFORMANCE_STATS_ID}, {"_id": 1}) is None:
+        await rebuild_performance_stats()
+
+def outcome_summary(bucket: dict) -> dict:
+    tp_hit = bucket.get("tp_hit", 0)
+    sl_hit = bucket.get("sl_hit", 0)
+    return {
+        "signals": bucket.get("total", 0),
+        "active": bucket.get("active", 0),
+        "tp_hit": tp_hit,
+        "sl_hit": sl_hit,
+        "expired": bucket.get("expired", 0),
+        "win_rate": round((tp_hit / max(tp_hit + sl_hit, 1)) * 100, 1)
+    }
+
+EQUITY_START = 1000.0
+# Account currency risked per signal (1R), so account P&L is comparable across forex and crypto
+EQUITY_RISK_PER_TRADE = 10.0
+CHART_WINDOWS = {"30d": 30, "90d": 90, "1y": 365, "all": None}
+CHART_MAX_POINTS = 120
+ROLLUP_OUTCOMES = {"TP_HIT": "wins", "SL_HIT": "losses", "EXPIRED": "expired"}
+ROLLUP_PROJECTION = {
+    "_id": 0, "currency_pair": 1, "entry_price": 1, "stop_loss": 1, "take_profit": 1,
+    "exit_price": 1, "closed_at": 1, "created_at": 1
+}
+
+def settlement_pnl(signal: dict, outcome: str) -> tuple:
+    """P&L of a settled signal in pips and in account terms; TP and SL fill at their level"""
+    entry_price = signal.get("entry_price")
+    stop_loss = signal.get("stop_loss")
+    take_profit = signal.get("take_profit")
+    exit_price = {"TP_HIT": take_profit, "SL_HIT": stop_loss}.get(outcome, signal.get("exit_price"))
+    if None in (entry_price, stop_loss, take_profit, exit_price):
+        return 0.0, 0.0
+    direction = 1 if stop_loss <= take_profit else -1
+    move = (exit_price - entry_price) * direction
+    instrument = INSTRUMENTS.get(signal.get("currency_pair"))
+    # Crypto signals size their levels in units of 0.1% of the entry price
+    pip = entry_price * 0.001 if instrument is None or instrument.is_crypto else instrument.pip_size
+    risk = abs(entry_price - stop_loss)
+    return (move / pip if pip else 0.0), (move / risk * EQUITY_RISK_PER_TRADE if risk else 0.0)
+
+def rollup_delta(signal: dict, status, step: int) -> Optional[tuple]:
+    """(day, $inc) a settled signal contributes to its daily rollup, or None while it is open"""
+    if isinstance(status, int):
+        status = ENUM_NAMES["status"].get(status, status)
+    if status not in ROLLUP_OUTCOMES:
+        return None
+    closed_at = parse_datetime(signal.get("closed_at") or signal.get("created_at"))
+    if closed_at is None:
+        return None
+    pnl_pips, pnl_account = settlement_pnl(signal, status)
+    return closed_at.strftime("%Y-%m-%d"), {
+        "signals": step,
+        ROLLUP_OUTCOMES[status]: step,
+        "pnl_pips": pnl_pips * step,
+        "pnl_account": pnl_account * step
+    }
+
+def rollup_day_start(day: str) -> datetime:
+    return datetime.strptime(day, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+
+async def record_daily_rollups(deltas: List[Optional[tuple]]):
+    by_day = {}
+    for delta in deltas:
+        if delta is None:
+            continue
+        day, inc = delta
+        totals = by_day.setdefault(day, {})
+        for key, value in inc.items():
+            totals[key] = totals.get(key, 0) + value
+    if by_day:
+        await db.performance_daily.bulk_write([
+            UpdateOne({"_id": day}, {"$inc": inc, "$setOnInsert": {"date": rollup_day_start(day)}}, upsert=True)
+            for day, inc in by_day.items()
+        ], ordered=False)
+
+async def backfill_daily_rollups():
+    """Rebuild every daily rollup from the settled signals"""
+    by_day = {}
+    settled = {"status": enum_in(SIGNAL_ENUMS, "status", *ROLLUP_OUTCOMES)}
+    async for signal in db.trading_signals.find(settled, ROLLUP_PROJECTION | {"status": 1}):
+        delta = rollup_delta(signal, signal["status"], 1)
+        if delta is None:
+            continue
+        day, inc = delta
+        totals = by_day.setdefault(day, {"date": rollup_day_start(day), "signals": 0, "wins": 0, "losses": 0,
+                                         "expired": 0, "pnl_pips": 0.0, "pnl_account": 0.0})
+        for key, value in inc.items():
+            totals[key] += value
+    if by_day:
+        await db.performance_daily.bulk_write(
+            [ReplaceOne({"_id": day}, totals, upsert=True) for day, totals in by_day.items()], ordered=False
+        )
+    await db.performance_daily.delete_many({"_id": {"$nin": list(by_day)}})
+
+async def ensure_daily_rollups():
+    if await db.performance_daily.estimated_document_count() == 0:
+        await backfill_daily_rollups()
+
+def build_equity_curve(rollups: List[dict], start: datetime, end: datetime, base_pips: float, base_account: float) -> List[dict]:
+    """One point per day from start to end, carrying equity over empty days, downsampled for long ranges"""
+    by_day = {rollup["_id"]: rollup for rollup in rollups}
+    points = []
+    cumulative_pips, cumulative_account = base_pips, base_account
+    day = start
+    while day <= end:
+        key = day.strftime("%Y-%m-%d")
+        rollup = by_day.get(key, {})
+        cumulative_pips += rollup.get("pnl_pips", 0.0)
+        cumulative_account += rollup.get("pnl_account", 0.0)
+        points.append({
+            "date": key,
+            "value": round(EQUITY_START + cumulative_account, 2),
+            "pnl_pips": round(cumulative_pips, 1),
+            "signals": rollup.get("signals", 0),
+            "wins": rollup.get("wins", 0),
+            "losses": rollup.get("losses", 0)
+        })
+        day += timedelta(days=1)
+    
+    if len(points) <= CHART_MAX_POINTS:
+        return points
+    # Equity is a running total, so each bucket keeps its last value and sums its activity
+    bucket_size = -(-len(points) // CHART_MAX_POINTS)
+    downsampled = []
+    for i in range(0, len(points), bucket_size):
+        bucket = points[i:i + bucket_size]
+        point = dict(bucket[-1])
+        for key in ("signals", "wins", "losses"):
+            point[key] = sum(p[key] for p in bucket)
+        downsampled.append(point)
+    return downsampled
+
 @api_router.get("/performance")
 async def get_performance(request: Request = None, credentials: HTTPAuthorizationCredentials = Depends(security)):
-    total_signals = await db.trading_signals.count_documents({})
-    tp_hit = await db.trading_signals.count_documents({"status": "TP_HIT"})
-    sl_hit = await db.trading_signals.count_documents({"status": "SL_HIT"})
-    active = await db.trading_signals.count_documents({"status": "ACTIVE"})
+    stats = await db.performance_stats.find_one({"_id": PERFORMANCE_STATS_ID})
+    if stats is None:
+        stats = await rebuild_performance_stats()
+    summary = outcome_summary(stats)
     
-    win_rate = round((tp_hit / max(tp_hit + sl_hit, 1)) * 100, 1)
-    
-    history = await db.trading_signals.find(
-        {"status": {"$in": ["TP_HIT", "SL_HIT"]}},
-        {"_id": 0}
-    ).sort("created_at", -1).limit(20).to_list(20)
+    docs = await db.trading_signals.find(
+        {"status": enum_in(SIGNAL_ENUMS, "status", "TP_HIT", "SL_HIT")},
+        PERFORMANCE_HISTORY_PROJECTION
+    ).sort([("created_at", -1), ("signal_id", -1)]).limit(20).to_list(20)
+    history = [decode_signal(doc, with_rationale=False) for doc in docs]
     
     return {
-        "total_signals": total_signals,
-        "active_signals": active,
-        "tp_hit": tp_hit,
-        "sl_hit": sl_hit,
-        "win_rate": win_rate,
-        "avg_confidence": 75.5,
-        "avg_rr_ratio": 2.1,
+        "total_signals": summary["signals"],
+        "active_signals": summary["active"],
+        "tp_hit": summary["tp_hit"],
+        "sl_hit": summary["sl_hit"],
+        "expired": summary["expired"],
+        "win_rate": summary["win_rate"],
+        "avg_confidence": round(stats.get("confidence_sum", 0) / max(summary["signals"], 1), 1),
+        "avg_rr_ratio": round(stats.get("rr_sum", 0) / max(stats.get("rr_count", 0), 1), 2),
+        "by_pair": {pair: outcome_summary(bucket) for pair, bucket in stats.get("by_pair", {}).items()},
+        "by_timeframe": {tf: outcome_summary(bucket) for tf, bucket in stats.get("by_timeframe", {}).items()},
         "history": history
     }
 
 @api_router.get("/performance/chart")
-async def get_performance_chart():
-    import random
-    data = []
-    cumulative = 1000
-    
-    for i in range(30):
-        date = (datetime.now(timezone.utc) - timedelta(days=30-i)).strftime("%Y-%m-%d")
-        change = random.uniform(-50, 100)
-        cumulative += change
-        data.append({
-            "date": date,
-            "value": round(cumulative, 2),
-            "signals": random.randint(1, 5),
-            "wins": random.randint(0, 3)
-        })
+async def get_performance_chart(window: str = Query("30d", pattern="^(30d|90d|1y|all)$")):
+    days = CHART_WINDOWS[window]
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    start = today - timedelta(days=days - 1) if days else None
+    
+    query = {"date": {"$gte": start}} if start else {}
+    rollups = await db.performance_daily.find(query).sort("date", 1).to_list(None)
+    base_pips = base_account = 0.0
+    if start:
+        before = await db.performance_daily.aggregate([
+            {"$match": {"date": {"$lt": start}}},
+            {"$group": {"_id": None, "pips": {"$sum": "$pnl_pips"}, "account": {"$sum": "$pnl_account"}}}
+        ]).to_list(1)
+        if before:
+            base_pips, base_account = before[0]["pips"], before[0]["account"]
+    elif rollups:
+        start = parse_datetime(rollups[0]["date"])
+    else:
+        start = today
     
-    return data
+    return build_equity_curve(rollups, start, today, base_pips, base_account)
 
 # ===================== CALCULATOR =====================
 
 @api_router.post("/calculator/position-size")
 async def calculate_position_size(data: PositionSizeRequest):
-    is_crypto = data.currency_pair in CRYPTO_PAIRS
+    instrument = INSTRUMENTS.get(data.currency_pair.replace("-", "/"))
+    if not instrument:
+        raise HTTPException(status_code=400, detail="Invalid currency pair")
     
-    if is_crypto:
-        pip_value = data.entry_price * 0.0001
-    else:
-        pip_value = 0.0001 if "JPY" not in data.currency_pair else 0.01
+    pip_value = data.entry_price * 0.0001 if instrument.is_crypto else instrument.pip_size
     
     sl_pips = abs(data.entry_price - data.stop_loss) / pip_value
     risk_amount = data.account_balance * (data.risk_percentage / 100)
@@ -1008,32 +3613,171 @@ async def calculate_position_size(data: PositionSizeRequest):
 
 # ===================== ALERTS =====================
 
+def encode_alert_cursor(position: tuple) -> str:
+    updated_at, alert_id = position
+    payload = json.dumps([parse_datetime(updated_at).isoformat(), alert_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_alert_cursor(cursor: str) -> tuple:
+    try:
+        updated_at, alert_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return parse_datetime(updated_at), str(alert_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def next_alert_cursor(alerts: List[dict], complete: bool) -> tuple:
+    """Where the next sync starts, never past the grace window so late writes are re-read. A complete
+    read has seen everything up to now, so it moves to the window even when nothing newer was served;
+    otherwise the cursor stays at the newest alert served so the next page follows on."""
+    floor = (datetime.now(timezone.utc) - timedelta(seconds=ALERT_SYNC_GRACE_SECONDS), "")
+    if complete:
+        return floor
+    positions = [(parse_datetime(alert["updated_at"]), alert["alert_id"]) for alert in alerts if alert.get("updated_at")]
+    return min(max(positions, default=floor), floor)
+
 @api_router.get("/alerts")
-async def get_alerts(user: dict = Depends(require_auth)):
+async def get_alerts(response: Response, since: Optional[str] = None, user: dict = Depends(require_auth)):
+    """Latest alerts, or with since only those created or changed after the cursor; X-Next-Cursor carries the next one"""
+    if since is None:
+        alerts = await db.alerts.find(
+            {"user_id": user["user_id"]},
+            {"_id": 0}
+        ).sort("created_at", -1).limit(50).to_list(50)
+        response.headers["X-Next-Cursor"] = encode_alert_cursor(next_alert_cursor(alerts, complete=True))
+        return [decode_alert(alert) for alert in alerts]
+    
+    updated_at, alert_id = decode_alert_cursor(since)
+    response.headers["X-Next-Cursor"] = since
+    # The inbox is stamped after every alert write, so an unchanged stamp means nothing to fetch
+    inbox = await db.alert_inbox.find_one({"_id": user["user_id"]}, {"_id": 0, "changed_at": 1})
+    if inbox is None or parse_datetime(inbox["changed_at"]) <= updated_at:
+        return []
     alerts = await db.alerts.find(
-        {"user_id": user["user_id"]},
+        {"user_id": user["user_id"], "$or": [
+            {"updated_at": {"$gt": updated_at}},
+            {"updated_at": updated_at, "alert_id": {"$gt": alert_id}}
+        ]},
         {"_id": 0}
-    ).sort("created_at", -1).limit(50).to_list(50)
-    return alerts
+    ).sort([("updated_at", 1), ("alert_id", 1)]).limit(ALERT_SYNC_MAX).to_list(ALERT_SYNC_MAX)
+    position = next_alert_cursor(alerts, complete=len(alerts) < ALERT_SYNC_MAX)
+    response.headers["X-Next-Cursor"] = encode_alert_cursor(max(position, (updated_at, alert_id)))
+    return [decode_alert(alert) for alert in alerts]
+
+@api_router.get("/alerts/unread-count")
+async def get_unread_alert_count(request: Request, response: Response, user: dict = Depends(require_auth)):
+    inbox = await db.alert_inbox.find_one({"_id": user["user_id"]}, {"_id": 0}) or {}
+    unread = max(inbox.get("unread", 0), 0)
+    changed_at = inbox.get("changed_at")
+    etag = f'"{unread}-{int(parse_datetime(changed_at).timestamp() * 1000) if changed_at else 0}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return {"unread": unread}
 
 @api_router.put("/alerts/{alert_id}/read")
 async def mark_alert_read(alert_id: str, user: dict = Depends(require_auth)):
     result = await db.alerts.update_one(
-        {"alert_id": alert_id, "user_id": user["user_id"]},
-        {"$set": {"is_read": True}}
+        {"alert_id": alert_id, "user_id": user["user_id"], "is_read": False},
+        {"$set": {"is_read": True, "updated_at": datetime.now(timezone.utc)}}
     )
-    if result.modified_count == 0:
+    if result.modified_count:
+        await bump_unread({user["user_id"]: -1})
+    elif await db.alerts.find_one({"alert_id": alert_id, "user_id": user["user_id"]}, {"_id": 1}) is None:
         raise HTTPException(status_code=404, detail="Alert not found")
     return {"message": "Alert marked as read"}
 
 @api_router.put("/alerts/read-all")
 async def mark_all_alerts_read(user: dict = Depends(require_auth)):
-    await db.alerts.update_many(
-        {"user_id": user["user_id"]},
-        {"$set": {"is_read": True}}
+    result = await db.alerts.update_many(
+        {"user_id": user["user_id"], "is_read": False},
+        {"$set": {"is_read": True, "updated_at": datetime.now(timezone.utc)}}
     )
+    if result.modified_count:
+        await bump_unread({user["user_id"]: -result.modified_count})
     return {"message": "All alerts marked as read"}
 
+@api_router.get("/price-alerts")
+async def get_price_alerts(user: dict = Depends(require_auth)):
+    alerts = await db.price_alerts.find(
+        {"user_id": user["user_id"], "status": {"$ne": "CANCELLED"}},
+        {"_id": 0}
+    ).sort("created_at", -1).limit(100).to_list(100)
+    return alerts
+
+@api_router.post("/price-alerts")
+async def create_price_alert(data: PriceAlertCreate, user: dict = Depends(require_auth)):
+    pair = data.currency_pair.replace("-", "/")
+    if pair not in INSTRUMENTS:
+        raise HTTPException(status_code=400, detail="Invalid currency pair")
+    if data.condition not in PRICE_ALERT_CONDITIONS:
+        raise HTTPException(status_code=400, detail="Invalid condition")
+    if data.level <= 0:
+        raise HTTPException(status_code=400, detail="Level must be positive")
+    
+    limit = PRICE_ALERT_LIMITS.get(user.get("subscription_tier", "free"))
+    if limit == 0:
+        raise HTTPException(status_code=403, detail="Price alerts require a Pro or Premium plan")
+    if limit is not None:
+        active = await db.price_alerts.count_documents({"user_id": user["user_id"], "status": "ACTIVE"}, limit=limit)
+        if active >= limit:
+            raise HTTPException(status_code=403, detail=f"Your plan allows {limit} active price alerts")
+    
+    alert = {
+        "alert_id": f"price_{uuid.uuid4().hex[:12]}",
+        "user_id": user["user_id"],
+        "currency_pair": pair,
+        "condition": data.condition,
+        "level": data.level,
+        "status": "ACTIVE",
+        "created_at": datetime.now(timezone.utc)
+    }
+    await db.price_alerts.insert_one(alert)
+    alert.pop("_id", None)
+    if limit is not None:
+        # Concurrent creates can all pass the count above; recount with ours in place and back out if over
+        active = await db.price_alerts.count_documents({"user_id": user["user_id"], "status": "ACTIVE"})
+        if active > limit:
+            await db.price_alerts.delete_one({"alert_id": alert["alert_id"]})
+            raise HTTPException(status_code=403, detail=f"Your plan allows {limit} active price alerts")
+    price_alert_book.add(alert)
+    return alert
+
+@api_router.delete("/price-alerts/{alert_id}")
+async def cancel_price_alert(alert_id: str, user: dict = Depends(require_auth)):
+    result = await db.price_alerts.update_one(
+        {"alert_id": alert_id, "user_id": user["user_id"], "status": "ACTIVE"},
+        {"$set": {"status": "CANCELLED"}}
+    )
+    if result.modified_count == 0:
+        raise HTTPException(status_code=404, detail="Price alert not found")
+    price_alert_book.discard(alert_id)
+    return {"message": "Price alert cancelled"}
+
+@api_router.get("/watchlist")
+async def get_watchlist(user: dict = Depends(require_auth)):
+    docs = await db.watchlists.find({"user_id": user["user_id"]}, {"_id": 0, "pair": 1}).to_list(len(ALL_PAIRS))
+    return {"pairs": sorted(doc["pair"] for doc in docs)}
+
+@api_router.put("/watchlist/{pair}")
+async def add_to_watchlist(pair: str, user: dict = Depends(require_auth)):
+    pair = pair.replace("-", "/")
+    if pair not in INSTRUMENTS:
+        raise HTTPException(status_code=400, detail="Invalid currency pair")
+    await db.watchlists.update_one(
+        {"user_id": user["user_id"], "pair": pair},
+        {"$setOnInsert": {"created_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+    watchlist_index.add(user["user_id"], pair)
+    return {"pair": pair, "watching": True}
+
+@api_router.delete("/watchlist/{pair}")
+async def remove_from_watchlist(pair: str, user: dict = Depends(require_auth)):
+    pair = pair.replace("-", "/")
+    await db.watchlists.delete_one({"user_id": user["user_id"], "pair": pair})
+    watchlist_index.remove(user["user_id"], pair)
+    return {"pair": pair, "watching": False}
+
 # ===================== SUBSCRIPTION =====================
 
 SUBSCRIPTION_PLANS = {
@@ -1085,7 +3829,7 @@ async def create_checkout(data: CheckoutRequest, user: dict = Depends(require_au
             metadata={"user_id": user["user_id"], "plan": data.plan}
         )
         
-        await db.payment_transactions.insert_one({
+        await db.payment_transactions.insert_one(encode_dates_only({
             "transaction_id": f"txn_{uuid.uuid4().hex[:12]}",
             "user_id": user["user_id"],
             "session_id": session.id,
@@ -1093,8 +3837,9 @@ async def create_checkout(data: CheckoutRequest, user: dict = Depends(require_au
             "amount": plan["price"],
             "currency": "usd",
             "status": "PENDING",
-            "created_at": datetime.now(timezone.utc).isoformat()
-        })
+            "created_at": datetime.now(timezone.utc)
+        }))
+        await bump_counters(transactions_total=1)
         
         return {"url": session.url, "session_id": session.id}
     except Exception as e:
@@ -1108,14 +3853,20 @@ async def get_checkout_status(session_id: str, user: dict = Depends(require_auth
         
         if session.payment_status == "paid":
             plan = session.metadata.get("plan", "pro")
-            await db.users.update_one(
+            previous = await db.users.find_one_and_update(
                 {"user_id": user["user_id"]},
-                {"$set": {"is_premium": True, "subscription_tier": plan}}
+                {"$set": {"is_premium": True, "subscription_tier": plan}},
+                projection={"_id": 0, "subscription_tier": 1}
             )
-            await db.payment_transactions.update_one(
-                {"session_id": session_id},
+            auth_cache.invalidate_user(user["user_id"])
+            completed = await db.payment_transactions.update_one(
+                {"session_id": session_id, "status": {"$ne": "COMPLETED"}},
                 {"$set": {"status": "COMPLETED", "payment_status": session.payment_status}}
             )
+            await bump_counters(
+                users_premium=int(previous is not None and not tier_is_premium(previous.get("subscription_tier"))),
+                transactions_completed=completed.modified_count
+            )
         
         return {
             "status": session.status,
@@ -1131,7 +3882,7 @@ async def get_checkout_status(session_id: str, user: dict = Depends(require_auth
 @api_router.get("/admin/signals")
 async def admin_get_signals(user: dict = Depends(require_admin)):
     signals = await db.trading_signals.find({}, {"_id": 0}).sort("created_at", -1).limit(100).to_list(100)
-    return signals
+    return [decode_signal(signal) for signal in signals]
 
 @api_router.put("/admin/signals/{signal_id}")
 async def admin_update_signal(signal_id: str, data: AdminSignalUpdate, user: dict = Depends(require_admin)):
@@ -1139,24 +3890,55 @@ async def admin_update_signal(signal_id: str, data: AdminSignalUpdate, user: dic
     if not update_data:
         raise HTTPException(status_code=400, detail="No update data provided")
     
-    result = await db.trading_signals.update_one(
+    update_fields = encode_enums(update_data, SIGNAL_ENUMS)
+    update = {"$set": update_fields}
+    if update_data.get("status") in ROLLUP_OUTCOMES:
+        update_fields["closed_at"] = datetime.now(timezone.utc)
+    elif update_data.get("status") == "ACTIVE":
+        # Reopening clears the settlement so the signal can settle again
+        update_fields["reopened_at"] = datetime.now(timezone.utc)
+        update["$unset"] = {"closed_at": "", "exit_price": ""}
+    previous = await db.trading_signals.find_one_and_update(
         {"signal_id": signal_id},
-        {"$set": update_data}
+        update,
+        projection=ROLLUP_PROJECTION | {"timeframe": 1, "status": 1, "confidence": 1},
+        return_document=ReturnDocument.BEFORE
     )
-    if result.modified_count == 0:
+    if previous is None:
         raise HTTPException(status_code=404, detail="Signal not found")
+    if update_data.get("status", "ACTIVE") != "ACTIVE":
+        signal_book.discard(signal_id)
+    elif "status" in update_data:
+        signal_book.closed.discard(signal_id)
+        signal_book.recently_closed.discard(signal_id)
+        reopened = await db.trading_signals.find_one({"signal_id": signal_id}, SIGNAL_BOOK_PROJECTION)
+        if reopened is not None:
+            signal_book.add(reopened)
+    
+    if "status" in update_data:
+        await record_status_changes([
+            (previous.get("currency_pair"), previous.get("timeframe"), previous.get("status"), update_data["status"])
+        ])
+        await record_daily_rollups([
+            rollup_delta(previous, previous.get("status"), -1),
+            rollup_delta({**previous, "closed_at": update_fields.get("closed_at")}, update_data["status"], 1)
+        ])
+    if "confidence" in update_data:
+        await db.performance_stats.update_one(
+            {"_id": PERFORMANCE_STATS_ID},
+            {"$inc": {"confidence_sum": update_data["confidence"] - previous.get("confidence", 0), "version": 1}}
+        )
     return {"message": "Signal updated"}
 
 @api_router.post("/admin/signals/generate-batch")
-async def admin_generate_batch(user: dict = Depends(require_admin)):
-    signals = []
-    pairs_to_generate = FOREX_PAIRS[:7] + CRYPTO_PAIRS[:3]
-    for pair in pairs_to_generate:
-        signal = await generate_ai_signal(pair, "1H")
-        signal_to_insert = signal.copy()
-        await db.trading_signals.insert_one(signal_to_insert)
-        signals.append(signal)
-    return {"generated": len(signals), "signals": signals}
+async def admin_generate_batch(data: Optional[BatchSignalRequest] = None, user: dict = Depends(require_admin)):
+    pairs = (data.pairs if data else None) or DEFAULT_BATCH_PAIRS
+    timeframes = (data.timeframes if data else None) or DEFAULT_BATCH_TIMEFRAMES
+    if len(pairs) * len(timeframes) > len(ALL_PAIRS) * len(TIMEFRAMES):
+        raise HTTPException(status_code=400, detail="Batch exceeds the full pair and timeframe board")
+    
+    items, signals = await generate_signal_batch(pairs, timeframes)
+    return {"generated": len(signals), "requested": len(items), "items": items, "signals": signals}
 
 @api_router.get("/admin/users")
 async def admin_get_users(user: dict = Depends(require_admin)):
@@ -1172,26 +3954,64 @@ async def admin_toggle_premium(user_id: str, tier: str = "pro", user: dict = Dep
     current_tier = target_user.get("subscription_tier", "free")
     new_tier = "free" if current_tier != "free" else tier
     
-    await db.users.update_one(
-        {"user_id": user_id},
+    result = await db.users.update_one(
+        {"user_id": user_id, "subscription_tier": target_user.get("subscription_tier")},
         {"$set": {"is_premium": new_tier != "free", "subscription_tier": new_tier}}
     )
+    auth_cache.invalidate_user(user_id)
+    if result.modified_count:
+        await bump_counters(users_premium=tier_is_premium(new_tier) - tier_is_premium(current_tier))
     return {"user_id": user_id, "subscription_tier": new_tier}
 
+@api_router.get("/admin/upstreams")
+async def admin_get_upstreams(user: dict = Depends(require_admin)):
+    return {upstream.name: upstream.stats() for upstream in upstream_clients}
+
+@api_router.get("/admin/auth-cache")
+async def admin_get_auth_cache(user: dict = Depends(require_admin)):
+    return auth_cache.stats()
+
+@api_router.get("/admin/rationales")
+async def admin_get_rationales(user: dict = Depends(require_admin)):
+    return rationale_pipeline.stats()
+
+@api_router.get("/admin/fanout")
+async def admin_get_fanout(user: dict = Depends(require_admin)):
+    return {**alert_fanout.stats(), "price_alerts": price_alert_book.stats()}
+
+@api_router.get("/admin/diagnostics/queries")
+async def admin_explain_queries(user: dict = Depends(require_admin)):
+    return await explain_query_shapes()
+
+@api_router.get("/admin/migrations")
+async def admin_get_migrations(user: dict = Depends(require_admin)):
+    return await db.migrations.find({}, {"last_id": 0}).to_list(100)
+
 @api_router.get("/admin/stats")
 async def admin_get_stats(user: dict = Depends(require_admin)):
-    total_users = await db.users.count_documents({})
-    premium_users = await db.users.count_documents({"subscription_tier": {"$ne": "free"}})
-    total_signals = await db.trading_signals.count_documents({})
-    active_signals = await db.trading_signals.count_documents({"status": "ACTIVE"})
-    total_transactions = await db.payment_transactions.count_documents({})
-    completed_transactions = await db.payment_transactions.count_documents({"status": "COMPLETED"})
+    if admin_stats_cache["payload"] is not None and time.monotonic() < admin_stats_cache["expires_at"]:
+        return admin_stats_cache["payload"]
     
-    return {
-        "users": {"total": total_users, "premium": premium_users},
-        "signals": {"total": total_signals, "active": active_signals},
-        "transactions": {"total": total_transactions, "completed": completed_transactions}
+    counters, signal_stats = await asyncio.gather(
+        db.counters.find_one({"_id": COUNTERS_ID}),
+        db.performance_stats.find_one({"_id": PERFORMANCE_STATS_ID}, {"total": 1, "active": 1})
+    )
+    if counters is None:
+        counters = await reconcile_counters()
+    if signal_stats is None:
+        signal_stats = await rebuild_performance_stats()
+    
+    payload = {
+        "users": {"total": counters.get("users_total", 0), "premium": counters.get("users_premium", 0)},
+        "signals": {"total": signal_stats.get("total", 0), "active": signal_stats.get("active", 0)},
+        "transactions": {
+            "total": counters.get("transactions_total", 0),
+            "completed": counters.get("transactions_completed", 0)
+        }
     }
+    admin_stats_cache["payload"] = payload
+    admin_stats_cache["expires_at"] = time.monotonic() + ADMIN_STATS_TTL_SECONDS
+    return payload
 
 # ===================== ROOT =====================
 
@@ -1211,8 +4031,43 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+@app.on_event("startup")
+async def start_background_tasks():
+    try:
+        await ensure_indexes()
+        await ensure_performance_stats()
+        await ensure_daily_rollups()
+        await ensure_alert_inbox()
+        if QUERY_DIAGNOSTICS:
+            await explain_query_shapes()
+    except Exception as e:
+        logger.error(f"Index bootstrap failed: {e}")
+    for upstream in upstream_clients:
+        upstream.start()
+    background_tasks.append(asyncio.create_task(run_schema_migration()))
+    background_tasks.append(asyncio.create_task(run_counter_reconciler()))
+    background_tasks.append(asyncio.create_task(run_crypto_refresher()))
+    background_tasks.append(asyncio.create_task(run_tick_producer()))
+    background_tasks.append(asyncio.create_task(run_candle_store()))
+    background_tasks.append(asyncio.create_task(run_signal_lifecycle()))
+    background_tasks.append(asyncio.create_task(run_price_alerts()))
+    background_tasks.append(asyncio.create_task(run_alert_retention()))
+    background_tasks.append(asyncio.create_task(run_watchlist_sync()))
+    background_tasks.append(asyncio.create_task(alert_fanout.run()))
+    if RATIONALE_ENABLED:
+        background_tasks.append(asyncio.create_task(rationale_pipeline.run()))
+    if SIGNAL_SCHEDULER_ENABLED and SIGNAL_SCHEDULER_TIMEFRAMES:
+        background_tasks.append(asyncio.create_task(run_signal_scheduler()))
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    background_tasks.clear()
+    for upstream in upstream_clients:
+        await upstream.close()
     client.close()
@@ -106,6 +106,10 @@ class FXPulseTester:
         """Test get signals"""
         return self.run_test("Get Signals", "GET", "signals", 200)
 
+    def test_get_signals_page(self):
+        """Test paginated signal cards"""
+        return self.run_test("Get Signals Page", "GET", "signals?limit=5&view=card", 200)
+
     def test_generate_signal(self):
         """Test signal generation"""
         success, response = self.run_test(
@@ -124,10 +128,22 @@ class FXPulseTester:
         """Test get pair price"""
         return self.run_test("Get EUR/USD Price", "GET", "pairs/EUR-USD/price", 200)
 
+    def test_get_bulk_prices(self):
+        """Test bulk prices for all pairs"""
+        return self.run_test("Get Bulk Prices", "GET", "pairs/prices", 200)
+
+    def test_get_pair_realtime(self):
+        """Test get pair realtime ticks"""
+        return self.run_test("Get EUR/USD Realtime", "GET", "pairs/EUR-USD/realtime?limit=60", 200)
+
     def test_get_pair_history(self):
         """Test get pair history"""
         return self.run_test("Get EUR/USD History", "GET", "pairs/EUR-USD/history", 200)
 
+    def test_stream_stats(self):
+        """Test price stream stats"""
+        return self.run_test("Get Stream Stats", "GET", "stream/stats", 200)
+
     def test_get_pair_analysis(self):
         """Test get pair analysis"""
         return self.run_test("Get EUR/USD Analysis", "GET", "pairs/EUR-USD/analysis", 200)
@@ -140,6 +156,10 @@ class FXPulseTester:
         """Test get performance chart"""
         return self.run_test("Get Performance Chart", "GET", "performance/chart", 200)
 
+    def test_get_performance_chart_window(self):
+        """Test performance chart over a downsampled window"""
+        return self.run_test("Get Performance Chart 1Y", "GET", "performance/chart?window=1y", 200)
+
     def test_position_size_calculator(self):
         """Test position size calculator"""
         return self.run_test(
@@ -160,6 +180,18 @@ class FXPulseTester:
         """Test get alerts"""
         return self.run_test("Get Alerts", "GET", "alerts", 200)
 
+    def test_get_unread_alert_count(self):
+        """Test unread alert counter"""
+        return self.run_test("Get Unread Alert Count", "GET", "alerts/unread-count", 200)
+
+    def test_get_price_alerts(self):
+        """Test get price alerts"""
+        return self.run_test("Get Price Alerts", "GET", "price-alerts", 200)
+
+    def test_watchlist(self):
+        """Test adding a pair to the watchlist"""
+        return self.run_test("Watch Pair", "PUT", "watchlist/EUR-USD", 200)
+
     def test_subscription_plans(self):
         """Test get subscription plans"""
         return self.run_test("Get Subscription Plans", "GET", "subscription/plans", 200)
@@ -168,6 +200,30 @@ class FXPulseTester:
         """Test admin stats"""
         return self.run_test("Admin Get Stats", "GET", "admin/stats", 200, use_admin=True)
 
+    def test_admin_get_upstreams(self):
+        """Test admin upstream pool metrics"""
+        return self.run_test("Admin Get Upstreams", "GET", "admin/upstreams", 200, use_admin=True)
+
+    def test_admin_explain_queries(self):
+        """Test admin query plan diagnostics"""
+        return self.run_test("Admin Explain Queries", "GET", "admin/diagnostics/queries", 200, use_admin=True)
+
+    def test_admin_get_migrations(self):
+        """Test admin schema migration progress"""
+        return self.run_test("Admin Get Migrations", "GET", "admin/migrations", 200, use_admin=True)
+
+    def test_admin_get_rationales(self):
+        """Test admin rationale pipeline metrics"""
+        return self.run_test("Admin Get Rationales", "GET", "admin/rationales", 200, use_admin=True)
+
+    def test_admin_get_auth_cache(self):
+        """Test admin auth cache metrics"""
+        return self.run_test("Admin Get Auth Cache", "GET", "admin/auth-cache", 200, use_admin=True)
+
+    def test_admin_get_fanout(self):
+        """Test admin alert fan-out metrics"""
+        return self.run_test("Admin Get Fan-out", "GET", "admin/fanout", 200, use_admin=True)
+
     def test_admin_get_signals(self):
         """Test admin get signals"""
         return self.run_test("Admin Get Signals", "GET", "admin/signals", 200, use_admin=True)
@@ -218,6 +274,9 @@ def main():
     if not tester.test_get_signals()[0]:
         print("❌ Get signals failed")
 
+    if not tester.test_get_signals_page()[0]:
+        print("❌ Get signals page failed")
+
     # Signal generation test
     signal_success, signal_data = tester.test_generate_signal()
     if not signal_success:
@@ -227,12 +286,21 @@ def main():
     if not tester.test_get_pair_price()[0]:
         print("❌ Get pair price failed")
 
+    if not tester.test_get_bulk_prices()[0]:
+        print("❌ Get bulk prices failed")
+
+    if not tester.test_get_pair_realtime()[0]:
+        print("❌ Get pair realtime failed")
+
     if not tester.test_get_pair_history()[0]:
         print("❌ Get pair history failed")
 
     if not tester.test_get_pair_analysis()[0]:
         print("❌ Get pair analysis failed")
 
+    if not tester.test_stream_stats()[0]:
+        print("❌ Get stream stats failed")
+
     # Performance tests
     if not tester.test_get_performance()[0]:
         print("❌ Get performance failed")
@@ -240,6 +308,9 @@ def main():
     if not tester.test_get_performance_chart()[0]:
         print("❌ Get performance chart failed")
 
+    if not tester.test_get_performance_chart_window()[0]:
+        print("❌ Get performance chart window failed")
+
     # Calculator test
     if not tester.test_position_size_calculator()[0]:
         print("❌ Position size calculator failed")
@@ -248,6 +319,15 @@ def main():
     if not tester.test_get_alerts()[0]:
         print("❌ Get alerts failed")
 
+    if not tester.test_get_unread_alert_count()[0]:
+        print("❌ Get unread alert count failed")
+
+    if not tester.test_get_price_alerts()[0]:
+        print("❌ Get price alerts failed")
+
+    if not tester.test_watchlist()[0]:
+        print("❌ Watch pair failed")
+
     # Subscription test
     if not tester.test_subscription_plans()[0]:
         print("❌ Get subscription plans failed")
@@ -260,6 +340,24 @@ def main():
     if not tester.test_admin_get_stats()[0]:
         print("❌ Admin get stats failed")
 
+    if not tester.test_admin_get_upstreams()[0]:
+        print("❌ Admin get upstreams failed")
+
+    if not tester.test_admin_explain_queries()[0]:
+        print("❌ Admin explain queries failed")
+
+    if not tester.test_admin_get_migrations()[0]:
+        print("❌ Admin get migrations failed")
+
+    if not tester.test_admin_get_rationales()[0]:
+        print("❌ Admin get rationales failed")
+
+    if not tester.test_admin_get_auth_cache()[0]:
+        print("❌ Admin get auth cache failed")
+
+    if not tester.test_admin_get_fanout()[0]:
+        print("❌ Admin get fan-out failed")
+
     if not tester.test_admin_get_signals()[0]:
         print("❌ Admin get signals failed")
 
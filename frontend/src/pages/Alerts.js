@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useAuth } from '../context/AuthContext';
 import { Layout } from '../components/Layout';
 import { Button } from '../components/ui/button';
@@ -12,14 +12,29 @@ export const Alerts = () => {
   const { token } = useAuth();
   const [alerts, setAlerts] = useState([]);
   const [loading, setLoading] = useState(true);
+  const cursorRef = useRef(null);
 
   const fetchAlerts = async () => {
     if (!token) return;
     try {
+      const since = cursorRef.current;
       const response = await axios.get(`${API}/alerts`, {
+        params: since ? { since } : {},
         headers: { Authorization: `Bearer ${token}` }
       });
-      setAlerts(response.data);
+      cursorRef.current = response.headers['x-next-cursor'] || since;
+      if (!since) {
+        setAlerts(response.data);
+      } else if (response.data.length > 0) {
+        // Delta sync: replace changed alerts, prepend new ones
+        setAlerts(prev => {
+          const changed = new Map(response.data.map(a => [a.alert_id, a]));
+          const merged = prev.map(a => changed.get(a.alert_id) || a);
+          const known = new Set(prev.map(a => a.alert_id));
+          const added = response.data.filter(a => !known.has(a.alert_id)).reverse();
+          return [...added, ...merged];
+        });
+      }
     } catch (error) {
       console.error('Failed to fetch alerts:', error);
     } finally {
@@ -28,7 +43,10 @@ export const Alerts = () => {
   };
 
   useEffect(() => {
+    cursorRef.current = null;
     fetchAlerts();
+    const interval = setInterval(fetchAlerts, 30000);
+    return () => clearInterval(interval);
   }, [token]);
 
   const markAsRead = async (alertId) => {
@@ -58,7 +76,10 @@ export const Alerts = () => {
   const getAlertIcon = (type) => {
     switch (type) {
       case 'NEW_SIGNAL':
+      case 'WATCHLIST_SIGNAL':
         return <Bell className="w-5 h-5 text-primary" />;
+      case 'PRICE_ALERT':
+        return <Bell className="w-5 h-5 text-[#D4AF37]" />;
       case 'TP_HIT':
         return <Check className="w-5 h-5 text-green-500" />;
       case 'SL_HIT':
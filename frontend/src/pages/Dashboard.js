@@ -10,12 +10,15 @@ import { cn } from '../lib/utils';
 
 const API = process.env.REACT_APP_BACKEND_URL + '/api';
 
+const formatUtcTime = (date) => `${date.toISOString().slice(11, 16)} UTC`;
+
 export const Dashboard = () => {
   const { token, isPremium } = useAuth();
   const [signals, setSignals] = useState([]);
   const [loading, setLoading] = useState(true);
   const [generating, setGenerating] = useState(false);
   const [marketStatus, setMarketStatus] = useState(null);
+  const [utcTime, setUtcTime] = useState(() => formatUtcTime(new Date()));
   const [filters, setFilters] = useState({
     pair: 'all',
     timeframe: 'all',
@@ -41,17 +44,14 @@ export const Dashboard = () => {
       if (filters.pair !== 'all') params.append('pair', filters.pair);
       if (filters.timeframe !== 'all') params.append('timeframe', filters.timeframe);
       if (filters.status !== 'all') params.append('status', filters.status);
+      if (filters.type !== 'all') params.append('signal_type', filters.type);
+      params.append('view', 'card');
       
       const response = await axios.get(`${API}/signals?${params}`, {
         headers: token ? { Authorization: `Bearer ${token}` } : {}
       });
       
-      let filteredSignals = Array.isArray(response.data) ? response.data : [];
-      if (filters.type !== 'all') {
-        filteredSignals = filteredSignals.filter(s => s.signal_type === filters.type);
-      }
-      
-      setSignals(filteredSignals);
+      setSignals(Array.isArray(response.data) ? response.data : []);
     } catch (error) {
       console.error('Failed to fetch signals:', error);
       setSignals([]);
@@ -101,7 +101,11 @@ export const Dashboard = () => {
     fetchPairs();
     fetchMarketStatus();
     const marketInterval = setInterval(fetchMarketStatus, 60000);
-    return () => clearInterval(marketInterval);
+    const clockInterval = setInterval(() => setUtcTime(formatUtcTime(new Date())), 15000);
+    return () => {
+      clearInterval(marketInterval);
+      clearInterval(clockInterval);
+    };
   }, []);
 
   useEffect(() => {
@@ -179,7 +183,7 @@ export const Dashboard = () => {
               </div>
               <div className="flex items-center gap-2 text-sm text-[var(--text-muted)]">
                 <Clock className="w-4 h-4" />
-                {marketStatus.server_time || 'Loading...'}
+                {utcTime}
               </div>
             </div>
             
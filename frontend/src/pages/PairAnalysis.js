@@ -4,7 +4,7 @@ import { useAuth } from '../context/AuthContext';
 import { Layout } from '../components/Layout';
 import { Button } from '../components/ui/button';
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '../components/ui/select';
-import { ArrowLeft, TrendingUp, TrendingDown, Loader2, Lock, RefreshCw, Clock, Target } from 'lucide-react';
+import { ArrowLeft, TrendingUp, TrendingDown, Loader2, Lock, RefreshCw, Clock, Target, Star } from 'lucide-react';
 import { AreaChart, Area, XAxis, YAxis, Tooltip, ResponsiveContainer, ReferenceLine, ComposedChart, Bar, Line } from 'recharts';
 import { formatPrice, cn } from '../lib/utils';
 import axios from 'axios';
@@ -19,19 +19,40 @@ export const PairAnalysis = () => {
   const [realtimeData, setRealtimeData] = useState([]);
   const [timeframe, setTimeframe] = useState('1H');
   const [loading, setLoading] = useState(true);
+  const [watching, setWatching] = useState(false);
   
   const pairFormatted = pair?.replace('-', '/');
 
   const fetchAnalysis = useCallback(async () => {
     try {
-      const response = await axios.get(`${API}/pairs/${pair}/analysis`, {
+      const response = await axios.get(`${API}/pairs/${pair}/analysis?timeframe=${timeframe}`, {
         headers: token ? { Authorization: `Bearer ${token}` } : {}
       });
       setAnalysis(response.data);
     } catch (error) {
       console.error('Failed to fetch analysis:', error);
     }
-  }, [pair, token]);
+  }, [pair, token, timeframe]);
+
+  useEffect(() => {
+    if (!token) return;
+    axios.get(`${API}/watchlist`, { headers: { Authorization: `Bearer ${token}` } })
+      .then(response => setWatching(response.data.pairs.includes(pairFormatted)))
+      .catch(error => console.error('Failed to fetch watchlist:', error));
+  }, [token, pairFormatted]);
+
+  const toggleWatch = async () => {
+    try {
+      const response = await axios({
+        method: watching ? 'delete' : 'put',
+        url: `${API}/watchlist/${pair}`,
+        headers: { Authorization: `Bearer ${token}` }
+      });
+      setWatching(response.data.watching);
+    } catch (error) {
+      console.error('Failed to update watchlist:', error);
+    }
+  };
 
   const fetchPriceData = useCallback(async () => {
     try {
@@ -68,15 +89,33 @@ export const PairAnalysis = () => {
     fetchPriceData();
     fetchRealtimeData();
     
-    // Real-time updates
-    const realtimeInterval = setInterval(fetchRealtimeData, 5000);
+    // Real-time updates pushed by the price stream, polling only as a fallback
+    let realtimeInterval = null;
+    const stream = new EventSource(`${API}/stream/prices?pairs=${pair}`);
+    stream.addEventListener('quote', (event) => {
+      const quote = JSON.parse(event.data);
+      const timestamp = Math.floor(new Date(quote.timestamp).getTime() / 1000);
+      setRealtimeData(prev => [...prev, {
+        ...quote,
+        close: quote.price,
+        time: new Date(timestamp * 1000).toLocaleTimeString('en-US', { hour: '2-digit', minute: '2-digit' }),
+        timestamp
+      }].slice(-60));
+    });
+    stream.onerror = () => {
+      stream.close();
+      if (!realtimeInterval) {
+        realtimeInterval = setInterval(fetchRealtimeData, 5000);
+      }
+    };
     const analysisInterval = setInterval(fetchAnalysis, 10000);
     
     return () => {
+      stream.close();
       clearInterval(realtimeInterval);
       clearInterval(analysisInterval);
     };
-  }, [fetchAnalysis, fetchPriceData, fetchRealtimeData]);
+  }, [pair, fetchAnalysis, fetchPriceData, fetchRealtimeData]);
 
   const getIndicatorColor = (name, value) => {
     if (name === 'rsi') {
@@ -137,6 +176,11 @@ export const PairAnalysis = () => {
             </div>
           </div>
           <div className="flex items-center gap-3">
+            {token && (
+              <Button variant="outline" size="icon" onClick={toggleWatch} data-testid="watch-toggle" className={cn("hover:bg-[#D4AF37]/10 hover:text-[#D4AF37] hover:border-[#D4AF37]/30", watching && "text-[#D4AF37] border-[#D4AF37]/30")}>
+                <Star className={cn("w-4 h-4", watching && "fill-current")} />
+              </Button>
+            )}
             <Select value={timeframe} onValueChange={setTimeframe}>
               <SelectTrigger className="w-24 bg-[#0F1115] border-white/10" data-testid="timeframe-select">
                 <SelectValue />
@@ -256,7 +300,7 @@ export const PairAnalysis = () => {
                   <span className="w-2 h-2 rounded-full bg-[#2E8B57] animate-pulse" />
                   <h2 className="font-heading text-lg">Real-Time (1 Min)</h2>
                 </div>
-                <span className="text-xs text-slate-500">Updates every 5 seconds</span>
+                <span className="text-xs text-slate-500">Live stream</span>
               </div>
               <div className="h-[200px]">
                 <ResponsiveContainer width="100%" height="100%">
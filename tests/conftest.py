@@ -0,0 +1,325 @@
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from pymongo import InsertOne, ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+# server.py reads its configuration at import; point Mongo somewhere that fails fast, tests never reach it
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:1/?serverSelectionTimeoutMS=200")
+os.environ.setdefault("DB_NAME", "fxpulse_test")
+os.environ.setdefault("EMERGENT_LLM_KEY", "test-key")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+import server as server_module  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def server():
+    return server_module
+
+
+class StubUpstream:
+    """Local HTTP server standing in for an upstream API; routes map a path to (status, JSON body, delay)"""
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def respond(self):
+                path = self.path.split("?")[0]
+                stub.requests.append((self.command, path))
+                status, body, delay = stub.routes.get(path, (404, {"error": "not found"}, 0))
+                if delay:
+                    time.sleep(delay)
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self.respond()
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                self.respond()
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def route(self, path: str, status: int = 200, body=None, delay: float = 0):
+        self.routes[path] = (status, body if body is not None else {}, delay)
+
+    def count(self, path: str) -> int:
+        return sum(1 for _, requested in self.requests if requested == path)
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def stub_upstream():
+    stub = StubUpstream()
+    yield stub
+    stub.close()
+
+
+class RecordingCollection:
+    """Collection double that records the writes a unit under test makes"""
+
+    def __init__(self):
+        self.bulk_writes = []
+        self.inserted = []
+
+    async def bulk_write(self, ops, ordered=True):
+        self.bulk_writes.append(list(ops))
+
+    async def insert_many(self, docs, ordered=True):
+        self.inserted.extend(docs)
+
+
+MISSING = object()
+
+
+def field_value(doc: dict, path: str):
+    for part in path.split("."):
+        if not isinstance(doc, dict) or part not in doc:
+            return MISSING
+        doc = doc[part]
+    return doc
+
+
+COMPARISONS = {
+    "$gt": lambda value, operand: value > operand,
+    "$gte": lambda value, operand: value >= operand,
+    "$lt": lambda value, operand: value < operand,
+    "$lte": lambda value, operand: value <= operand,
+}
+
+
+def matches_condition(value, condition) -> bool:
+    if not (isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition)):
+        return value == condition
+    for op, operand in condition.items():
+        if op == "$exists":
+            ok = (value is not MISSING) == operand
+        elif op == "$ne":
+            ok = value != operand
+        elif op == "$in":
+            ok = value in operand
+        elif op == "$nin":
+            ok = value not in operand
+        else:
+            ok = value is not MISSING and value is not None and COMPARISONS[op](value, operand)
+        if not ok:
+            return False
+    return True
+
+
+def matches(doc: dict, query: dict) -> bool:
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(doc, branch) for branch in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, branch) for branch in condition):
+                return False
+        elif not matches_condition(field_value(doc, key), condition):
+            return False
+    return True
+
+
+class Result:
+    def __init__(self, **counts):
+        self.matched_count = counts.get("matched_count", 0)
+        self.modified_count = counts.get("modified_count", 0)
+        self.deleted_count = counts.get("deleted_count", 0)
+        self.upserted_id = counts.get("upserted_id")
+        self.inserted_count = counts.get("inserted_count", 0)
+
+
+class MemoryCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction=None):
+        keys = key if isinstance(key, list) else [(key, direction or 1)]
+        for field, order in reversed(keys):
+            self.docs.sort(key=lambda doc: field_value(doc, field), reverse=order == -1)
+        return self
+
+    def limit(self, count):
+        if count:
+            self.docs = self.docs[:count]
+        return self
+
+    async def to_list(self, length):
+        return self.docs[:length] if length else self.docs
+
+    def __aiter__(self):
+        self.iterator = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self.iterator)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class MemoryCollection:
+    """In-memory collection with the subset of Mongo query and update operators the server uses"""
+
+    def __init__(self, docs=(), unique: tuple = ()):
+        self.docs = []
+        self.unique = unique
+        self.next_id = 1
+        for doc in docs:
+            self.insert(doc)
+
+    def insert(self, doc):
+        doc = dict(doc)
+        doc.setdefault("_id", self.next_id)
+        self.next_id += 1
+        if self.unique and any(all(other.get(f) == doc.get(f) for f in self.unique) for other in self.docs):
+            raise DuplicateKeyError("duplicate key")
+        self.docs.append(doc)
+        return doc
+
+    def apply(self, doc: dict, update: dict, inserting: bool = False) -> bool:
+        before = dict(doc)
+        if not any(key.startswith("$") for key in update):
+            doc.clear()
+            doc.update({"_id": before["_id"], **update})
+        for field, value in update.get("$set", {}).items():
+            doc[field] = value
+        for field in update.get("$unset", {}):
+            doc.pop(field, None)
+        for field, value in update.get("$inc", {}).items():
+            doc[field] = doc.get(field, 0) + value
+        for field, value in update.get("$max", {}).items():
+            if field not in doc or value > doc[field]:
+                doc[field] = value
+        if inserting:
+            doc.update(update.get("$setOnInsert", {}))
+        return doc != before
+
+    def project(self, doc, projection):
+        doc = dict(doc)
+        if projection and projection.get("_id") == 0:
+            doc.pop("_id", None)
+        return doc
+
+    def find(self, query=None, projection=None):
+        return MemoryCursor([self.project(doc, projection) for doc in self.docs if matches(doc, query or {})])
+
+    async def find_one(self, query=None, projection=None, sort=None):
+        cursor = self.find(query, projection)
+        if sort:
+            cursor.sort(sort)
+        return cursor.docs[0] if cursor.docs else None
+
+    async def count_documents(self, query, limit=0):
+        count = sum(1 for doc in self.docs if matches(doc, query))
+        return min(count, limit) if limit else count
+
+    async def insert_one(self, doc):
+        doc["_id"] = self.insert(doc)["_id"]
+        return Result(inserted_count=1)
+
+    async def insert_many(self, docs, ordered=True):
+        for doc in docs:
+            await self.insert_one(doc)
+
+    def update(self, query, update, upsert=False, many=False) -> Result:
+        matched = modified = 0
+        for doc in self.docs:
+            if matches(doc, query):
+                matched += 1
+                modified += self.apply(doc, update)
+                if not many:
+                    break
+        if matched or not upsert:
+            return Result(matched_count=matched, modified_count=modified)
+        doc = {key: value for key, value in query.items() if not key.startswith("$") and not isinstance(value, dict)}
+        doc = self.insert(doc)
+        self.apply(doc, update, inserting=True)
+        return Result(upserted_id=doc["_id"])
+
+    async def update_one(self, query, update, upsert=False):
+        return self.update(query, update, upsert)
+
+    async def update_many(self, query, update):
+        return self.update(query, update, many=True)
+
+    async def replace_one(self, query, replacement, upsert=False):
+        return self.update(query, replacement, upsert)
+
+    async def find_one_and_update(self, query, update, projection=None, upsert=False,
+                                  return_document=ReturnDocument.BEFORE):
+        for doc in self.docs:
+            if matches(doc, query):
+                before = dict(doc)
+                self.apply(doc, update)
+                return self.project(doc if return_document == ReturnDocument.AFTER else before, projection)
+        if not upsert:
+            return None
+        upserted_id = self.update(query, update, upsert=True).upserted_id
+        if return_document != ReturnDocument.AFTER:
+            return None
+        return next(self.project(doc, projection) for doc in self.docs if doc["_id"] == upserted_id)
+
+    async def delete_one(self, query):
+        for i, doc in enumerate(self.docs):
+            if matches(doc, query):
+                del self.docs[i]
+                return Result(deleted_count=1)
+        return Result()
+
+    async def delete_many(self, query):
+        kept = [doc for doc in self.docs if not matches(doc, query)]
+        deleted, self.docs = len(self.docs) - len(kept), kept
+        return Result(deleted_count=deleted)
+
+    async def bulk_write(self, ops, ordered=True):
+        matched = modified = 0
+        for op in ops:
+            if isinstance(op, InsertOne):
+                self.insert(op._doc)
+                continue
+            if isinstance(op, (UpdateOne, ReplaceOne)):
+                result = self.update(op._filter, op._doc, op._upsert)
+                matched += result.matched_count
+                modified += result.modified_count
+        return Result(matched_count=matched, modified_count=modified)
+
+
+class RecordingDatabase:
+    def __init__(self):
+        self.collections = {}
+
+    def __getattr__(self, name):
+        return self.collections.setdefault(name, RecordingCollection())
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+
+@pytest.fixture
+def recording_db(server, monkeypatch):
+    db = RecordingDatabase()
+    monkeypatch.setattr(server, "db", db)
+    return db
@@ -0,0 +1,38 @@
+def new_signal(signal_id: str, pair: str = "EUR/USD") -> dict:
+    return {"signal_id": signal_id, "currency_pair": pair, "timeframe": "4H"}
+
+
+def queued(fanout) -> list:
+    items = []
+    while not fanout.queue.empty():
+        signal, requested_by = fanout.queue.get_nowait()
+        items.append((signal["signal_id"], requested_by))
+    return items
+
+
+def test_batch_signals_are_throttled_per_pair(server):
+    fanout = server.AlertFanout()
+    fanout.submit([new_signal("s1"), new_signal("s2"), new_signal("s3", pair="GBP/USD")])
+
+    assert queued(fanout) == [("s1", None), ("s3", None)]
+    assert fanout.throttled == 1
+
+
+def test_throttled_pair_still_fans_out_a_user_requested_signal(server):
+    fanout = server.AlertFanout()
+    fanout.submit([new_signal("batch")])
+    fanout.submit([new_signal("requested")], requested_by={"user_a"})
+
+    assert queued(fanout) == [("batch", None), ("requested", {"user_a"})]
+    assert fanout.throttled == 0
+
+
+def test_signal_dropped_on_a_full_queue_does_not_throttle_its_pair(server, monkeypatch):
+    monkeypatch.setattr(server, "ALERT_FANOUT_QUEUE_SIZE", 1)
+    fanout = server.AlertFanout()
+    fanout.submit([new_signal("fills", pair="GBP/USD"), new_signal("dropped")])
+    assert fanout.dropped == 1
+
+    queued(fanout)
+    fanout.submit([new_signal("retry")])
+    assert queued(fanout) == [("retry", None)]
@@ -0,0 +1,167 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from tests.conftest import MemoryCollection
+
+USER = {"user_id": "user_a", "subscription_tier": "free"}
+
+
+def stored_alert(alert_id: str, seconds_ago: float, now: datetime = None) -> dict:
+    stamp = (now or datetime.now(timezone.utc)) - timedelta(seconds=seconds_ago)
+    return {
+        "alert_id": alert_id,
+        "user_id": "user_a",
+        "alert_type": 0,
+        "message": "New BUY signal",
+        "is_read": False,
+        "created_at": stamp,
+        "updated_at": stamp,
+        "schema_version": 2,
+    }
+
+
+@pytest.fixture
+def inbox(server, recording_db):
+    recording_db.collections["alerts"] = MemoryCollection()
+    recording_db.collections["alert_inbox"] = MemoryCollection()
+    return recording_db
+
+
+@pytest.fixture
+def client(server, inbox):
+    server.app.dependency_overrides[server.require_auth] = lambda: USER
+    yield TestClient(server.app)
+    server.app.dependency_overrides.clear()
+
+
+def add_alert(server, inbox, alert: dict):
+    inbox.alerts.docs.append(alert)
+    asyncio.run(server.bump_unread({alert["user_id"]: 1}))
+
+
+def ids(response) -> list:
+    return [alert["alert_id"] for alert in response.json()]
+
+
+def floor(server) -> datetime:
+    return datetime.now(timezone.utc) - timedelta(seconds=server.ALERT_SYNC_GRACE_SECONDS)
+
+
+def test_complete_read_moves_the_cursor_to_the_grace_window(server):
+    before = floor(server)
+    for alerts in ([], [stored_alert("a_old", 60)], [stored_alert("a_new", 1)]):
+        position = server.next_alert_cursor(alerts, complete=True)
+        assert before <= position[0] <= floor(server) and position[1] == ""
+
+
+def test_partial_read_stops_at_the_newest_alert_but_not_past_the_window(server):
+    old, older = stored_alert("a_old", 60), stored_alert("a_older", 120)
+    assert server.next_alert_cursor([older, old], complete=False) == (old["updated_at"], "a_old")
+    assert server.next_alert_cursor([older, stored_alert("a_new", 1)], complete=False)[1] == ""
+
+
+def test_delta_sync_returns_only_newer_alerts_in_cursor_order(server, inbox, client):
+    now = datetime.now(timezone.utc)
+    for alert_id, seconds_ago in [("a1", 300), ("a3", 200), ("a2", 200), ("a4", 100)]:
+        add_alert(server, inbox, stored_alert(alert_id, seconds_ago, now))
+    cursor = server.encode_alert_cursor((inbox.alerts.docs[0]["updated_at"], "a1"))
+
+    response = client.get("/api/alerts", params={"since": cursor})
+
+    assert ids(response) == ["a2", "a3", "a4"]
+    assert server.decode_alert_cursor(response.headers["x-next-cursor"])[1] == ""
+
+
+def test_a_full_page_is_followed_by_the_next_one(server, inbox, client, monkeypatch):
+    monkeypatch.setattr(server, "ALERT_SYNC_MAX", 2)
+    for alert_id, seconds_ago in [("a1", 300), ("a2", 200), ("a3", 100)]:
+        add_alert(server, inbox, stored_alert(alert_id, seconds_ago))
+    cursor = server.encode_alert_cursor((inbox.alerts.docs[0]["updated_at"] - timedelta(seconds=1), ""))
+
+    first = client.get("/api/alerts", params={"since": cursor})
+    second = client.get("/api/alerts", params={"since": first.headers["x-next-cursor"]})
+
+    assert ids(first) == ["a1", "a2"]
+    assert ids(second) == ["a3"]
+
+
+def test_unchanged_inbox_skips_the_alert_query(server, inbox, client):
+    add_alert(server, inbox, stored_alert("a1", 120))
+    # The counter was bumped just after the alert was written, a while before this poll
+    inbox.alert_inbox.docs[0]["changed_at"] = inbox.alerts.docs[0]["updated_at"] + timedelta(seconds=1)
+    cursor = client.get("/api/alerts").headers["x-next-cursor"]
+
+    def no_query(*args, **kwargs):
+        pytest.fail("an unchanged inbox must not query alerts")
+
+    inbox.alerts.find = no_query
+    response = client.get("/api/alerts", params={"since": cursor})
+    assert response.json() == []
+    assert response.headers["x-next-cursor"] == cursor
+
+
+def test_a_write_landing_just_behind_the_cursor_is_still_delivered(server, inbox, client):
+    add_alert(server, inbox, stored_alert("a1", 3))
+    first = client.get("/api/alerts")
+    assert ids(first) == ["a1"]
+
+    # Another worker's write is stamped before a1 but lands after the first poll
+    add_alert(server, inbox, stored_alert("a0", 5))
+    second = client.get("/api/alerts", params={"since": first.headers["x-next-cursor"]})
+    assert "a0" in ids(second)
+
+
+def test_cursor_never_moves_backwards(server, inbox, client):
+    add_alert(server, inbox, stored_alert("a1", 1))
+    ahead = server.encode_alert_cursor((datetime.now(timezone.utc), "zzz"))
+    response = client.get("/api/alerts", params={"since": ahead})
+    assert response.headers["x-next-cursor"] == ahead
+
+
+def test_malformed_since_is_a_400(client):
+    assert client.get("/api/alerts", params={"since": "%%%"}).status_code == 400
+
+
+def unread(client) -> int:
+    return client.get("/api/alerts/unread-count").json()["unread"]
+
+
+def test_read_all_racing_a_new_alert_settles_on_the_true_count(server, inbox, client):
+    add_alert(server, inbox, stored_alert("a1", 60))
+    add_alert(server, inbox, stored_alert("a2", 50))
+
+    # The fan-out has inserted a3 but not yet bumped the counter when read-all runs
+    inbox.alerts.docs.append(stored_alert("a3", 1))
+    client.put("/api/alerts/read-all")
+    assert unread(client) == 0
+    asyncio.run(server.bump_unread({"user_a": 1}))
+
+    assert unread(client) == 0
+    assert sum(not alert["is_read"] for alert in inbox.alerts.docs) == 0
+
+
+def test_mark_read_and_read_all_decrement_each_alert_once(server, inbox, client):
+    add_alert(server, inbox, stored_alert("a1", 60))
+    add_alert(server, inbox, stored_alert("a2", 50))
+
+    client.put("/api/alerts/a1/read")
+    client.put("/api/alerts/a1/read")
+    assert unread(client) == 1
+    client.put("/api/alerts/read-all")
+    client.put("/api/alerts/read-all")
+    assert unread(client) == 0
+    assert inbox.alert_inbox.docs[0]["unread"] == 0
+
+
+def test_unread_count_revalidates_with_etag(server, inbox, client):
+    add_alert(server, inbox, stored_alert("a1", 60))
+    first = client.get("/api/alerts/unread-count")
+    etag = first.headers["etag"]
+    assert client.get("/api/alerts/unread-count", headers={"If-None-Match": etag}).status_code == 304
+
+    add_alert(server, inbox, stored_alert("a2", 1))
+    changed = client.get("/api/alerts/unread-count", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.json() == {"unread": 2}
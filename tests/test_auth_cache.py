@@ -0,0 +1,116 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from tests.conftest import MemoryCollection
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class CountingCollection(MemoryCollection):
+    def __init__(self, docs=()):
+        super().__init__(docs)
+        self.reads = 0
+
+    async def find_one(self, query=None, projection=None, sort=None):
+        self.reads += 1
+        return await super().find_one(query, projection, sort)
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def cache(server, recording_db, clock, monkeypatch):
+    cache = server.AuthCache(clock)
+    monkeypatch.setattr(server, "auth_cache", cache)
+    recording_db.collections["users"] = CountingCollection([
+        {
+            "user_id": f"user_{name}",
+            "email": f"{name}@example.com",
+            "subscription_tier": "free",
+            "is_admin": name == "admin",
+            "created_at": datetime(2026, 1, 1, tzinfo=timezone.utc),
+        }
+        for name in ("a", "b", "c", "admin")
+    ])
+    recording_db.collections["user_sessions"] = CountingCollection([{
+        "session_token": "token_a",
+        "user_id": "user_a",
+        "expires_at": datetime.now(timezone.utc) + timedelta(days=7),
+    }])
+    recording_db.collections["counters"] = MemoryCollection()
+    return cache
+
+
+def get_user(cache, user_id: str):
+    return asyncio.run(cache.get_user(user_id))
+
+
+def test_records_are_served_from_cache_until_the_ttl_passes(server, cache, clock, recording_db):
+    get_user(cache, "user_a")
+    clock.now += server.AUTH_CACHE_TTL_SECONDS - 0.001
+    get_user(cache, "user_a")
+    assert recording_db.users.reads == 1
+
+    clock.now += 0.001
+    get_user(cache, "user_a")
+    assert recording_db.users.reads == 2
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_least_recently_used_record_is_evicted(server, cache, recording_db, monkeypatch):
+    monkeypatch.setattr(server, "AUTH_CACHE_SIZE", 2)
+    get_user(cache, "user_a")
+    get_user(cache, "user_b")
+    get_user(cache, "user_a")
+    get_user(cache, "user_c")
+
+    assert list(cache.users) == ["user_a", "user_c"]
+    reads = recording_db.users.reads
+    get_user(cache, "user_a")
+    assert recording_db.users.reads == reads
+    get_user(cache, "user_b")
+    assert recording_db.users.reads == reads + 1
+
+
+def test_callers_get_a_copy_of_the_cached_record(cache):
+    get_user(cache, "user_a")["subscription_tier"] = "premium"
+    assert get_user(cache, "user_a")["subscription_tier"] == "free"
+
+
+def test_logout_revokes_a_cached_session_at_once(server, cache):
+    client = TestClient(server.app)
+    client.cookies.set("session_token", "token_a")
+    assert client.get("/api/auth/me").status_code == 200
+
+    client.post("/api/auth/logout")
+    client.cookies.set("session_token", "token_a")
+
+    assert "token_a" not in cache.sessions
+    assert client.get("/api/auth/me").status_code == 401
+
+
+def test_subscription_change_is_seen_on_the_next_request(server, cache):
+    client = TestClient(server.app)
+    client.cookies.set("session_token", "token_a")
+    assert client.get("/api/auth/me").json()["subscription_tier"] == "free"
+
+    admin = asyncio.run(cache.get_user("user_admin"))
+    server.app.dependency_overrides[server.require_admin] = lambda: admin
+    try:
+        assert client.put("/api/admin/users/user_a/premium", params={"tier": "pro"}).status_code == 200
+    finally:
+        server.app.dependency_overrides.clear()
+
+    assert client.get("/api/auth/me").json()["subscription_tier"] == "pro"
@@ -0,0 +1,175 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope="module")
+def cold_backfill(server):
+    end_minute = 29_700_000 + 617  # mid-week, mid-bar for every timeframe above 1M
+    docs, forming, last_stored = server.build_backfill("EUR/USD", end_minute)
+    bars = {}
+    for doc in docs:
+        bars.setdefault(doc["meta"]["timeframe"], []).append(doc)
+    return server, bars, forming, last_stored
+
+
+def test_every_timeframe_gets_its_target_bar_count(cold_backfill):
+    server, bars, forming, last_stored = cold_backfill
+    for timeframe, target in server.CANDLE_BACKFILL_TARGETS.items():
+        assert len(bars[timeframe]) == target, timeframe
+        assert target >= server.CANDLE_MIN_BARS
+    assert set(forming) == set(server.HIGHER_TIMEFRAMES)
+
+
+def test_each_bar_opens_at_the_previous_close(cold_backfill):
+    _, bars, _, _ = cold_backfill
+    for timeframe, docs in bars.items():
+        opens = np.array([doc["open"] for doc in docs[1:]])
+        closes = np.array([doc["close"] for doc in docs[:-1]])
+        times = np.array([doc["time"].timestamp() for doc in docs])
+        assert np.all(np.diff(times) > 0), timeframe
+        assert np.max(np.abs(opens - closes)) < 1e-9, timeframe
+
+
+def test_timeframes_agree_where_their_bars_end_together(cold_backfill):
+    server, bars, _, _ = cold_backfill
+    daily = {doc["time"]: doc for doc in bars["1D"]}
+    for week in bars["1W"]:
+        days = [daily.get(week["time"] + server.timedelta(days=d)) for d in range(7)]
+        if None in days:
+            continue
+        assert week["open"] == days[0]["open"]
+        assert week["close"] == days[-1]["close"]
+        assert week["high"] == max(day["high"] for day in days)
+        assert week["low"] == min(day["low"] for day in days)
+        assert week["volume"] == sum(day["volume"] for day in days)
+
+
+class StoredMinutes:
+    """candles collection double holding 1M bars written from live ticks"""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.inserted = []
+
+    async def find_one(self, query, projection=None, sort=None):
+        matching = [doc for doc in self.docs if doc["meta"]["timeframe"] == query["meta.timeframe"]]
+        return max(matching, key=lambda doc: doc["time"]) if matching else None
+
+    def find(self, query, projection=None):
+        since = query["time"]["$gte"]
+        docs = [doc for doc in self.docs if doc["meta"]["timeframe"] == "1M" and doc["time"] >= since]
+
+        class Cursor:
+            def sort(self, *args):
+                return self
+
+            async def to_list(self, length):
+                return sorted(docs, key=lambda doc: doc["time"])
+
+        return Cursor()
+
+    async def insert_many(self, docs, ordered=True):
+        self.inserted.extend(docs)
+
+
+def test_restart_resumes_forming_bars_from_stored_minutes_without_filling_the_gap(server, recording_db, monkeypatch):
+    monkeypatch.setattr(server, "candle_aggregators", {})
+    week_start = server.week_start_minute(29_700_000)
+    live = [
+        server.candle_doc("EUR/USD", "1M", [week_start + i, 1.1 + i * 1e-4, 1.1 + i * 1e-4 + 5e-5, 1.1 + i * 1e-4 - 5e-5, 1.1 + (i + 1) * 1e-4, 3])
+        for i in range(90)
+    ]
+    store = StoredMinutes(live)
+    recording_db.collections["candles"] = store
+
+    asyncio.run(server.backfill_candles("EUR/USD"))
+
+    assert store.inserted == []
+    aggregator = server.candle_aggregators["EUR/USD"]
+    assert aggregator.last_stored == {"1M": week_start + 89}
+    hourly = aggregator.forming["1H"]
+    assert hourly[0] == server.minute_to_bar_index("1H", week_start + 60)
+    assert hourly[1] == pytest.approx(1.1 + 60e-4)
+    assert hourly[4] == pytest.approx(1.1 + 90e-4)
+    assert hourly[5] == 90
+    weekly = aggregator.forming["1W"]
+    assert weekly[1] == pytest.approx(1.1) and weekly[5] == 270
+    assert "1M" not in aggregator.forming and "15M" not in aggregator.forming
+
+
+def test_resample_groups_minutes_and_flags_the_unfinished_last_bar(server):
+    minutes = np.arange(60, 130)  # 15M bars 4..7 whole, bar 8 still forming
+    o = np.arange(70, dtype=np.float64)
+    h, l, c = o + 0.5, o - 0.5, o + 1
+    v = np.ones(70, dtype=np.int64)
+
+    idx, bo, bh, bl, bc, bv, complete = server.resample_minute_bars("15M", minutes, o, h, l, c, v)
+
+    assert idx.tolist() == [4, 5, 6, 7, 8]
+    assert complete.tolist() == [True, True, True, True, False]
+    assert (bo[1], bh[1], bl[1], bc[1]) == (15.0, 29.5, 14.5, 30.0)
+    assert bv.tolist() == [15, 15, 15, 15, 10]
+
+
+def test_resample_skips_missing_minutes_without_merging_bars(server):
+    minutes = np.array([0, 1, 2, 16, 17, 29])
+    values = np.arange(6, dtype=np.float64)
+    idx, o, _, _, c, v, complete = server.resample_minute_bars("15M", minutes, values, values, values, values, np.ones(6, dtype=np.int64))
+    assert idx.tolist() == [0, 1]
+    assert o.tolist() == [0.0, 3.0] and c.tolist() == [2.0, 5.0]
+    assert complete.tolist() == [False, True]
+
+
+def feed(aggregator, ticks):
+    closed = []
+    for minute, price in ticks:
+        closed.extend(aggregator.on_tick(price, minute))
+    return closed
+
+
+def test_aggregator_builds_minute_bars_and_rolls_them_up(server, monkeypatch):
+    monkeypatch.setattr(server, "indicator_states", {})
+    aggregator = server.CandleAggregator("EUR/USD", {})
+    ticks = [(minute, 1.0 + minute / 100 + offset) for minute in range(15) for offset in (0.0, 0.004, -0.003)]
+    closed = feed(aggregator, ticks + [(15, 2.0)])
+
+    minute_bars = [doc for doc in closed if doc["meta"]["timeframe"] == "1M"]
+    assert len(minute_bars) == 15
+    first = minute_bars[0]
+    assert (first["open"], first["high"], first["low"], first["close"], first["volume"]) == (1.0, 1.004, 0.997, 0.997, 3)
+
+    quarter = [doc for doc in closed if doc["meta"]["timeframe"] == "15M"]
+    assert len(quarter) == 1
+    assert quarter[0]["open"] == 1.0 and quarter[0]["close"] == pytest.approx(1.14 - 0.003)
+    assert quarter[0]["high"] == pytest.approx(1.144) and quarter[0]["volume"] == 45
+    assert aggregator.last_stored["15M"] == 0
+    assert aggregator.forming["1M"][0] == 15
+
+
+def test_aggregator_closes_a_bar_a_gap_skipped_and_never_repeats_stored_bars(server, monkeypatch):
+    monkeypatch.setattr(server, "indicator_states", {})
+    aggregator = server.CandleAggregator("EUR/USD", {"1M": 3})
+    closed = feed(aggregator, [(3, 1.0), (5, 1.1), (20, 1.2), (21, 1.3)])
+
+    emitted = [(doc["meta"]["timeframe"], doc["close"]) for doc in closed if doc["meta"]["timeframe"] in ("1M", "15M")]
+    assert emitted == [("1M", 1.1), ("1M", 1.2), ("15M", 1.1)]
+
+
+def test_minute_bars_are_pruned_by_meta_fields_only(server, recording_db):
+    deleted = []
+
+    class Candles:
+        async def delete_many(self, query):
+            deleted.append(query)
+
+    recording_db.collections["candles"] = Candles()
+    asyncio.run(server.prune_minute_candles())
+
+    query = deleted[0]
+    assert all(key.startswith("meta.") for key in query)
+    today = server.timeframe_bar_index("1M", server.datetime.now(server.timezone.utc)) // 1440
+    assert query["meta.day"] == {"$lt": today - server.CANDLE_MINUTE_RETENTION_DAYS}
+    assert server.candle_doc("EUR/USD", "1M", [today * 1440 + 5, 1, 1, 1, 1, 1])["meta"]["day"] == today
+    assert "day" not in server.candle_doc("EUR/USD", "1H", [10, 1, 1, 1, 1, 1])["meta"]
@@ -0,0 +1,27 @@
+import asyncio
+
+from tests.conftest import MemoryCollection
+
+
+def test_a_signup_during_reconciliation_is_not_overwritten(server, recording_db, monkeypatch):
+    counters = MemoryCollection(unique=("_id",))
+    recording_db.collections["counters"] = counters
+    asyncio.run(server.bump_counters(users_total=3))
+    users = {"total": 3}
+    counts = []
+
+    async def count_counters():
+        counts.append(True)
+        if len(counts) == 1:
+            # A user signs up between the count and the write
+            users["total"] += 1
+            await server.bump_counters(users_total=1)
+        return {"users_total": users["total"], "users_premium": 0}
+
+    monkeypatch.setattr(server, "count_counters", count_counters)
+    asyncio.run(server.reconcile_counters())
+    asyncio.run(server.bump_counters(users_premium=1))
+
+    assert len(counts) == 2
+    assert counters.docs[0]["users_total"] == 4
+    assert counters.docs[0]["users_premium"] == 1
@@ -0,0 +1,123 @@
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+COINGECKO_BODY = {
+    "bitcoin": {"usd": 65000.0, "usd_24h_change": 1.5, "eur": 60000.0, "eur_24h_change": 1.2, "btc": 1.0},
+    "ethereum": {"usd": 3200.0, "usd_24h_change": -0.4, "eur": 2950.0, "eur_24h_change": -0.6, "btc": 0.049},
+}
+
+
+@pytest.fixture
+def coingecko(server, stub_upstream, monkeypatch):
+    """Point the CoinGecko client at the stub and start each test with a cold cache"""
+    monkeypatch.setattr(server, "coingecko_http", server.UpstreamClient("coingecko", stub_upstream.url, retries=0))
+    monkeypatch.setattr(server, "crypto_cache", {"data": {}, "last_update": None, "last_error": None})
+    monkeypatch.setattr(server, "crypto_refresh_inflight", None)
+    return stub_upstream
+
+
+def run(server, coro):
+    async def wrapper():
+        try:
+            return await coro
+        finally:
+            await server.coingecko_http.close()
+    return asyncio.run(wrapper())
+
+
+def test_concurrent_refreshes_share_one_upstream_call(server, coingecko):
+    coingecko.route("/simple/price", body=COINGECKO_BODY, delay=0.2)
+
+    async def scenario():
+        return await asyncio.gather(*(server.refresh_crypto_prices_once() for _ in range(20)))
+
+    assert all(run(server, scenario()))
+    assert coingecko.count("/simple/price") == 1
+    assert server.crypto_cache["data"]["bitcoin"]["usd"] == 65000.0
+
+
+def test_cold_reader_does_not_start_a_refresh(server, coingecko):
+    coingecko.route("/simple/price", body=COINGECKO_BODY)
+
+    assert run(server, server.fetch_crypto_prices()) == {}
+    assert coingecko.count("/simple/price") == 0
+
+
+def test_cold_reader_joins_the_refresh_in_flight(server, coingecko):
+    coingecko.route("/simple/price", body=COINGECKO_BODY, delay=0.1)
+
+    async def scenario():
+        server.refresh_crypto_prices_once()
+        return await server.fetch_crypto_prices()
+
+    assert run(server, scenario())["ethereum"]["usd"] == 3200.0
+    assert coingecko.count("/simple/price") == 1
+
+
+def test_bulk_quotes_are_marked_stale_until_fresh_data_arrives(server, coingecko):
+    coingecko.route("/simple/price", body=COINGECKO_BODY)
+
+    async def scenario():
+        cold = await server.get_bulk_prices(["BTC/USD", "EUR/USD"], wait=False)
+        await server.refresh_crypto_prices_once()
+        fresh = await server.get_bulk_prices(["BTC/USD", "EUR/USD"])
+        server.crypto_cache["last_update"] = datetime.now(timezone.utc) - timedelta(
+            seconds=server.CRYPTO_STALE_AFTER_SECONDS + 1
+        )
+        aged = await server.get_bulk_prices(["BTC/USD", "EUR/USD"])
+        return cold, fresh, aged
+
+    cold, fresh, aged = run(server, scenario())
+    assert cold["crypto_stale"] is True
+    assert fresh["crypto_stale"] is False
+    assert dict(server.iter_bulk_quotes(fresh))["BTC/USD"]["price"] == 65000.0
+    assert aged["crypto_stale"] is True
+
+
+def test_refresher_backs_off_while_upstream_fails(server, coingecko, monkeypatch):
+    coingecko.route("/simple/price", status=503)
+    monkeypatch.setattr(server, "CRYPTO_REFRESH_SECONDS", 0.05)
+
+    async def scenario():
+        task = asyncio.create_task(server.run_crypto_refresher())
+        # Attempts land at about 0, 0.1, 0.3 and 0.7 s; without backoff there would be a dozen
+        await asyncio.sleep(0.6)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    run(server, scenario())
+    assert 2 <= coingecko.count("/simple/price") <= 4
+    assert server.crypto_cache["last_error"] == "HTTP 503"
+
+
+class CentredRng:
+    """Stands in for quote_rng with every draw at the low end of integers and zero for uniform noise"""
+
+    def uniform(self, low, high, size):
+        return np.zeros(size)
+
+    def integers(self, low, high, size):
+        return np.full(size, low)
+
+
+QUOTE_FIELDS = ("type", "bid", "ask", "price", "high_24h", "low_24h", "spread_pips")
+
+
+@pytest.mark.parametrize("crypto_data", [COINGECKO_BODY, {}], ids=["live", "simulated"])
+def test_bulk_and_single_crypto_quotes_agree(server, monkeypatch, crypto_data):
+    async def fetch_crypto_prices(wait=True):
+        return crypto_data
+
+    monkeypatch.setattr(server, "fetch_crypto_prices", fetch_crypto_prices)
+    monkeypatch.setattr(server, "quote_rng", CentredRng())
+    monkeypatch.setattr(random, "uniform", lambda low, high: 0.0)
+    pairs = ["BTC/USD", "BTC/EUR", "ETH/BTC"]
+
+    bulk = dict(server.iter_bulk_quotes(server.compute_bulk_quotes(pairs, crypto_data)))
+    for pair in pairs:
+        single = asyncio.run(server.get_crypto_price(pair))
+        assert {field: single[field] for field in QUOTE_FIELDS} == {field: bulk[pair][field] for field in QUOTE_FIELDS}
@@ -0,0 +1,48 @@
+import hashlib
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+OHLCV = ("open", "high", "low", "close", "volume")
+BACKEND = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+
+
+def digest(candles: dict) -> str:
+    return hashlib.sha256(b"".join(np.ascontiguousarray(candles[key]).tobytes() for key in ("bars", *OHLCV))).hexdigest()
+
+
+@pytest.mark.parametrize("pair, timeframe", [("EUR/USD", "1H"), ("BTC/USD", "1M"), ("USD/JPY", "1W")])
+def test_a_bar_is_the_same_whatever_window_it_is_generated_in(server, pair, timeframe):
+    wide = server.generate_candles(pair, timeframe, 5000, 200)
+    narrow = server.generate_candles(pair, timeframe, 5120, 10)
+    again = server.generate_candles(pair, timeframe, 5000, 200)
+
+    for key in OHLCV:
+        np.testing.assert_array_equal(narrow[key], wide[key][120:130])
+        np.testing.assert_array_equal(again[key], wide[key])
+
+
+def test_pairs_and_timeframes_get_independent_paths(server):
+    eur = server.generate_candles("EUR/USD", "1H", 5000, 50)["close"] / server.INSTRUMENTS["EUR/USD"].base_price
+    gbp = server.generate_candles("GBP/USD", "1H", 5000, 50)["close"] / server.INSTRUMENTS["GBP/USD"].base_price
+    eur_4h = server.generate_candles("EUR/USD", "4H", 5000, 50)["close"] / server.INSTRUMENTS["EUR/USD"].base_price
+    assert not np.allclose(eur, gbp)
+    assert not np.allclose(eur, eur_4h)
+
+
+def test_another_process_generates_identical_bars(server):
+    script = (
+        "import hashlib, numpy as np, server\n"
+        "candles = server.generate_candles('EUR/USD', '1H', 480000, 500)\n"
+        "keys = ('bars', 'open', 'high', 'low', 'close', 'volume')\n"
+        "print(hashlib.sha256(b''.join(np.ascontiguousarray(candles[k]).tobytes() for k in keys)).hexdigest())\n"
+    )
+    # A different hash seed rules out any dependence on Python's per-process str hashing
+    env = {**os.environ, "PYTHONHASHSEED": "12345", "PYTHONPATH": BACKEND}
+    result = subprocess.run([sys.executable, "-c", script], env=env, capture_output=True, text=True, timeout=60)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == digest(server.generate_candles("EUR/USD", "1H", 480000, 500))
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+
+def candle_columns(server, count: int) -> dict:
+    candles = server.generate_candles("EUR/USD", "1H", 1000, count)
+    return {key: candles[key] for key in ("open", "high", "low", "close")}
+
+
+def test_incremental_updates_match_a_full_backfill(server):
+    columns = candle_columns(server, 400)
+    full = server.IndicatorState(*(columns[key] for key in ("open", "high", "low", "close")))
+
+    seeded = server.IndicatorState(*(columns[key][:300] for key in ("open", "high", "low", "close")))
+    for high, low, close in zip(columns["high"][300:], columns["low"][300:], columns["close"][300:]):
+        seeded.update(high, low, close)
+
+    expected, actual = full.snapshot(8), seeded.snapshot(8)
+    for name in ("rsi", "macd", "macd_signal", "ema_20", "ema_50", "sma_20", "sma_50", "atr", "bollinger_upper", "bollinger_lower"):
+        assert actual[name] == pytest.approx(expected[name], rel=1e-6, abs=1e-8), name
+    assert actual["trend"] == expected["trend"]
+
+
+def test_moving_averages_match_a_direct_computation(server):
+    columns = candle_columns(server, 120)
+    closes = columns["close"]
+    snapshot = server.IndicatorState(columns["open"], columns["high"], columns["low"], closes).snapshot(8)
+
+    assert snapshot["sma_20"] == pytest.approx(closes[-20:].mean(), abs=1e-8)
+    assert snapshot["sma_50"] == pytest.approx(closes[-50:].mean(), abs=1e-8)
+    assert snapshot["bollinger_upper"] == pytest.approx(closes[-20:].mean() + 2 * closes[-20:].std(), abs=1e-7)
+
+
+def test_ema_series_matches_the_recurrence(server):
+    values = np.linspace(1.0, 2.0, 300) + np.sin(np.arange(300))
+    alpha = server.ema_alpha(12)
+    expected = [values[0]]
+    for value in values[1:]:
+        expected.append(expected[-1] + alpha * (value - expected[-1]))
+    assert server.ema_series(values, alpha) == pytest.approx(expected, rel=1e-9)
@@ -0,0 +1,64 @@
+from datetime import datetime, timezone
+
+from fastapi.testclient import TestClient
+
+
+def hour_of_week(day: int, hour: int) -> int:
+    """day 0 is Monday"""
+    return day * 24 + hour
+
+
+def test_forex_week_opens_sunday_22_and_closes_friday_22(server):
+    assert not server.forex_open_at(hour_of_week(6, 21))
+    assert server.forex_open_at(hour_of_week(6, 22))
+    assert server.forex_open_at(hour_of_week(2, 12))
+    assert server.forex_open_at(hour_of_week(4, 21))
+    assert not server.forex_open_at(hour_of_week(4, 22))
+    assert not server.forex_open_at(hour_of_week(5, 12))
+
+
+def test_sessions_spanning_midnight(server):
+    sydney = {"open": 22, "close": 7}
+    assert server.session_open_at(sydney, 23)
+    assert server.session_open_at(sydney, 6)
+    assert not server.session_open_at(sydney, 7)
+    assert not server.session_open_at(sydney, 21)
+
+
+def test_hours_to_change_point_at_the_next_different_state(server):
+    calendar, hours_to_change = server.SESSION_CALENDAR, server.SESSION_HOURS_TO_CHANGE
+    week = server.HOURS_PER_WEEK
+    for hour in range(week):
+        step = hours_to_change[hour]
+        assert all(calendar[(hour + k) % week] == calendar[hour] for k in range(step))
+        assert calendar[(hour + step) % week] != calendar[hour]
+
+
+def test_weekend_has_no_open_sessions(server):
+    assert server.SESSION_CALENDAR[hour_of_week(5, 12)] == ()
+    assert server.SESSION_HOURS_TO_CHANGE[hour_of_week(5, 12)] == hour_of_week(6, 22) - hour_of_week(5, 12)
+
+
+def test_market_status_is_cached_until_the_next_transition(server):
+    entry = server.get_market_status_entry()
+    next_transition = datetime.fromisoformat(entry["payload"]["next_transition"])
+    assert next_transition > datetime.now(timezone.utc)
+    assert entry["expires_at"] == next_transition
+    assert server.get_market_status_entry()["etag"] == entry["etag"]
+
+
+def test_market_status_route_revalidates_with_etag(server):
+    client = TestClient(server.app)
+    first = client.get("/api/market/status")
+    assert first.status_code == 200
+    assert "server_time" not in first.json()
+    etag = first.headers["etag"]
+    max_age = int(first.headers["cache-control"].split("max-age=")[1])
+    assert 0 <= max_age <= 7 * 24 * 3600
+
+    revalidated = client.get("/api/market/status", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+
+    changed = client.get("/api/market/status", headers={"If-None-Match": '"ms-00000000"'})
+    assert changed.status_code == 200
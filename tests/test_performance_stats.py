@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from tests.conftest import MemoryCollection
+
+SIGNAL = {"currency_pair": "EUR/USD", "timeframe": "1H", "status": 0, "confidence": 70.0}
+
+
+@pytest.fixture
+def stats(server, recording_db):
+    # Mongo's _id index is what turns a stale snapshot guard into a rejected upsert
+    collection = MemoryCollection(unique=("_id",))
+    recording_db.collections["performance_stats"] = collection
+    return collection
+
+
+def stats_doc(collection) -> dict:
+    return collection.docs[0]
+
+
+def test_an_increment_landing_during_the_recount_is_not_overwritten(server, stats, monkeypatch):
+    asyncio.run(server.record_signals_created([SIGNAL]))
+    stored = {"total": 1}
+    builds = []
+
+    async def count_performance_stats():
+        builds.append(True)
+        if len(builds) == 1:
+            # A signal is created (and counted with $inc) while the aggregation runs
+            stored["total"] += 1
+            await server.record_signals_created([SIGNAL])
+        return {"total": stored["total"], "rebuilt_at": len(builds)}
+
+    monkeypatch.setattr(server, "count_performance_stats", count_performance_stats)
+    asyncio.run(server.rebuild_performance_stats())
+
+    assert len(builds) == 2
+    assert stats_doc(stats)["total"] == 2
+    assert stats_doc(stats)["rebuilt_at"] == 2
+
+
+def test_a_recount_that_keeps_losing_leaves_the_incremental_values(server, stats, monkeypatch):
+    asyncio.run(server.record_signals_created([SIGNAL]))
+
+    async def count_performance_stats():
+        await server.record_signals_created([SIGNAL])
+        return {"total": 0}
+
+    monkeypatch.setattr(server, "count_performance_stats", count_performance_stats)
+    asyncio.run(server.rebuild_performance_stats())
+
+    assert stats_doc(stats)["total"] == 1 + server.SNAPSHOT_WRITE_ATTEMPTS
+
+
+def test_a_first_recount_creates_the_document(server, stats, monkeypatch):
+    async def count_performance_stats():
+        return {"total": 4}
+
+    monkeypatch.setattr(server, "count_performance_stats", count_performance_stats)
+    asyncio.run(server.rebuild_performance_stats())
+    asyncio.run(server.record_signals_created([SIGNAL]))
+
+    assert stats_doc(stats)["total"] == 5
+
+
+class StopLoop(Exception):
+    pass
+
+
+def test_only_the_lease_holder_recounts(server, recording_db, monkeypatch):
+    recording_db.collections["scheduler_locks"] = MemoryCollection(unique=("_id",))
+    runs = []
+
+    async def reconcile_counters():
+        runs.append(server.WORKER_ID)
+
+    async def rebuild_performance_stats():
+        pass
+
+    async def sleep(seconds):
+        raise StopLoop()
+
+    monkeypatch.setattr(server, "reconcile_counters", reconcile_counters)
+    monkeypatch.setattr(server, "rebuild_performance_stats", rebuild_performance_stats)
+    monkeypatch.setattr(server.asyncio, "sleep", sleep)
+    for worker_id in ("worker_a", "worker_b", "worker_a"):
+        monkeypatch.setattr(server, "WORKER_ID", worker_id)
+        with pytest.raises(StopLoop):
+            asyncio.run(server.run_counter_reconciler())
+
+    assert runs == ["worker_a", "worker_a"]
@@ -0,0 +1,144 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from pymongo.errors import BulkWriteError
+
+
+def price_alert(alert_id: str, condition: str, level: float, user_id: str = "user_a") -> dict:
+    return {"alert_id": alert_id, "user_id": user_id, "currency_pair": "EUR/USD", "condition": condition, "level": level}
+
+
+def fired(book) -> list:
+    return [op._filter["alert_id"] for op in book.pending]
+
+
+def test_above_and_below_fire_once_the_price_reaches_the_level(server):
+    book = server.PriceAlertBook()
+    book.add(price_alert("up", "above", 1.1050))
+    book.add(price_alert("down", "below", 1.0950))
+
+    book.on_quote("EUR/USD", 1.1000)
+    assert fired(book) == []
+
+    book.on_quote("EUR/USD", 1.1050)
+    assert fired(book) == ["up"]
+
+    book.on_quote("EUR/USD", 1.0900)
+    assert fired(book) == ["up", "down"]
+    assert book.entries == {}
+
+
+def test_cross_fires_between_previous_and_current_price_in_either_direction(server):
+    book = server.PriceAlertBook()
+    for alert_id, level in [("c1", 1.1010), ("c2", 1.1030), ("c3", 1.0990)]:
+        book.add(price_alert(alert_id, "cross", level))
+
+    book.on_quote("EUR/USD", 1.1000)
+    assert fired(book) == []
+
+    book.on_quote("EUR/USD", 1.1020)
+    assert fired(book) == ["c1"]
+
+    book.on_quote("EUR/USD", 1.1020)
+    book.on_quote("EUR/USD", 1.0980)
+    assert fired(book) == ["c1", "c3"]
+    assert set(book.entries) == {"c2"}
+
+
+def test_cross_level_equal_to_the_previous_price_fires_only_once(server):
+    ladder = server.LevelLadder()
+    ladder.add(1.1000, "edge")
+    assert ladder.pop_crossed(1.0990, 1.1000) == ["edge"]
+    ladder.add(1.1000, "edge")
+    assert ladder.pop_crossed(1.1000, 1.1010) == []
+    assert ladder.pop_crossed(1.1010, 1.0990) == ["edge"]
+
+
+def test_cancelled_alert_does_not_fire(server):
+    book = server.PriceAlertBook()
+    book.add(price_alert("gone", "above", 1.1))
+    book.discard("gone")
+    book.on_quote("EUR/USD", 1.2)
+    assert book.pending == []
+
+
+def test_flush_writes_in_batches_and_counts_only_new_notifications(server, recording_db):
+    class Alerts:
+        inserted = []
+
+        async def insert_many(self, docs, ordered=True):
+            Alerts.inserted = docs
+            # The first notification was already written by another worker
+            raise BulkWriteError({"writeErrors": [{"index": 0, "code": 11000}]})
+
+    recording_db.collections["alerts"] = Alerts()
+    book = server.PriceAlertBook()
+    book.add(price_alert("p1", "above", 1.10, user_id="user_a"))
+    book.add(price_alert("p2", "above", 1.11, user_id="user_a"))
+    book.add(price_alert("p3", "below", 1.30, user_id="user_b"))
+    book.on_quote("EUR/USD", 1.12)
+
+    asyncio.run(book.flush())
+
+    assert len(recording_db.price_alerts.bulk_writes) == 1
+    assert len(recording_db.price_alerts.bulk_writes[0]) == 3
+    assert [doc["alert_id"] for doc in Alerts.inserted] == ["alert_p1", "alert_p2", "alert_p3"]
+    assert all(doc["updated_at"] >= doc["created_at"] for doc in Alerts.inserted)
+    inbox = {op._filter["_id"]: op._doc["$inc"]["unread"] for op in recording_db.alert_inbox.bulk_writes[0]}
+    assert inbox == {"user_a": 1, "user_b": 1}
+    assert book.pending == []
+
+
+def test_free_plan_is_refused_before_any_query(server, recording_db):
+    data = server.PriceAlertCreate(currency_pair="EUR/USD", condition="above", level=1.2)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(server.create_price_alert(data, {"user_id": "user_a", "subscription_tier": "free"}))
+    assert error.value.status_code == 403
+
+
+class ActivePriceAlerts:
+    """price_alerts double whose count yields to the loop, so concurrent creates interleave"""
+
+    def __init__(self, existing: int):
+        self.docs = [{"alert_id": f"old_{i}", "user_id": "user_a", "status": "ACTIVE"} for i in range(existing)]
+
+    async def count_documents(self, query, limit=0):
+        await asyncio.sleep(0)
+        return sum(1 for doc in self.docs if doc["user_id"] == query["user_id"] and doc["status"] == "ACTIVE")
+
+    async def insert_one(self, doc):
+        self.docs.append(doc)
+
+    async def delete_one(self, query):
+        self.docs = [doc for doc in self.docs if doc["alert_id"] != query["alert_id"]]
+
+
+def test_concurrent_creates_never_exceed_the_plan_limit(server, recording_db, monkeypatch):
+    monkeypatch.setattr(server, "price_alert_book", server.PriceAlertBook())
+    alerts = ActivePriceAlerts(existing=server.PRICE_ALERT_LIMITS["pro"] - 1)
+    recording_db.collections["price_alerts"] = alerts
+    user = {"user_id": "user_a", "subscription_tier": "pro"}
+    data = server.PriceAlertCreate(currency_pair="EUR/USD", condition="above", level=1.2)
+
+    async def scenario():
+        return await asyncio.gather(*(server.create_price_alert(data, user) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+
+    assert len(alerts.docs) <= server.PRICE_ALERT_LIMITS["pro"]
+    refused = [result for result in results if isinstance(result, HTTPException)]
+    assert all(error.status_code == 403 for error in refused)
+    assert len(server.price_alert_book.entries) == len(results) - len(refused)
+
+
+def test_request_path_quotes_do_not_move_the_alert_book(server, monkeypatch):
+    book = server.PriceAlertBook()
+    monkeypatch.setattr(server, "price_alert_book", book)
+    book.add(price_alert("c1", "cross", 1.0))
+    book.on_quote("EUR/USD", 1.1)
+
+    asyncio.run(server.get_price("EUR/USD"))
+
+    assert book.last_prices["EUR/USD"] == 1.1
+    assert book.pending == []
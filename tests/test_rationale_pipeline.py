@@ -0,0 +1,87 @@
+import asyncio
+
+import openai
+import pytest
+
+
+def completion(text: str) -> dict:
+    return {
+        "id": "chatcmpl-test",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "stub",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+    }
+
+
+def signal(signal_id: str, pair: str = "EUR/USD") -> dict:
+    return {
+        "signal_id": signal_id,
+        "currency_pair": pair,
+        "timeframe": "1H",
+        "signal_type": "BUY",
+        "market_bias": "BULLISH",
+    }
+
+
+@pytest.fixture
+def llm(server, stub_upstream, recording_db, monkeypatch):
+    """Pipeline whose completions go to a local OpenAI-compatible stub"""
+    monkeypatch.setattr(server, "openai_client", openai.AsyncOpenAI(api_key="test", base_url=stub_upstream.url, max_retries=0))
+    return stub_upstream
+
+
+def llm_updates(recording_db) -> dict:
+    return {
+        op._filter["signal_id"]: op._doc["$set"]
+        for batch in recording_db.trading_signals.bulk_writes
+        for op in batch
+    }
+
+
+def test_signals_in_the_same_market_state_share_one_completion(server, llm, recording_db):
+    llm.route("/chat/completions", body=completion("EUR/USD momentum favours buyers."))
+    pipeline = server.RationalePipeline()
+
+    asyncio.run(pipeline.process([signal("sig_a"), signal("sig_b")]))
+
+    assert llm.count("/chat/completions") == 1
+    updates = llm_updates(recording_db)
+    assert set(updates) == {"sig_a", "sig_b"}
+    assert all(update == {"ai_rationale": "EUR/USD momentum favours buyers.", "rationale_source": "llm"} for update in updates.values())
+
+
+def test_cached_rationale_skips_the_llm(server, llm, recording_db):
+    llm.route("/chat/completions", body=completion("Cached text."))
+    pipeline = server.RationalePipeline()
+
+    async def scenario():
+        await pipeline.process([signal("sig_a")])
+        await pipeline.process([signal("sig_b")])
+
+    asyncio.run(scenario())
+    assert llm.count("/chat/completions") == 1
+    assert pipeline.cache.hits == 1
+    assert llm_updates(recording_db)["sig_b"]["ai_rationale"] == "Cached text."
+
+
+def test_slow_llm_leaves_the_template_in_place(server, llm, recording_db, monkeypatch):
+    llm.route("/chat/completions", body=completion("Too late."), delay=0.5)
+    monkeypatch.setattr(server, "RATIONALE_TIMEOUT_SECONDS", 0.1)
+    pipeline = server.RationalePipeline()
+
+    asyncio.run(pipeline.process([signal("sig_a")]))
+
+    assert recording_db.trading_signals.bulk_writes == []
+    assert pipeline.fallbacks == 1
+    assert pipeline.cache.entries == {}
+
+
+def test_upstream_error_falls_back(server, llm, recording_db):
+    llm.route("/chat/completions", status=500, body={"error": {"message": "boom"}})
+    pipeline = server.RationalePipeline()
+
+    asyncio.run(pipeline.process([signal("sig_a")]))
+
+    assert recording_db.trading_signals.bulk_writes == []
+    assert pipeline.fallbacks == 1
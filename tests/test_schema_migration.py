@@ -0,0 +1,116 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from tests.conftest import MemoryCollection
+
+
+def v1_signal(n: int) -> dict:
+    return {
+        "signal_id": f"sig_{n}",
+        "currency_pair": "EUR/USD",
+        "timeframe": "1H",
+        "signal_type": "BUY",
+        "market_bias": "BULLISH",
+        "asset_type": "forex",
+        "status": "ACTIVE",
+        "confidence": 70.0,
+        "created_at": f"2026-01-0{n}T10:00:00+00:00",
+        # v1 stored the templated rationale, which v2 rebuilds on read
+        "ai_rationale": (
+            "Technical analysis indicates bullish momentum on EUR/USD. "
+            "Key support/resistance levels suggests buy opportunity with 70.0% confidence."
+        ),
+    }
+
+
+def v2_signal(n: int) -> dict:
+    return {
+        "signal_id": f"sig_{n}",
+        "currency_pair": "EUR/USD",
+        "status": 1,
+        "created_at": datetime(2026, 1, n, tzinfo=timezone.utc),
+        "ai_rationale": "Custom LLM text",
+        "schema_version": 2,
+    }
+
+
+@pytest.fixture
+def signals(server, recording_db, monkeypatch):
+    monkeypatch.setattr(server, "MIGRATION_BATCH_SIZE", 2)
+    recording_db.collections["migrations"] = MemoryCollection()
+    collection = MemoryCollection([v1_signal(1), v2_signal(2), v1_signal(3), v2_signal(4), v1_signal(5)])
+    recording_db.collections["trading_signals"] = collection
+    return collection
+
+
+def migrate(server):
+    return asyncio.run(server.migrate_collection("trading_signals", server.encode_signal))
+
+
+def by_id(collection) -> dict:
+    return {doc["signal_id"]: doc for doc in collection.docs}
+
+
+def test_v1_documents_are_encoded_and_v2_documents_left_alone(server, signals):
+    untouched = {key: dict(doc) for key, doc in by_id(signals).items() if doc.get("schema_version") == 2}
+
+    assert migrate(server) == 3
+
+    docs = by_id(signals)
+    for signal_id in ("sig_1", "sig_3", "sig_5"):
+        assert docs[signal_id]["schema_version"] == 2
+        assert docs[signal_id]["status"] == server.SIGNAL_ENUMS["status"]["ACTIVE"]
+        assert isinstance(docs[signal_id]["created_at"], datetime)
+        assert "ai_rationale" not in docs[signal_id]
+    for signal_id, doc in untouched.items():
+        assert docs[signal_id] == doc
+
+
+def test_rerunning_the_migration_changes_nothing(server, signals, recording_db):
+    migrate(server)
+    after_first = [dict(doc) for doc in signals.docs]
+
+    assert migrate(server) == 0
+    recording_db.migrations.docs.clear()
+    assert migrate(server) == 0
+    assert signals.docs == after_first
+
+
+def test_a_document_changed_after_the_read_is_not_reverted(server, signals):
+    bulk_write = signals.bulk_write
+    raced = []
+
+    async def racing_bulk_write(ops, ordered=True):
+        if not raced:
+            # An old worker settles sig_1 between the migration's read and its write
+            by_id(signals)["sig_1"]["status"] = "TP_HIT"
+            raced.append(True)
+        return await bulk_write(ops, ordered)
+
+    signals.bulk_write = racing_bulk_write
+    assert migrate(server) == 3
+    assert by_id(signals)["sig_1"]["status"] == server.SIGNAL_ENUMS["status"]["TP_HIT"]
+
+
+def test_an_interrupted_run_resumes_from_its_checkpoint(server, signals, recording_db):
+    bulk_write = signals.bulk_write
+    calls = []
+
+    async def failing_bulk_write(ops, ordered=True):
+        calls.append(len(ops))
+        if len(calls) == 2:
+            raise ConnectionError("worker stopped")
+        return await bulk_write(ops, ordered)
+
+    signals.bulk_write = failing_bulk_write
+    with pytest.raises(ConnectionError):
+        migrate(server)
+    checkpoint = recording_db.migrations.docs[0]
+    assert checkpoint["migrated"] == 2 and not checkpoint.get("done")
+
+    signals.bulk_write = bulk_write
+    assert migrate(server) == 3
+    assert all(doc["schema_version"] == 2 for doc in signals.docs)
+    assert recording_db.migrations.docs[0]["done"] is True
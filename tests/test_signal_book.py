@@ -0,0 +1,164 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from tests.conftest import MemoryCollection
+
+
+def active_signal(signal_id: str, stop_loss: float, take_profit: float, entry: float = 1.1000, expires_in: float = 3600) -> dict:
+    return {
+        "signal_id": signal_id,
+        "currency_pair": "EUR/USD",
+        "timeframe": "1H",
+        "entry_price": entry,
+        "stop_loss": stop_loss,
+        "take_profit": take_profit,
+        "expires_at": (datetime.now(timezone.utc) + timedelta(seconds=expires_in)).isoformat(),
+    }
+
+
+def outcomes(book) -> dict:
+    return {signal_id: fields["status"] for signal_id, fields, _, _ in book.pending}
+
+
+def status(server, name: str) -> int:
+    return server.SIGNAL_ENUMS["status"][name]
+
+
+def test_ladder_pops_only_the_levels_a_price_reaches(server):
+    ladder = server.LevelLadder()
+    for level, signal_id in [(1.10, "a"), (1.20, "b"), (1.15, "c"), (1.15, "d")]:
+        ladder.add(level, signal_id)
+
+    assert ladder.pop_at_or_below(1.0999) == []
+    assert ladder.pop_at_or_below(1.15) == ["a", "c", "d"]
+    assert ladder.pop_at_or_above(1.21) == []
+    assert ladder.pop_at_or_above(1.20) == ["b"]
+    assert ladder.levels == []
+
+
+def test_ladder_remove_drops_one_signal_at_a_shared_level(server):
+    ladder = server.LevelLadder()
+    ladder.add(1.15, "c")
+    ladder.add(1.15, "d")
+    ladder.remove(1.15, "d")
+    assert ladder.signal_ids == ["c"]
+
+
+def test_buy_and_sell_signals_settle_on_the_level_crossed(server):
+    book = server.SignalBook()
+    book.add(active_signal("buy_tp", stop_loss=1.0950, take_profit=1.1050))
+    book.add(active_signal("buy_sl", stop_loss=1.0980, take_profit=1.1100))
+    book.add(active_signal("sell_tp", stop_loss=1.1080, take_profit=1.0960))
+
+    book.on_quote("EUR/USD", 1.1000)
+    assert book.pending == []
+
+    book.on_quote("EUR/USD", 1.0970)
+    assert outcomes(book) == {"buy_sl": status(server, "SL_HIT")}
+
+    book.on_quote("EUR/USD", 1.0955)
+    assert outcomes(book)["sell_tp"] == status(server, "TP_HIT")
+    assert "buy_tp" not in outcomes(book)
+
+    book.on_quote("EUR/USD", 1.1060)
+    assert outcomes(book)["buy_tp"] == status(server, "TP_HIT")
+    assert book.entries == {}
+
+
+def test_expired_signals_settle_at_the_last_price(server):
+    book = server.SignalBook()
+    book.add(active_signal("soon", stop_loss=1.0, take_profit=1.2, expires_in=-1))
+    book.add(active_signal("later", stop_loss=1.0, take_profit=1.2, expires_in=3600))
+    book.on_quote("EUR/USD", 1.1011)
+
+    book.expire(time.time())
+
+    assert outcomes(book) == {"soon": status(server, "EXPIRED")}
+    assert book.pending[0][1]["exit_price"] == 1.1011
+    assert set(book.entries) == {"later"}
+
+
+def test_discarded_signal_no_longer_settles(server):
+    book = server.SignalBook()
+    book.add(active_signal("gone", stop_loss=1.0950, take_profit=1.1050))
+    book.discard("gone")
+    book.on_quote("EUR/USD", 1.2)
+    assert book.pending == []
+
+
+class SettlementResult:
+    def __init__(self, modified_count):
+        self.modified_count = modified_count
+
+
+def test_flush_counts_only_the_settlements_this_worker_applied(server, monkeypatch):
+    class Signals:
+        async def update_one(self, query, update):
+            if query["signal_id"] == "flaky":
+                raise ConnectionError("lost")
+            # "taken" was already settled by another worker
+            return SettlementResult(0 if query["signal_id"] == "taken" else 1)
+
+    class Database:
+        trading_signals = Signals()
+
+    recorded = {}
+
+    async def record_status_changes(changes):
+        recorded["changes"] = changes
+
+    async def record_daily_rollups(rollups):
+        recorded["rollups"] = rollups
+
+    async def full_rebuild():
+        pytest.fail("flush must not fall back to a full recount")
+
+    monkeypatch.setattr(server, "db", Database())
+    monkeypatch.setattr(server, "record_status_changes", record_status_changes)
+    monkeypatch.setattr(server, "record_daily_rollups", record_daily_rollups)
+    monkeypatch.setattr(server, "rebuild_performance_stats", full_rebuild)
+    monkeypatch.setattr(server, "backfill_daily_rollups", full_rebuild)
+
+    book = server.SignalBook()
+    for signal_id in ("mine", "taken", "flaky"):
+        book.add(active_signal(signal_id, stop_loss=1.0950, take_profit=1.1050))
+    book.on_quote("EUR/USD", 1.0900)
+    asyncio.run(book.flush())
+
+    assert recorded["changes"] == [("EUR/USD", "1H", "ACTIVE", "SL_HIT")]
+    assert len(recorded["rollups"]) == 1
+    assert [settlement[0] for settlement in book.pending] == ["flaky"]
+
+
+def test_reopening_a_settled_signal_puts_it_back_in_the_book(server, recording_db, monkeypatch):
+    settled = active_signal("sig_1", stop_loss=1.0950, take_profit=1.1050)
+    settled.update({
+        "status": status(server, "TP_HIT"),
+        "exit_price": 1.1050,
+        "closed_at": datetime.now(timezone.utc),
+        "created_at": datetime.now(timezone.utc) - timedelta(hours=1),
+    })
+    recording_db.collections["trading_signals"] = MemoryCollection([settled])
+    recording_db.collections["performance_stats"] = MemoryCollection()
+    recording_db.collections["performance_daily"] = MemoryCollection()
+    book = server.SignalBook()
+    book.closed.add("sig_1")
+    monkeypatch.setattr(server, "signal_book", book)
+    server.app.dependency_overrides[server.require_admin] = lambda: {"user_id": "admin", "is_admin": True}
+    try:
+        response = TestClient(server.app).put("/api/admin/signals/sig_1", json={"status": "ACTIVE"})
+    finally:
+        server.app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    doc = recording_db.trading_signals.docs[0]
+    assert doc["status"] == status(server, "ACTIVE")
+    assert "closed_at" not in doc and "exit_price" not in doc
+    assert "sig_1" in book.entries and "sig_1" not in book.closed
+
+    book.on_quote("EUR/USD", 1.0900)
+    assert outcomes(book) == {"sig_1": status(server, "SL_HIT")}
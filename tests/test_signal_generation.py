@@ -0,0 +1,145 @@
+import asyncio
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+
+class Documents:
+    """Collection double with equality queries and the unique keys the real indexes enforce"""
+
+    def __init__(self, unique: tuple = ()):
+        self.docs = []
+        self.unique = unique
+
+    def matches(self, doc, query):
+        return all(doc.get(field) == value for field, value in query.items())
+
+    async def insert_one(self, doc):
+        if self.unique and any(all(other.get(f) == doc.get(f) for f in self.unique) for other in self.docs):
+            raise DuplicateKeyError("duplicate key")
+        self.docs.append(dict(doc))
+
+    async def insert_many(self, docs, ordered=True):
+        for doc in docs:
+            await self.insert_one(doc)
+
+    async def find_one(self, query, projection=None):
+        return next((dict(doc) for doc in self.docs if self.matches(doc, query)), None)
+
+    async def update_one(self, query, update, upsert=False):
+        class Result:
+            upserted_id = None
+
+        for doc in self.docs:
+            if self.matches(doc, query):
+                doc.update(update.get("$set", {}))
+                return Result()
+        if upsert:
+            await self.insert_one({**query, **update.get("$setOnInsert", {})})
+            Result.upserted_id = len(self.docs)
+        return Result()
+
+    async def delete_one(self, query):
+        self.docs = [doc for doc in self.docs if not self.matches(doc, query)]
+
+
+class Headers:
+    def __init__(self, headers: dict):
+        self.headers = headers
+
+
+@pytest.fixture
+def generation(server, recording_db, monkeypatch):
+    calls = []
+
+    async def generate_ai_signal(pair, timeframe):
+        calls.append((pair, timeframe))
+        await asyncio.sleep(0.01)
+        return {
+            "signal_id": f"sig_{len(calls)}",
+            "currency_pair": pair,
+            "timeframe": timeframe,
+            "signal_type": "BUY",
+            "confidence": 72.0,
+        }
+
+    async def record_signals_created(signals):
+        pass
+
+    class Book:
+        def add(self, signal):
+            pass
+
+    monkeypatch.setattr(server, "generate_ai_signal", generate_ai_signal)
+    monkeypatch.setattr(server, "record_signals_created", record_signals_created)
+    monkeypatch.setattr(server, "enqueue_rationales", lambda signals: None)
+    monkeypatch.setattr(server, "signal_book", Book())
+    monkeypatch.setattr(server, "signal_generations", {})
+    monkeypatch.setattr(server, "alert_fanout", server.AlertFanout())
+    recording_db.collections["alerts"] = Documents(unique=("user_id", "signal_id", "alert_type"))
+    recording_db.collections["idempotency_keys"] = Documents(unique=("user_id", "key"))
+    recording_db.collections["trading_signals"] = Documents()
+    return calls
+
+
+def request(server, user_id: str, key: str = None):
+    headers = {"Idempotency-Key": key} if key else {}
+    data = server.SignalCreate(currency_pair="EUR/USD", timeframe="1H")
+    return server.generate_signal(data, Headers(headers), {"user_id": user_id})
+
+
+def test_concurrent_identical_requests_share_one_generation_and_one_alert_each(server, recording_db, generation, monkeypatch):
+    async def scenario():
+        return await asyncio.gather(request(server, "user_a"), request(server, "user_a"), request(server, "user_b"))
+
+    signals = asyncio.run(scenario())
+
+    assert generation == [("EUR/USD", "1H")]
+    assert len({signal["signal_id"] for signal in signals}) == 1
+    alerts = recording_db.alerts.docs
+    assert sorted(alert["user_id"] for alert in alerts) == ["user_a", "user_b"]
+
+    # Only the leader queued a fan-out, and it skips every requester who already has a NEW_SIGNAL alert
+    assert server.alert_fanout.queue.qsize() == 1
+    signal, requested_by = server.alert_fanout.queue.get_nowait()
+    watchers = server.WatchlistIndex()
+    for user_id in ("user_a", "user_b", "user_c"):
+        watchers.add(user_id, "EUR/USD")
+    monkeypatch.setattr(server, "watchlist_index", watchers)
+    asyncio.run(server.alert_fanout.deliver(signal, requested_by))
+    watchlist_type = server.ALERT_ENUMS["alert_type"]["WATCHLIST_SIGNAL"]
+    assert [alert["user_id"] for alert in recording_db.alerts.docs if alert["alert_type"] == watchlist_type] == ["user_c"]
+
+
+def test_replay_with_the_same_key_returns_the_first_signal(server, recording_db, generation, monkeypatch):
+    monkeypatch.setattr(server, "SIGNAL_COALESCE_SECONDS", 0)
+    first = asyncio.run(request(server, "user_a", key="key-1"))
+    replayed = asyncio.run(request(server, "user_a", key="key-1"))
+    fresh = asyncio.run(request(server, "user_a", key="key-2"))
+
+    assert replayed["signal_id"] == first["signal_id"]
+    assert fresh["signal_id"] != first["signal_id"]
+    assert len(generation) == 2
+    assert [alert["signal_id"] for alert in recording_db.alerts.docs] == [first["signal_id"], fresh["signal_id"]]
+
+
+def test_replay_with_the_key_of_a_different_request_is_refused(server, recording_db, generation):
+    asyncio.run(request(server, "user_a", key="key-1"))
+    data = server.SignalCreate(currency_pair="GBP/USD", timeframe="1H")
+    with pytest.raises(server.HTTPException) as error:
+        asyncio.run(server.generate_signal(data, Headers({"Idempotency-Key": "key-1"}), {"user_id": "user_a"}))
+    assert error.value.status_code == 422
+
+
+def test_a_cancelled_shared_generation_is_replaced_not_raised(server, recording_db, generation):
+    async def scenario():
+        cancelled = asyncio.create_task(asyncio.sleep(10))
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        server.signal_generations[("EUR/USD", "1H")] = (cancelled, server.time.monotonic(), set())
+        return await server.coalesced_signal("EUR/USD", "1H", "user_a")
+
+    signal = asyncio.run(scenario())
+    assert signal["signal_id"] == "sig_1"
+    assert generation == [("EUR/USD", "1H")]
@@ -0,0 +1,87 @@
+import base64
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from tests.conftest import MemoryCollection
+
+T0 = datetime(2026, 3, 2, 12, 0, tzinfo=timezone.utc)
+
+
+def stored_signal(signal_id: str, minutes: int, is_premium: bool = False) -> dict:
+    return {
+        "signal_id": signal_id,
+        "currency_pair": "EUR/USD",
+        "timeframe": "1H",
+        "signal_type": 1,
+        "market_bias": 1,
+        "status": 0,
+        "confidence": 70.0,
+        "is_premium": is_premium,
+        "created_at": T0 + timedelta(minutes=minutes),
+        "schema_version": 2,
+    }
+
+
+def raw_cursor(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def test_cursor_round_trips_the_sort_key(server):
+    signal = {"created_at": (T0 + timedelta(microseconds=5)).isoformat(), "signal_id": "sig_ab"}
+    cursor = server.encode_signal_cursor(signal)
+    assert "=" not in cursor
+    assert server.decode_signal_cursor(cursor) == (T0 + timedelta(microseconds=5), "sig_ab")
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64 at all!",
+    raw_cursor("just a string")[:-2],
+    raw_cursor({"created_at": "2026-03-02"}),
+    raw_cursor(["2026-03-02T12:00:00+00:00"]),
+    raw_cursor(["not a date", "sig_1"]),
+    raw_cursor([12345, "sig_1"]),
+    raw_cursor(["2026-03-02T12:00:00+00:00", ["sig_1"]]),
+    raw_cursor(None),
+])
+def test_malformed_cursors_are_a_400(server, cursor):
+    with pytest.raises(server.HTTPException) as error:
+        server.decode_signal_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+@pytest.fixture
+def client(server, recording_db):
+    # Three signals share a created_at, so paging has to fall back to signal_id to break the tie
+    recording_db.collections["trading_signals"] = MemoryCollection([
+        stored_signal("sig_a", 0),
+        stored_signal("sig_b", 5),
+        stored_signal("sig_c", 5),
+        stored_signal("sig_d", 5, is_premium=True),
+        stored_signal("sig_e", 5),
+        stored_signal("sig_f", 9),
+    ])
+    return TestClient(server.app)
+
+
+def walk(client, limit: int) -> list:
+    pages, cursor = [], None
+    while True:
+        response = client.get("/api/signals", params={"limit": limit, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        pages.append([signal["signal_id"] for signal in response.json()])
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            return pages
+
+
+def test_pages_cover_ties_on_created_at_exactly_once(client):
+    assert walk(client, 2) == [["sig_f", "sig_e"], ["sig_c", "sig_b"], ["sig_a"]]
+    assert walk(client, 1) == [["sig_f"], ["sig_e"], ["sig_c"], ["sig_b"], ["sig_a"]]
+
+
+def test_malformed_cursor_on_the_route_is_a_400(client):
+    response = client.get("/api/signals", params={"cursor": raw_cursor([1, 2])})
+    assert response.status_code == 400